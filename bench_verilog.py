@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the netlist tools over synthetic designs (gen_netlist.py).
+
+For every size in the sweep a netlist is generated (cached under --work-dir), then
+each tool runs in fresh child processes, so parser tables, caches and the RSS
+high-water mark start from zero:
+
+  cli      the tool's command line end to end: wall, CPU and peak RSS of the
+           child process (os.wait4)
+  phases   the same work split into steps in-process (import, parse, histogram,
+           report, write, ...) with profiling.Profiler: wall, CPU, RSS, RSS
+           high-water mark and GC object count after each step
+
+Results are appended to a JSON-lines history (and optionally a CSV). Every row is
+compared with the previous run of the same tool/size/phase; slowdowns or RSS growth
+above --threshold are reported as regressions.
+
+Usage:
+  python bench_verilog.py --sizes small,medium
+  python bench_verilog.py --sizes small --tools counter,replacer-splice --repeat 3
+  python bench_verilog.py --sizes depth=5,fanout=10,width=8,prims=32 --csv bench.csv
+  python bench_verilog.py --list
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional
+
+from gen_netlist import NetlistSpec, generate_cached
+from profiling import Profiler, maxrss_mb
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# 매 실행이 실제 파싱을 하도록 AST/전처리 캐시 끔 (CLI, in-process 모두)
+CHILD_ENV = {**os.environ, 'VERILOG_AST_CACHE': 'off', 'VERILOG_PP_CACHE': 'off'}
+
+SIZES = {
+    'small': 'depth=3,fanout=4,width=2,prims=8',
+    'medium': 'depth=4,fanout=8,width=4,prims=16,files=4,ports=mixed',
+    'large': 'depth=5,fanout=10,width=8,prims=32,files=8,ports=mixed',
+}
+
+FIELDS = ['run_id', 'commit', 'python', 'host', 'tool', 'size', 'label', 'phase', 'status',
+          'wall_s', 'cpu_s', 'rss_mb', 'peak_rss_mb', 'objects', 'modules', 'flat_instances', 'bytes', 'note']
+
+
+class Skip(Exception):
+    pass
+
+
+# ------------------------------
+# Measurement
+# ------------------------------
+
+def run_measured(argv: List[str], cwd: str) -> Dict[str, object]:
+    """Run argv in a child process; wall/CPU/peak RSS of that child only."""
+    with tempfile.TemporaryFile() as errfile:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=cwd, env=CHILD_ENV, stdout=subprocess.DEVNULL, stderr=errfile)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        errfile.seek(0)
+        err = errfile.read().decode(errors='replace')
+    row = {
+        'wall_s': round(wall, 4),
+        'cpu_s': round(usage.ru_utime + usage.ru_stime, 4),
+        'peak_rss_mb': maxrss_mb(usage),
+        'status': 'ok' if proc.returncode == 0 else 'failed',
+    }
+    if proc.returncode:
+        row['note'] = (err.strip().splitlines() or [f'exit {proc.returncode}'])[-1][:200]
+    return row
+
+
+# ------------------------------
+# Tools: command line + in-process phases
+# ------------------------------
+
+def _tool_script(name: str) -> str:
+    return os.path.join(HERE, name)
+
+
+def _counter_cli(design, out, *extra):
+    return [_tool_script('verilog_counter.py'), design['top'], os.path.join(out, 'counter.csv'),
+            *design['files'], *extra]
+
+
+def _counter_phases(design, out, rec, aggregate=False, fast_structural=False):
+    with rec.phase('import'):
+        from verilog_counter import DesignCounter, load_hierarchy
+    with rec.phase('parse'):
+        hierarchy = load_hierarchy([design['top']], design['files'], fast_structural=fast_structural)
+    with rec.phase('histogram'):
+        counter = DesignCounter(hierarchy)
+    with rec.phase('report'):
+        counter.report(design['top'], os.path.join(out, 'counter.csv'), aggregate=aggregate)
+
+
+def _design_db_phases(design, out, rec):
+    with rec.phase('import'):
+        from design_db import DesignDB, build_design_db
+    with rec.phase('parse+build'):
+        db = build_design_db(design['files'])
+    path = os.path.join(out, 'design.vdb')
+    with rec.phase('save'):
+        db.save(path)
+    with rec.phase('open+edges'):
+        sum(1 for _ in DesignDB.open(path).iter_edges())
+
+
+def _graphgen_phases(design, out, rec):
+    with rec.phase('import'):
+        try:
+            import veriloggraphgen as g
+        except ImportError as e:
+            raise Skip(f'veriloggraphgen unavailable: {e}')
+        from verilog_frontend import parse_verilog
+    with rec.phase('parse'):
+        ast, _ = parse_verilog(design['files'])
+    with rec.phase('edges'):
+        edge_counts, defined = g.extract_edge_counts(ast)
+    with rec.phase('hierarchy'):
+        stats = g.analyze_hierarchy(edge_counts, design['top'], defined)
+    with rec.phase('collapse'):
+        g.collapse_hierarchy(stats, max_nodes=200)
+
+
+def _graphgen_cli(design, out):
+    return [_tool_script('veriloggraphgen.py'), '-t', design['top'], '-o', '',
+            '--json', os.path.join(out, 'graph.json'), '--max-nodes', '200', *design['files']]
+
+
+def _connectivity_cli(design, out):
+    return [_tool_script(os.path.join('networkx', 'instance_connectivity_graph.py')), '-t', design['top'],
+            '--equivalent', *design['files']]
+
+
+def _connectivity_phases(design, out, rec):
+    with rec.phase('import'):
+        import networkx
+        if not hasattr(networkx, 'Graph'):
+            # networkx가 없으면 저장소의 networkx/ 디렉터리가 빈 namespace package로 import됨
+            raise Skip('networkx is not installed')
+        sys.path.insert(0, os.path.join(HERE, 'networkx'))
+        import instance_connectivity_graph as icg
+        from verilog_frontend import parse_verilog
+    with rec.phase('parse'):
+        ast, _ = parse_verilog(design['files'])
+    with rec.phase('interfaces'):
+        interfaces = icg.create_module_interfaces(ast)
+    with rec.phase('graph'):
+        creator = icg.GraphCreator(interfaces)
+        creator.create_from_module(icg.find_module_by_name(ast, design['top']))
+    with rec.phase('equivalent'):
+        icg.find_equivalent_connectivity_modules(interfaces, ast)
+
+
+def _replace_arg(design):
+    leaf = design['leaf_module']
+    return f'{leaf}={leaf}_alt'
+
+
+def _replacer_phases(design, out, rec):
+    with rec.phase('import'):
+        from replacer import replace_module_instance
+        from verilog_emitter import write_verilog
+        from verilog_frontend import parse_verilog
+    with rec.phase('parse'):
+        ast, _ = parse_verilog(design['files'])
+    with rec.phase('replace'):
+        leaf = design['leaf_module']
+        ast = replace_module_instance(ast, {leaf: leaf + '_alt'})
+    with rec.phase('write'):
+        with open(os.path.join(out, 'replaced.v'), 'w') as f:
+            write_verilog(ast, f)
+
+
+def _splice_phases(design, out, rec):
+    with rec.phase('import'):
+        from replacer import splice_replace
+    with rec.phase('splice'):
+        leaf = design['leaf_module']
+        splice_replace(design['files'], os.path.join(out, 'spliced.v'), {leaf: leaf + '_alt'})
+
+
+def _submod_cli(design, out):
+    inst_list = os.path.join(out, 'submod_instances.txt')
+    with open(inst_list, 'w') as f:
+        insts = design['top_instances']
+        f.write('\n'.join(insts[:max(1, len(insts) // 2)]) + '\n')
+    return [_tool_script('pyverilog_submod.py'), '-f', inst_list, '-t', design['top'],
+            '-o', os.path.join(out, 'submod.v'), *design['files']]
+
+
+class Tool:
+    def __init__(self, cli: Optional[Callable] = None, phases: Optional[Callable] = None):
+        self.cli = cli
+        self.phases = phases
+
+
+TOOLS: Dict[str, Tool] = {
+    'counter': Tool(lambda d, o: _counter_cli(d, o), _counter_phases),
+    'counter-aggregate': Tool(lambda d, o: _counter_cli(d, o, '--aggregate'),
+                              lambda d, o, r: _counter_phases(d, o, r, aggregate=True)),
+    'counter-fast': Tool(lambda d, o: _counter_cli(d, o, '--fast-structural'),
+                         lambda d, o, r: _counter_phases(d, o, r, fast_structural=True)),
+    'design_db': Tool(lambda d, o: [_tool_script('design_db.py'), 'build', '-o', os.path.join(o, 'design.vdb'),
+                                    *d['files']],
+                      _design_db_phases),
+    'graphgen': Tool(_graphgen_cli, _graphgen_phases),
+    'connectivity': Tool(_connectivity_cli, _connectivity_phases),
+    'replacer': Tool(lambda d, o: [_tool_script('replacer.py'), '-i', *d['files'], '-o', os.path.join(o, 'replaced.v'),
+                                   '--replace', _replace_arg(d)],
+                     _replacer_phases),
+    'replacer-splice': Tool(lambda d, o: [_tool_script('replacer.py'), '-i', *d['files'],
+                                          '-o', os.path.join(o, 'spliced.v'), '--replace', _replace_arg(d), '--splice'],
+                            _splice_phases),
+    'prune': Tool(lambda d, o: [_tool_script('prune_top_and_stub_children.py'), '-t', d['top'],
+                                '-o', os.path.join(o, 'pruned.v'), *d['files']]),
+    'submod': Tool(_submod_cli),
+}
+
+
+def _phases_child(tool: str, design_json: str, out: str, result_json: str) -> None:
+    """Entry point of the per-tool child process (bench_verilog.py _phases ...)."""
+    with open(design_json) as f:
+        design = json.load(f)
+    rec = Profiler(enabled=True)
+    status = {'status': 'ok'}
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            TOOLS[tool].phases(design, out, rec)
+    except Skip as e:
+        status = {'status': 'skipped', 'note': str(e)}
+    except Exception as e:
+        status = {'status': 'failed', 'note': f'{type(e).__name__}: {e}'[:200]}
+    with open(result_json, 'w') as f:
+        json.dump({'rows': rec.rows, **status}, f)
+
+
+def run_tool(name: str, design: Dict[str, object], out: str) -> List[Dict[str, object]]:
+    """[{'phase', 'wall_s', 'cpu_s', 'peak_rss_mb', 'status', ...}] for one tool on one design."""
+    tool = TOOLS[name]
+    os.makedirs(out, exist_ok=True)
+    rows: List[Dict[str, object]] = []
+    if tool.cli is not None:
+        rows.append({'phase': 'cli', **run_measured([sys.executable] + tool.cli(design, out), out)})
+    if tool.phases is not None:
+        result_json = os.path.join(out, f'{name}.phases.json')
+        design_json = os.path.join(os.path.dirname(design['files'][0]), 'design.json')
+        proc = run_measured([sys.executable, os.path.abspath(__file__), '_phases', name, design_json, out, result_json],
+                            out)
+        try:
+            with open(result_json) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            result = {'rows': [], 'status': 'failed', 'note': proc.get('note', 'no result')}
+        for row in result['rows']:
+            rows.append({**row, 'status': 'ok'})
+        if result['status'] != 'ok':
+            rows.append({'phase': 'phases', 'status': result['status'], 'note': result.get('note', '')})
+        else:
+            rows.append({'phase': 'phases-total', **proc})
+    return rows
+
+
+# ------------------------------
+# History / regression check
+# ------------------------------
+
+def load_history(path: str) -> List[Dict[str, object]]:
+    rows = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+    return rows
+
+
+def append_history(path: str, rows: List[Dict[str, object]]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+
+def append_csv(path: str, rows: List[Dict[str, object]]) -> None:
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+TOTAL_PHASES = ('cli', 'phases-total')
+
+
+def compare(rows, history, threshold: float, min_wall: float = 0.1, min_rss: float = 5.0):
+    """Print each row next to the previous run of the same tool/design/phase; return the regressions.
+
+    Per-phase RSS is the process high-water mark so far, so RSS is only judged on whole-process rows.
+    """
+    last = {}
+    for old in history:
+        if old.get('status') == 'ok':
+            last[(old['tool'], old['label'], old['phase'])] = old
+    regressions = []
+    print(f"{'tool':<18} {'size':<24} {'phase':<13} {'wall s':>9} {'cpu s':>9} {'rss MB':>8}  vs previous")
+    for row in rows:
+        if row['status'] != 'ok':
+            print(f"{row['tool']:<18} {row['label']:<24} {row['phase']:<13} {row['status']}: {row.get('note', '')}")
+            continue
+        prev = last.get((row['tool'], row['label'], row['phase']))
+        note = ''
+        if prev is not None:
+            wall_ratio = row['wall_s'] / prev['wall_s'] if prev['wall_s'] else 1.0
+            rss_ratio = row['peak_rss_mb'] / prev['peak_rss_mb'] if prev['peak_rss_mb'] else 1.0
+            note = f"wall x{wall_ratio:.2f}, rss x{rss_ratio:.2f} ({prev['commit'] or prev['run_id']})"
+            if (wall_ratio > threshold and row['wall_s'] - prev['wall_s'] > min_wall) or \
+                    (row['phase'] in TOTAL_PHASES and rss_ratio > threshold
+                     and row['peak_rss_mb'] - prev['peak_rss_mb'] > min_rss):
+                note += '  REGRESSION'
+                regressions.append((row, prev))
+        print(f"{row['tool']:<18} {row['label']:<24} {row['phase']:<13} "
+              f"{row['wall_s']:>9.3f} {row['cpu_s']:>9.3f} {row['peak_rss_mb']:>8.1f}  {note}")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True)
+        return out.stdout.strip()
+    except OSError:
+        return ''
+
+
+def resolve_size(text: str):
+    """(name, NetlistSpec) from a preset name or a 'depth=..,fanout=..' spec."""
+    return text, NetlistSpec.from_string(SIZES.get(text, text))
+
+
+def split_sizes(text: str) -> List[str]:
+    # 'small,medium' 또는 'depth=4,fanout=8;depth=5,fanout=10' (사용자 정의 크기는 ';'로 구분)
+    if ';' in text or '=' in text:
+        return [s for s in text.split(';') if s.strip()]
+    return [s.strip() for s in text.split(',') if s.strip()]
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '_phases':
+        _phases_child(*sys.argv[2:6])
+        return
+
+    ap = argparse.ArgumentParser(description='Benchmark the Verilog tools over synthetic netlists')
+    ap.add_argument('--sizes', default='small',
+                    help=f"Presets ({', '.join(SIZES)}) separated by ',' or custom specs separated by ';' "
+                         "(e.g. 'depth=4,fanout=8,ports=mixed')")
+    ap.add_argument('--tools', default=','.join(TOOLS), help='Comma-separated tools (default: all)')
+    ap.add_argument('--repeat', type=int, default=1, help='Runs per tool; the fastest is recorded (default: 1)')
+    ap.add_argument('--seed', type=int, default=1, help='Netlist generator seed (default: 1)')
+    ap.add_argument('--work-dir', default='bench_work', help='Generated netlists and tool outputs (default: bench_work)')
+    ap.add_argument('--history', default='bench_history.jsonl', help='JSON-lines history file to append to')
+    ap.add_argument('--csv', default=None, help='Also append the rows to this CSV')
+    ap.add_argument('--threshold', type=float, default=1.25,
+                    help='Flag wall/RSS ratios above this vs the previous run (default: 1.25)')
+    ap.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 if anything regressed')
+    ap.add_argument('--list', action='store_true', help='List tools and size presets')
+    args = ap.parse_args()
+
+    if args.list:
+        for name, tool in TOOLS.items():
+            kinds = [k for k, v in (('cli', tool.cli), ('phases', tool.phases)) if v is not None]
+            print(f"tool {name:<18} {'+'.join(kinds)}")
+        for name, spec in SIZES.items():
+            print(f"size {name:<18} {spec}")
+        return
+
+    tools = [t.strip() for t in args.tools.split(',') if t.strip()]
+    unknown = [t for t in tools if t not in TOOLS]
+    if unknown:
+        ap.error(f"unknown tool(s): {', '.join(unknown)}")
+
+    work_dir = os.path.abspath(args.work_dir)
+    history = load_history(args.history)
+    base = {
+        'run_id': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'host': platform.node(),
+    }
+    rows: List[Dict[str, object]] = []
+    for size_text in split_sizes(args.sizes):
+        size, spec = resolve_size(size_text)
+        spec.seed = args.seed
+        t0 = time.perf_counter()
+        design = generate_cached(spec, os.path.join(work_dir, 'designs'))
+        print(f"[bench] {size}: {design['label']} {design['modules']} modules, "
+              f"{design['flat_module_instances']} flattened instances, {design['bytes']} bytes "
+              f"({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+        stats = {'size': size, 'label': design['label'], 'modules': design['modules'],
+                 'flat_instances': design['flat_module_instances'], 'bytes': design['bytes']}
+        for tool in tools:
+            out = os.path.join(work_dir, 'out', design['label'], tool)
+            best = None
+            for _ in range(max(1, args.repeat)):
+                result = run_tool(tool, design, out)
+                total = sum(r.get('wall_s', 0) for r in result if r['phase'] in TOTAL_PHASES)
+                if best is None or total < best[0]:
+                    best = (total, result)
+            for row in best[1]:
+                rows.append({**base, 'tool': tool, **stats, 'note': '', **row})
+            print(f"[bench]   {tool}: {best[0]:.2f}s", file=sys.stderr)
+
+    regressions = compare(rows, history, args.threshold)
+    append_history(args.history, rows)
+    if args.csv:
+        append_csv(args.csv, rows)
+    print(f"[bench] {len(rows)} rows appended to {args.history}" + (f" and {args.csv}" if args.csv else ''))
+    if regressions:
+        print(f"[bench] {len(regressions)} regression(s) above x{args.threshold}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Low-level byte I/O shared by the tools that copy big netlists without parsing
+them (modulereplacer.py, replacer.py --splice).
+
+os.write() may write fewer bytes than asked (and a single call is capped around
+2 GiB), so every write goes through write_all(); ranges are copied in COPY_CHUNK
+pieces so a huge module is never held in memory as one bytes object.
+"""
+
+import os
+
+COPY_CHUNK = 64 << 20
+
+
+def write_all(fd: int, data) -> int:
+    with memoryview(data) as view:
+        done = 0
+        while done < len(view):
+            done += os.write(fd, view[done:])
+    return done
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Bottom-up cell histogram over a module hierarchy.
+
+Builds a (module x cell type) count matrix in one pass: modules are visited in
+topological order (children first), each row starts as the module's direct cell
+counts and then adds the rows of its child modules with a single NumPy gather+sum.
+After build every module's full-subtree histogram is a row lookup.
+
+Works on anything with the AstHierarchy/DesignDB interface (__contains__,
+module_names(), children(name)). Cells are any instantiated names that are not
+defined modules -- primitives (tranif0, pmos, ...) or library/standard cells.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+
+def leaf_cell_types(hierarchy) -> List[str]:
+    """Sorted names that are instantiated somewhere but not defined as modules."""
+    cells: Set[str] = set()
+    for name in hierarchy.module_names():
+        for _, child in hierarchy.children(name):
+            if child not in hierarchy:
+                cells.add(child)
+    return sorted(cells)
+
+
+class CellHistogram:
+    def __init__(self, hierarchy, cells: Sequence[str]):
+        self.cells = list(cells)
+        self.col = {c: i for i, c in enumerate(self.cells)}
+        self.modules: List[str] = []
+        self.row: Dict[str, int] = {}
+        self.direct = np.zeros((0, len(self.cells)), dtype=np.int64)
+        self.matrix = self.direct
+        self.child_rows: List[np.ndarray] = []
+        self.order: List[int] = []
+        self.update(hierarchy)
+
+    # ------------------------------
+    # Build
+    # ------------------------------
+
+    def _scan(self, hierarchy, name: str) -> None:
+        i = self.row[name]
+        cols = []
+        rows = []
+        for _, child in hierarchy.children(name):
+            c = self.col.get(child)
+            if c is not None:
+                cols.append(c)
+            elif child in self.row:
+                rows.append(self.row[child])
+        self.direct[i] = np.bincount(np.asarray(cols, dtype=np.intp), minlength=len(self.cells))
+        self.child_rows[i] = np.asarray(rows, dtype=np.intp)
+
+    def _topological_order(self) -> List[int]:
+        # 반복 DFS 후위 순서 (자식 먼저), 재귀 인스턴스화는 에러
+        state = [0] * len(self.modules)  # 0: new, 1: on stack, 2: done
+        order: List[int] = []
+        for root in range(len(self.modules)):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(self.child_rows[root].tolist()))]
+            while stack:
+                node, it = stack[-1]
+                for child in it:
+                    if state[child] == 0:
+                        state[child] = 1
+                        stack.append((child, iter(self.child_rows[child].tolist())))
+                        break
+                    if state[child] == 1:
+                        raise ValueError(f"Recursive instantiation involving module '{self.modules[child]}'")
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+        return order
+
+    def update(self, hierarchy, dirty: Optional[Iterable[str]] = None) -> None:
+        """(Re)compute the matrix.
+
+        With dirty (changed modules plus everything that instantiates them, see
+        IncrementalDesign.affected) and an unchanged module set, only those rows
+        are rescanned and re-summed; otherwise the whole matrix is rebuilt.
+        """
+        names = list(hierarchy.module_names())
+        if dirty is None or set(names) != set(self.modules):
+            self.modules = names
+            self.row = {name: i for i, name in enumerate(names)}
+            self.direct = np.zeros((len(names), len(self.cells)), dtype=np.int64)
+            self.child_rows = [None] * len(names)
+            todo = set(range(len(names)))
+        else:
+            todo = {self.row[name] for name in dirty if name in self.row}
+        for i in todo:
+            self._scan(hierarchy, self.modules[i])
+        self.order = self._topological_order()
+
+        if len(todo) == len(self.modules):
+            self.matrix = self.direct.copy()
+        for i in self.order:
+            if i not in todo:
+                continue
+            rows = self.child_rows[i]
+            self.matrix[i] = self.direct[i] + (self.matrix[rows].sum(axis=0) if rows.size else 0)
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+
+    def counts(self, name: str) -> np.ndarray:
+        """Subtree counts of a defined module, or the one-hot/zero vector of a cell instance."""
+        i = self.row.get(name)
+        if i is not None:
+            return self.matrix[i]
+        vec = np.zeros(len(self.cells), dtype=np.int64)
+        c = self.col.get(name)
+        if c is not None:
+            vec[c] = 1
+        return vec
+
+    def multiplicity(self, top: str) -> np.ndarray:
+        """Per-module number of occurrences in the hierarchy flattened from top.
+
+        Counts DAG paths (parents before children, each child row gets the parent's
+        count once per instance) instead of enumerating them; 0 for unreachable modules.
+        """
+        mult = np.zeros(len(self.modules), dtype=np.int64)
+        mult[self.row[top]] = 1
+        for i in reversed(self.order):
+            if mult[i] and self.child_rows[i].size:
+                np.add.at(mult, self.child_rows[i], mult[i])
+        return mult
+
+    def histogram(self, name: str) -> Dict[str, int]:
+        return dict(zip(self.cells, self.counts(name).tolist()))
+
+    def iter_rows(self):
+        """(module name, counts) for every defined module, children before parents."""
+        for i in self.order:
+            yield self.modules[i], self.matrix[i]
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Single-pass analysis engine over Pyverilog ModuleDefs.
+
+An analysis is an object with handlers named on_<NodeClass>(state, node, ctx).
+AnalysisEngine walks each module once and feeds every node to every analysis that
+registered a handler for its type, so asking for more reports does not add AST
+traversals. Per-module results can be kept in an AnalysisCache keyed by
+(analysis name, version, module hash); a module whose hash is unchanged is not
+walked again (watch mode, repeated tops, ...).
+
+Walk order: the portlist (ctx.in_portlist), then the module items in source
+order (ctx.nested False), then everything below them (ctx.nested True, LIFO). Instance bodies (Instance/PortArg/expressions under an
+InstanceList) are only walked if some analysis sets instance_bodies = True.
+
+Built-in analyses:
+  InstancesAnalysis   [(instance name, module, nested)] -- children / edges / leaf detection
+  ConnectionsAnalysis [(instance name, module, nested, [(port or None, net text or None)])]
+  design_db.PortsAnalysis   port_table() rows
+"""
+
+import hashlib
+import os
+import pickle
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pyverilog.ast_code_generator.codegen import del_paren
+from pyverilog.vparser.ast import InstanceList, ModuleDef
+from verilog_emitter import StreamingCodeGenerator
+
+
+def module_digest(mod: ModuleDef) -> str:
+    """Content hash of a module (its pickled AST)."""
+    return hashlib.blake2b(pickle.dumps(mod, protocol=4), digest_size=16).hexdigest()
+
+
+class WalkContext:
+    __slots__ = ('module', 'nested', 'in_portlist')
+
+    def __init__(self, module: ModuleDef):
+        self.module = module
+        self.nested = False
+        self.in_portlist = False
+
+
+class Analysis:
+    """Base class; subclasses add on_<NodeClass>(self, state, node, ctx) handlers."""
+    name = 'analysis'
+    version = 1            # bump when the result format/semantics change (invalidates cached results)
+    instance_bodies = False
+
+    def begin(self, module: ModuleDef):
+        return None
+
+    def finish(self, module: ModuleDef, state):
+        return state
+
+
+class AnalysisCache:
+    """(analysis name, version, module hash) -> result; optionally persisted with save()/load()."""
+
+    def __init__(self):
+        self.results: Dict[Tuple[str, int, str], object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.results:
+            self.hits += 1
+            return True, self.results[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value) -> None:
+        self.results[key] = value
+
+    @classmethod
+    def load(cls, path: str) -> 'AnalysisCache':
+        cache = cls()
+        try:
+            with open(path, 'rb') as f:
+                cache.results = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        return cache
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(self.results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def report(self) -> str:
+        return f"[analysis-cache] hits={self.hits} misses={self.misses}"
+
+
+class AnalysisEngine:
+    def __init__(self, analyses: Iterable[Analysis], cache: Optional[AnalysisCache] = None,
+                 module_hash: Optional[Callable[[ModuleDef], str]] = None):
+        self.analyses: List[Analysis] = list(analyses)
+        self.index = {a.name: i for i, a in enumerate(self.analyses)}
+        self.dispatch: Dict[str, List[Tuple[int, Callable]]] = {}
+        for i, analysis in enumerate(self.analyses):
+            for attr in dir(analysis):
+                if attr.startswith('on_'):
+                    self.dispatch.setdefault(attr[3:], []).append((i, getattr(analysis, attr)))
+        self.instance_bodies = any(a.instance_bodies for a in self.analyses)
+        self.cache = cache
+        self.module_hash = module_hash or module_digest
+        self.walks = 0
+
+    def analyze(self, mod: ModuleDef) -> List[object]:
+        """Results of every analysis for one module, in registration order."""
+        results: List[object] = [None] * len(self.analyses)
+        todo = range(len(self.analyses))
+        keys = None
+        if self.cache is not None:
+            h = self.module_hash(mod)
+            keys = [(a.name, a.version, h) for a in self.analyses]
+            todo = []
+            for i, key in enumerate(keys):
+                hit, value = self.cache.get(key)
+                if hit:
+                    results[i] = value
+                else:
+                    todo.append(i)
+            if not todo:
+                return results
+
+        states = {i: self.analyses[i].begin(mod) for i in todo}
+        self._walk(mod, states)
+        for i in todo:
+            results[i] = self.analyses[i].finish(mod, states[i])
+            if keys is not None:
+                self.cache.put(keys[i], results[i])
+        return results
+
+    def _walk(self, mod: ModuleDef, states: Dict[int, object]) -> None:
+        self.walks += 1
+        dispatch = self.dispatch
+        ctx = WalkContext(mod)
+
+        def feed(node):
+            for i, handler in dispatch.get(node.__class__.__name__, ()):
+                if i in states:
+                    handler(states[i], node, ctx)
+
+        ctx.in_portlist = True
+        for port in (mod.portlist.ports if mod.portlist else ()):
+            feed(port)
+        ctx.in_portlist = False
+
+        stack = []
+        for item in mod.items:
+            feed(item)
+            if self.instance_bodies or not isinstance(item, InstanceList):
+                stack.extend(item.children())
+        ctx.nested = True
+        while stack:
+            node = stack.pop()
+            feed(node)
+            if self.instance_bodies or not isinstance(node, InstanceList):
+                stack.extend(node.children())
+
+    def run(self, module_defs: Dict[str, ModuleDef]) -> Dict[str, Dict[str, object]]:
+        """{analysis name: {module name: result}} for a whole design."""
+        out: Dict[str, Dict[str, object]] = {a.name: {} for a in self.analyses}
+        for name, mod in module_defs.items():
+            for analysis, result in zip(self.analyses, self.analyze(mod)):
+                out[analysis.name][name] = result
+        return out
+
+
+# ------------------------------
+# Built-in analyses
+# ------------------------------
+
+class InstancesAnalysis(Analysis):
+    """[(instance name, instantiated module, nested?)]: top-level items first."""
+    name = 'instances'
+
+    def begin(self, module):
+        return []
+
+    def on_InstanceList(self, state, node, ctx):
+        nested = ctx.nested
+        state.extend((inst.name, inst.module, nested) for inst in node.instances)
+
+
+class ConnectionsAnalysis(Analysis):
+    """Port connections of every instance; port is None for positional connections."""
+    name = 'connections'
+
+    def __init__(self):
+        self.codegen = StreamingCodeGenerator()
+
+    def begin(self, module):
+        return []
+
+    def on_InstanceList(self, state, node, ctx):
+        visit = self.codegen.visit
+        for inst in node.instances:
+            ports = [(arg.portname, None if arg.argname is None else del_paren(visit(arg.argname)))
+                     for arg in inst.portlist]
+            state.append((inst.name, inst.module, ctx.nested, ports))
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Compact, array-backed design hierarchy database.
+
+Built once from a parse, the hierarchy is stored as flat arrays instead of the
+pyverilog AST:
+
+  cells      0..num_modules-1 are defined modules, the rest are referenced but
+             undefined cells (primitives, library cells)
+  instances  CSR: inst_off[m]..inst_off[m+1] index inst_cell[] / inst_name[] /
+             inst_flags[] (INST_IN_GENERATE for instances inside generate blocks)
+  ports      CSR: port_off[m]..port_off[m+1] index port_name[] / port_dir[] / port_width[]
+  sources    src_file[m] / src_start[m] / src_end[m]: byte span of each module
+  strings    every name is interned once: str_off[] into a utf-8 blob
+
+save() writes the arrays into one file (magic, JSON section table, 8-byte
+aligned sections); open() mmaps it and exposes the sections as memoryviews, so
+opening a design costs a few milliseconds regardless of its size.
+
+Usage:
+  python design_db.py build -o design.vdb [--fast-structural] netlist1.v [...]
+  python design_db.py info design.vdb
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pyverilog.vparser.ast import (
+    ModuleDef,
+    Input,
+    Output,
+    Inout,
+    IntConst,
+)
+from verilog_frontend import parse_module_index, scan_module_offsets
+from design_analysis import Analysis, AnalysisCache, AnalysisEngine, InstancesAnalysis
+from netlist_scanner import scan_structural
+
+MAGIC = b'VDDB0001'
+DIR_CODES = {None: 0, 'input': 1, 'output': 2, 'inout': 3}
+DIR_NAMES = {v: k for k, v in DIR_CODES.items()}
+INST_IN_GENERATE = 1
+
+# section name -> array typecode
+SECTIONS = {
+    'cell_name': 'i',
+    'inst_off': 'q',
+    'inst_cell': 'i',
+    'inst_name': 'i',
+    'inst_flags': 'B',
+    'port_off': 'q',
+    'port_name': 'i',
+    'port_dir': 'B',
+    'port_width': 'i',
+    'src_file': 'i',
+    'src_start': 'q',
+    'src_end': 'q',
+    'str_off': 'q',
+    'str_blob': 'B',
+}
+
+
+# ------------------------------
+# Port table helpers
+# ------------------------------
+
+def _const_width(width) -> int:
+    if width is None:
+        return 1
+    if isinstance(width.msb, IntConst) and isinstance(width.lsb, IntConst):
+        try:
+            return abs(int(width.msb.value) - int(width.lsb.value)) + 1
+        except ValueError:
+            return -1
+    return -1
+
+
+class PortsAnalysis(Analysis):
+    """port_table() as an AnalysisEngine analysis."""
+    name = 'ports'
+
+    def begin(self, module):
+        return [], {}
+
+    def on_Ioport(self, state, node, ctx):
+        if ctx.in_portlist:
+            state[0].append(node.first.name)
+            state[1][node.first.name] = (node.first.__class__.__name__.lower(), _const_width(node.first.width))
+
+    def on_Port(self, state, node, ctx):
+        if ctx.in_portlist:
+            state[0].append(node.name)
+
+    def on_Decl(self, state, node, ctx):
+        if not ctx.nested:
+            for d in node.list:
+                if isinstance(d, (Input, Output, Inout)):
+                    state[1][d.name] = (d.__class__.__name__.lower(), _const_width(d.width))
+
+    def finish(self, module, state):
+        order, info = state
+        return [(name,) + info.get(name, (None, -1)) for name in order]
+
+
+def port_table(mod: ModuleDef) -> List[Tuple[str, Optional[str], int]]:
+    """[(port name, direction or None, width or -1)] in port order (ANSI and non-ANSI)."""
+    return AnalysisEngine([PortsAnalysis()]).analyze(mod)[0]
+
+
+# ------------------------------
+# Hierarchy views
+# ------------------------------
+
+class AstHierarchy:
+    """The DesignDB query interface over a {name: ModuleDef} index.
+
+    Each module is walked at most once: instances, ports and any extra analyses
+    come out of one AnalysisEngine pass the first time the module is queried.
+    Pass a shared AnalysisCache to skip modules whose hash was seen before.
+    """
+
+    def __init__(self, module_defs: Dict[str, ModuleDef], analyses: Sequence[Analysis] = (),
+                 cache: Optional[AnalysisCache] = None, module_hash=None):
+        self.module_defs = module_defs
+        self.engine = AnalysisEngine([InstancesAnalysis(), PortsAnalysis()] + list(analyses), cache, module_hash)
+        self._results: Dict[str, List[object]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.module_defs
+
+    def module_names(self) -> List[str]:
+        return list(self.module_defs)
+
+    def result(self, name: str, analysis: str = 'instances'):
+        results = self._results.get(name)
+        if results is None:
+            results = self._results[name] = self.engine.analyze(self.module_defs[name])
+        return results[self.engine.index[analysis]]
+
+    def instances(self, name: str) -> List[Tuple[str, str, bool]]:
+        """[(instance name, instantiated module, inside generate?)]"""
+        return self.result(name, 'instances')
+
+    def children(self, name: str, include_generate: bool = False) -> List[Tuple[str, str]]:
+        """[(instance name, instantiated module)]; top-level items in source order."""
+        return [(inst, mod) for inst, mod, nested in self.instances(name) if include_generate or not nested]
+
+    def iter_edges(self) -> Iterator[Tuple[str, str]]:
+        """(parent, child cell) for every top-level instance."""
+        for parent in self.module_defs:
+            for _, child in self.children(parent):
+                yield parent, child
+
+    def ports(self, name: str) -> List[Tuple[str, Optional[str], int]]:
+        return self.result(name, 'ports')
+
+
+class DesignDB:
+    def __init__(self, arrays: Dict[str, Sequence[int]], num_modules: int, mm: Optional[mmap.mmap] = None):
+        self.a = arrays
+        self.num_modules = num_modules
+        self.num_cells = len(arrays['cell_name'])
+        self._mm = mm
+        self._cell_ids: Optional[Dict[str, int]] = None
+
+    # -- construction ------------------------------------------------------
+
+    @classmethod
+    def build(cls, module_defs: Dict[str, ModuleDef],
+              spans: Optional[Dict[str, Tuple[str, int, int]]] = None) -> 'DesignDB':
+        a = {name: array(code) for name, code in SECTIONS.items()}
+        strings: Dict[str, int] = {}
+        blob = bytearray()
+        a['str_off'].append(0)
+
+        def intern(s: str) -> int:
+            sid = strings.get(s)
+            if sid is None:
+                sid = strings[s] = len(strings)
+                blob.extend(s.encode())
+                a['str_off'].append(len(blob))
+            return sid
+
+        cell_ids: Dict[str, int] = {}
+        for name in module_defs:
+            cell_ids[name] = len(cell_ids)
+            a['cell_name'].append(intern(name))
+
+        a['inst_off'].append(0)
+        a['port_off'].append(0)
+        hierarchy = AstHierarchy(module_defs)
+        for name in module_defs:
+            for inst_name, inst_module, in_gen in hierarchy.instances(name):
+                cid = cell_ids.get(inst_module)
+                if cid is None:
+                    cid = cell_ids[inst_module] = len(cell_ids)
+                    a['cell_name'].append(intern(inst_module))
+                a['inst_cell'].append(cid)
+                a['inst_name'].append(intern(inst_name))
+                a['inst_flags'].append(INST_IN_GENERATE if in_gen else 0)
+            a['inst_off'].append(len(a['inst_cell']))
+
+            for pname, pdir, pwidth in hierarchy.ports(name):
+                a['port_name'].append(intern(pname))
+                a['port_dir'].append(DIR_CODES[pdir])
+                a['port_width'].append(pwidth)
+            a['port_off'].append(len(a['port_name']))
+
+            path, start, end = (spans or {}).get(name, (None, -1, -1))
+            a['src_file'].append(intern(path) if path is not None else -1)
+            a['src_start'].append(start)
+            a['src_end'].append(end)
+
+        a['str_blob'] = array('B', blob)
+        return cls(a, len(module_defs))
+
+    # -- on-disk format ----------------------------------------------------
+
+    def save(self, path: str) -> None:
+        sections = {}
+        offset = 0
+        for name, code in SECTIONS.items():
+            nbytes = len(self.a[name]) * array(code).itemsize
+            sections[name] = [code, offset, len(self.a[name])]
+            offset += (nbytes + 7) & ~7
+        header = json.dumps({
+            'byteorder': sys.byteorder,
+            'num_modules': self.num_modules,
+            'sections': sections,
+        }).encode()
+        header += b' ' * (-(len(MAGIC) + 8 + len(header)) % 8)
+        base = len(MAGIC) + 8 + len(header)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            for name, (code, off, count) in sections.items():
+                f.seek(base + off)
+                f.write(memoryview(self.a[name]).cast('B'))
+            f.truncate(base + offset)
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: str) -> 'DesignDB':
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a design database")
+        hlen = int.from_bytes(mm[len(MAGIC):len(MAGIC) + 8], 'little')
+        header = json.loads(mm[len(MAGIC) + 8:len(MAGIC) + 8 + hlen])
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path}: written on a {header['byteorder']}-endian machine")
+        base = len(MAGIC) + 8 + hlen
+        view = memoryview(mm)
+        arrays = {}
+        for name, (code, off, count) in header['sections'].items():
+            itemsize = array(code).itemsize
+            arrays[name] = view[base + off:base + off + count * itemsize].cast(code)
+        return cls(arrays, header['num_modules'], mm)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self.a = {}
+            self._mm.close()
+            self._mm = None
+
+    # -- id-level queries --------------------------------------------------
+
+    def string(self, sid: int) -> str:
+        off = self.a['str_off']
+        return bytes(self.a['str_blob'][off[sid]:off[sid + 1]]).decode()
+
+    def cell_name(self, cid: int) -> str:
+        return self.string(self.a['cell_name'][cid])
+
+    def cell_id(self, name: str) -> Optional[int]:
+        if self._cell_ids is None:
+            self._cell_ids = {self.cell_name(c): c for c in range(self.num_cells)}
+        return self._cell_ids.get(name)
+
+    def is_defined(self, cid: int) -> bool:
+        return cid < self.num_modules
+
+    def inst_range(self, cid: int) -> Tuple[int, int]:
+        off = self.a['inst_off']
+        return off[cid], off[cid + 1]
+
+    def child_cells(self, cid: int) -> Sequence[int]:
+        """Cell ids of every instance in cid, generate blocks included."""
+        lo, hi = self.inst_range(cid)
+        return self.a['inst_cell'][lo:hi]
+
+    def source_span(self, name: str) -> Optional[Tuple[str, int, int]]:
+        cid = self.cell_id(name)
+        sid = self.a['src_file'][cid]
+        if sid < 0:
+            return None
+        return self.string(sid), self.a['src_start'][cid], self.a['src_end'][cid]
+
+    # -- same interface as AstHierarchy ------------------------------------
+
+    def __contains__(self, name: str) -> bool:
+        cid = self.cell_id(name)
+        return cid is not None and self.is_defined(cid)
+
+    def module_names(self) -> List[str]:
+        return [self.cell_name(c) for c in range(self.num_modules)]
+
+    def children(self, name: str, include_generate: bool = False) -> List[Tuple[str, str]]:
+        lo, hi = self.inst_range(self.cell_id(name))
+        cells, names, flags = self.a['inst_cell'], self.a['inst_name'], self.a['inst_flags']
+        return [(self.string(names[i]), self.cell_name(cells[i])) for i in range(lo, hi)
+                if include_generate or not flags[i] & INST_IN_GENERATE]
+
+    def iter_edges(self) -> Iterator[Tuple[str, str]]:
+        """(parent, child cell) for every top-level instance."""
+        cells, flags = self.a['inst_cell'], self.a['inst_flags']
+        for cid in range(self.num_modules):
+            parent = self.cell_name(cid)
+            lo, hi = self.inst_range(cid)
+            for i in range(lo, hi):
+                if not flags[i] & INST_IN_GENERATE:
+                    yield parent, self.cell_name(cells[i])
+
+    def ports(self, name: str) -> List[Tuple[str, Optional[str], int]]:
+        cid = self.cell_id(name)
+        off = self.a['port_off']
+        return [(self.string(self.a['port_name'][i]), DIR_NAMES[self.a['port_dir'][i]], self.a['port_width'][i])
+                for i in range(off[cid], off[cid + 1])]
+
+
+def build_design_db(filelist: Sequence[str], fast_structural: bool = False,
+                    preprocess_include=None, preprocess_define=None, jobs: int = 1) -> DesignDB:
+    spans: Dict[str, Tuple[str, int, int]] = {}
+    for path in filelist:
+        for name, start, end in scan_module_offsets(path):
+            spans[name] = (os.path.abspath(path), start, end)
+    if fast_structural:
+        module_defs = scan_structural(filelist, preprocess_include, preprocess_define)
+    else:
+        _, module_defs = parse_module_index(filelist, preprocess_include, preprocess_define, jobs=jobs)
+    return DesignDB.build(module_defs, spans)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Build or inspect a compact design hierarchy database')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    b = sub.add_parser('build', help='Parse Verilog files and write a .vdb file')
+    b.add_argument('-o', '--out', required=True, help='Output database file')
+    b.add_argument('--fast-structural', action='store_true', help='Use the structural scanner instead of pyverilog')
+    b.add_argument('-j', '--jobs', type=int, default=1, help='Parse input files in N worker processes')
+    b.add_argument('verilog', nargs='+', help='Input Verilog files')
+    i = sub.add_parser('info', help='Print a summary of a .vdb file')
+    i.add_argument('db', help='Database file')
+    args = ap.parse_args()
+
+    if args.cmd == 'build':
+        db = build_design_db(args.verilog, args.fast_structural, jobs=args.jobs)
+        db.save(args.out)
+        print(f"[OK] Wrote {args.out}: {db.num_modules} modules, {db.num_cells - db.num_modules} leaf cells, "
+              f"{len(db.a['inst_cell'])} instances")
+    else:
+        db = DesignDB.open(args.db)
+        print(f"modules   : {db.num_modules}")
+        print(f"leaf cells: {db.num_cells - db.num_modules}")
+        print(f"instances : {len(db.a['inst_cell'])}")
+        print(f"ports     : {len(db.a['port_name'])}")
+        print(f"strings   : {len(db.a['str_off']) - 1} ({len(db.a['str_blob'])} bytes)")
+        print(f"file size : {os.path.getsize(args.db)} bytes")
+
+
+if __name__ == '__main__':
+    main()
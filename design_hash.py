@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Structural Merkle hashes of module definitions.
+
+local_hash() digests what a module is made of -- its parameter list, port list
+and module items (port/net declarations, instance lists, assigns, ...) -- from
+the AST, so formatting, comments, line numbers and the order of module items do
+not change it. The module's own name is left out: two copies of a module hash
+equal whatever they are called. merkle_hashes() then folds in, bottom-up, the
+Merkle hashes of the defined modules each module instantiates, so a module's
+Merkle hash changes whenever anything in its subtree does.
+
+build_module_index() uses local_hash() to drop duplicate definitions that are
+identical; netlist_diff.py compares two revisions by these hashes. A
+DesignHashes snapshot (save()/load()) keeps the hashes of a revision as JSON so
+it does not have to be parsed again for the next diff.
+"""
+
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional
+
+from pyverilog.vparser.ast import ModuleDef
+from verilog_frontend import instantiated_modules
+
+SNAPSHOT_FORMAT = 1
+DIGEST_SIZE = 16
+
+
+def node_digest(node) -> bytes:
+    """Digest of an AST subtree: class names, attributes and arity in pre-order, no line numbers."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        children = n.children()
+        attrs = '|'.join(repr(getattr(n, a)) for a in n.attr_names)
+        h.update(f"{n.__class__.__name__}({attrs})/{len(children)}\0".encode())
+        stack.extend(reversed(children))
+    return h.digest()
+
+
+def local_hash(mod: ModuleDef) -> str:
+    """Name-independent structural hash of one module, ignoring item order."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    h.update(b'P' + (node_digest(mod.paramlist) if mod.paramlist else b''))
+    h.update(b'O' + (node_digest(mod.portlist) if mod.portlist else b''))
+    # 모듈 아이템은 순서를 무시 (정렬한 다이제스트의 multiset)
+    for d in sorted(node_digest(item) for item in mod.items or ()):
+        h.update(b'I' + d)
+    return h.hexdigest()
+
+
+def defined_children(module_defs: Dict[str, ModuleDef]) -> Dict[str, List[str]]:
+    """{module: sorted defined modules it instantiates (generate blocks included)}."""
+    return {name: sorted({c for c in instantiated_modules(mod) if c in module_defs})
+            for name, mod in module_defs.items()}
+
+
+def merkle_hashes(local: Dict[str, str], children: Dict[str, List[str]]) -> Dict[str, str]:
+    """Fold child Merkle hashes into each local hash, bottom-up.
+
+    A child reached again while still on the DFS path (a recursive instantiation)
+    contributes only its name.
+    """
+    merkle: Dict[str, str] = {}
+    for root in local:
+        if root in merkle:
+            continue
+        on_path = set()
+        stack = [(root, False)]
+        while stack:
+            name, expanded = stack.pop()
+            if expanded:
+                on_path.discard(name)
+                h = hashlib.blake2b(bytes.fromhex(local[name]), digest_size=DIGEST_SIZE)
+                for c in children[name]:
+                    h.update(f"{c}={merkle.get(c, 'cycle')}\0".encode())
+                merkle[name] = h.hexdigest()
+                continue
+            if name in merkle or name in on_path:
+                continue
+            on_path.add(name)
+            stack.append((name, True))
+            stack.extend((c, False) for c in children[name] if c not in merkle and c not in on_path)
+    return merkle
+
+
+class DesignHashes:
+    """local / Merkle hash and defined children of every module in a design."""
+
+    def __init__(self, local: Dict[str, str], merkle: Dict[str, str], children: Dict[str, List[str]],
+                 meta: Optional[Dict[str, object]] = None):
+        self.local = local
+        self.merkle = merkle
+        self.children = children
+        self.meta = meta or {}
+
+    @classmethod
+    def from_modules(cls, module_defs: Dict[str, ModuleDef], meta=None) -> 'DesignHashes':
+        local = {name: local_hash(mod) for name, mod in module_defs.items()}
+        children = defined_children(module_defs)
+        return cls(local, merkle_hashes(local, children), children, meta)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.local
+
+    def module_names(self) -> List[str]:
+        return list(self.local)
+
+    def subtree(self, top: str) -> Iterable[str]:
+        """top and every defined module below it."""
+        seen = {top}
+        stack = [top]
+        while stack:
+            name = stack.pop()
+            yield name
+            for c in self.children.get(name, ()):
+                if c not in seen:
+                    seen.add(c)
+                    stack.append(c)
+
+    def restrict(self, top: str) -> 'DesignHashes':
+        keep = list(self.subtree(top))
+        return DesignHashes({n: self.local[n] for n in keep}, {n: self.merkle[n] for n in keep},
+                            {n: self.children[n] for n in keep}, dict(self.meta, top=top))
+
+    def save(self, path: str) -> None:
+        data = {
+            'format': SNAPSHOT_FORMAT,
+            'meta': self.meta,
+            'modules': {name: {'local': self.local[name], 'merkle': self.merkle[name],
+                               'children': self.children[name]} for name in self.local},
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> 'DesignHashes':
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path}: unsupported hash snapshot format {data.get('format')}")
+        mods = data['modules']
+        return cls({n: m['local'] for n, m in mods.items()}, {n: m['merkle'] for n, m in mods.items()},
+                   {n: m['children'] for n, m in mods.items()}, data.get('meta'))
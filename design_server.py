@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Design query daemon: load a design once, then answer hierarchy / count / port /
+connectivity queries over a Unix socket.
+
+Protocol: one JSON object per line in each direction; a connection may send any
+number of requests.
+
+  request   {"op": "children", "module": "TOP"}
+  response  {"ok": true, "result": [["u1", "full_adder"], ...]}
+            {"ok": false, "error": "unknown module 'TOP2'"}
+
+Ops (arguments after the op name):
+  info                                  design summary
+  modules / leaves                      defined modules / defined modules without instances
+  children      module [include_generate]   [[instance, module], ...]
+  parents       module                  [[parent module, instance], ...]
+  ports         module                  [[name, direction, width], ...]
+  resolve       path                    module of an instance path ('TOP.u1.u2')
+  counts        module|path [cells]     {cell: full-subtree count}
+  multiplicity  top [cells]             {module or cell: flattened occurrences under top}
+  edges                                 [[parent, child], ...] (top-level instances)
+  connections   module [instance]       [{"instance", "module", "ports": [[port, net], ...]}]
+  net           module net              [[instance, module, port], ...] connected to net
+  report        top csv_output [...]    run the verilog_counter report in the server
+  reload                                re-parse edited input files (not for --db)
+  shutdown
+
+Usage:
+  python design_server.py serve -s /tmp/design.sock [-j N] netlist1.v [...]
+  python design_server.py serve -s /tmp/design.sock --db design.vdb
+  python design_server.py query -s /tmp/design.sock children module=TOP
+  python verilog_counter.py --server /tmp/design.sock TOP out.csv
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional, Sequence
+
+from design_analysis import AnalysisCache, AnalysisEngine, ConnectionsAnalysis
+from design_db import AstHierarchy, DesignDB
+from design_watch import IncrementalDesign
+from netlist_scanner import add_fast_structural_argument, scan_structural
+from verilog_frontend import add_cache_arguments, add_jobs_argument, cache_from_args
+
+DEFAULT_CELLS = ('tranif0', 'tranif1')
+
+
+class DesignServerError(RuntimeError):
+    pass
+
+
+# ------------------------------
+# Client
+# ------------------------------
+
+class DesignClient:
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(socket_path)
+        except OSError as e:
+            self.sock.close()
+            raise DesignServerError(f"cannot connect to design server at {socket_path}: {e}")
+        self.rfile = self.sock.makefile('rb')
+
+    def query(self, op: str, **args):
+        args['op'] = op
+        self.sock.sendall(json.dumps(args).encode() + b'\n')
+        line = self.rfile.readline()
+        if not line:
+            raise DesignServerError("design server closed the connection")
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise DesignServerError(reply.get('error', 'unknown error'))
+        return reply['result']
+
+    def close(self) -> None:
+        self.rfile.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------------------
+# Service
+# ------------------------------
+
+class DesignService:
+    """Query handlers over one loaded design.
+
+    The hierarchy is an AstHierarchy (parsed files, reloadable) or a DesignDB.
+    Cell histograms are built once per requested cell list and kept; reload()
+    only recomputes the modules affected by the edit.
+    """
+
+    def __init__(self, verilog_files: Sequence[str] = (), db_path: Optional[str] = None,
+                 fast_structural: bool = False, cells: Sequence[str] = DEFAULT_CELLS,
+                 jobs: int = 1, cache='default'):
+        self.verilog_files = list(verilog_files)
+        self.db_path = db_path
+        self.fast_structural = fast_structural
+        self.default_cells = tuple(cells)
+        self.design = None
+        self.analysis_cache = AnalysisCache()
+        self.conn_engine = AnalysisEngine([ConnectionsAnalysis()], self.analysis_cache)
+        self.counters: Dict[tuple, object] = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.queries = 0
+
+        t0 = time.perf_counter()
+        self.hierarchy = self._load(jobs, cache)
+        self.load_time = time.perf_counter() - t0
+        self._invalidate()
+        self.counter(None)
+
+    def _load(self, jobs, cache):
+        if self.db_path:
+            return DesignDB.open(self.db_path)
+        if self.fast_structural:
+            return AstHierarchy(scan_structural(self.verilog_files))
+        # 파일 단위 해시를 들고 있어야 reload 때 바뀐 모듈만 다시 계산
+        self.design = IncrementalDesign(self.verilog_files, cache=cache, jobs=jobs)
+        self.design.refresh()
+        self.conn_engine.module_hash = self.design.module_hash
+        return self._ast_hierarchy()
+
+    def _ast_hierarchy(self):
+        return AstHierarchy(self.design.module_defs, cache=self.analysis_cache, module_hash=self.design.module_hash)
+
+    def _invalidate(self) -> None:
+        self.parents_of = None
+        self.connections_of: Dict[str, list] = {}
+
+    # -- helpers -------------------------------------------------------------
+
+    def counter(self, cells):
+        """DesignCounter for a cell list (None: the server default, '*': every leaf cell type)."""
+        from verilog_counter import DesignCounter  # verilog_counter imports this module (--server)
+
+        key = self.default_cells if cells is None else ('*',) if cells == '*' else tuple(cells)
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = DesignCounter(self.hierarchy, None if key == ('*',) else list(key))
+        return counter
+
+    def module(self, name: str) -> str:
+        if name not in self.hierarchy:
+            raise DesignServerError(f"unknown module '{name}'")
+        return name
+
+    def target(self, name: str) -> str:
+        """Module name, or the module of an instance path TOP.u1.u2."""
+        if '.' not in name:
+            return self.module(name)
+        top = name.split('.')[0]
+        module = self.counter(None).resolve_instance_path(self.module(top), name)
+        if module is None:
+            raise DesignServerError(f"instance path '{name}' not found")
+        return module
+
+    def connections(self, name: str) -> list:
+        module_defs = getattr(self.hierarchy, 'module_defs', None)
+        if module_defs is None:
+            raise DesignServerError("connectivity is not stored in a --db design; serve the Verilog files instead")
+        conns = self.connections_of.get(name)
+        if conns is None:
+            conns = []
+            for inst, child, nested, ports in self.conn_engine.analyze(module_defs[name])[0]:
+                if nested:
+                    continue
+                # 위치 기반 연결은 자식 모듈의 포트 순서로 이름을 채움
+                order = [p[0] for p in self.hierarchy.ports(child)] if child in self.hierarchy else []
+                named = [[port if port is not None else (order[i] if i < len(order) else f'#{i}'), net]
+                         for i, (port, net) in enumerate(ports)]
+                conns.append({'instance': inst, 'module': child, 'ports': named})
+            self.connections_of[name] = conns
+        return conns
+
+    # -- ops -----------------------------------------------------------------
+
+    def op_info(self):
+        h = self.hierarchy
+        return {
+            'source': self.db_path or self.verilog_files,
+            'modules': len(h.module_names()),
+            'cells': self.default_cells,
+            'load_seconds': round(self.load_time, 3),
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'queries': self.queries,
+            'reloadable': self.db_path is None,
+        }
+
+    def op_modules(self):
+        return self.hierarchy.module_names()
+
+    def op_leaves(self):
+        return self.counter(None).leaf_modules()
+
+    def op_children(self, module, include_generate=False):
+        return self.hierarchy.children(self.module(module), include_generate)
+
+    def op_parents(self, module):
+        if self.parents_of is None:
+            parents_of: Dict[str, List[list]] = {}
+            for parent in self.hierarchy.module_names():
+                for inst, child in self.hierarchy.children(parent):
+                    parents_of.setdefault(child, []).append([parent, inst])
+            self.parents_of = parents_of
+        return self.parents_of.get(module, [])
+
+    def op_ports(self, module):
+        return self.hierarchy.ports(self.module(module))
+
+    def op_resolve(self, path):
+        return self.target(path)
+
+    def op_counts(self, module=None, path=None, cells=None):
+        name = self.target(module or path or '')
+        return self.counter(cells).histogram.histogram(name)
+
+    def op_multiplicity(self, top, cells=None):
+        histogram = self.counter(cells).histogram
+        mult = histogram.multiplicity(self.module(top))
+        result = {histogram.modules[i]: int(mult[i]) for i in reversed(histogram.order) if mult[i]}
+        for cell, flat in zip(histogram.cells, histogram.counts(top).tolist()):
+            if flat:
+                result[cell] = flat
+        return result
+
+    def op_edges(self):
+        return list(self.hierarchy.iter_edges())
+
+    def op_connections(self, module, instance=None):
+        conns = self.connections(self.target(module))
+        if instance is not None:
+            conns = [c for c in conns if c['instance'] == instance]
+            if not conns:
+                raise DesignServerError(f"no instance '{instance}' in '{module}'")
+        return conns
+
+    def op_net(self, module, net):
+        word = re.compile(r'(?<![\w$])' + re.escape(net) + r'(?![\w$])')
+        return [[c['instance'], c['module'], port]
+                for c in self.connections(self.target(module))
+                for port, expr in c['ports'] if expr is not None and word.search(expr)]
+
+    def op_report(self, top, csv_output, cells=None, module_csv=None, aggregate=False, expand=None,
+                  paths_csv=None):
+        from verilog_counter import split_tops
+
+        # 출력 경로는 서버 기준; 워커 fork는 하지 않음 (stdout을 응답으로 돌려주므로)
+        log = io.StringIO()
+        with redirect_stdout(log):
+            self.counter(cells).report_many(split_tops(top), csv_output, module_csv, aggregate, expand, paths_csv)
+        return log.getvalue()
+
+    def op_reload(self):
+        t0 = time.perf_counter()
+        if self.design is not None:
+            changed = self.design.refresh()
+            if changed:
+                dirty = self.design.affected(changed)
+                self.hierarchy = self._ast_hierarchy()
+                for counter in self.counters.values():
+                    counter.update(self.hierarchy, dirty)
+        elif self.fast_structural:
+            self.hierarchy = AstHierarchy(scan_structural(self.verilog_files))
+            changed = set(self.hierarchy.module_names())
+            self.counters.clear()
+        else:
+            raise DesignServerError("a --db design cannot be reloaded; rebuild it and restart the server")
+        self._invalidate()
+        return {'changed': sorted(changed), 'seconds': round(time.perf_counter() - t0, 3)}
+
+    def handle(self, request: dict):
+        op = request.pop('op', None)
+        handler = getattr(self, f'op_{op}', None)
+        if handler is None:
+            raise DesignServerError(f"unknown op '{op}'")
+        with self.lock:
+            self.queries += 1
+            return handler(**request)
+
+
+# ------------------------------
+# Socket server
+# ------------------------------
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            stop = False
+            try:
+                request = json.loads(line)
+                if request.get('op') == 'shutdown':
+                    reply = {'ok': True, 'result': 'bye'}
+                    stop = True
+                else:
+                    reply = {'ok': True, 'result': service.handle(request)}
+            except (DesignServerError, TypeError, ValueError, KeyError) as e:
+                reply = {'ok': False, 'error': str(e)}
+            except OSError as e:
+                # 예: op_report의 출력 경로가 없음 -- 연결은 유지
+                reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            except Exception as e:
+                # 요청 하나 때문에 세션이 끊기지 않도록 서버 쪽에만 traceback을 남김
+                traceback.print_exc(file=sys.stderr)
+                reply = {'ok': False, 'error': f"internal error: {type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+            self.wfile.flush()
+            if stop:
+                # 응답을 보낸 뒤에 종료 (serve_forever와 다른 스레드에서 호출해야 함)
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class DesignServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: DesignService):
+        self.service = service
+        super().__init__(socket_path, _RequestHandler)
+
+
+def serve(socket_path: str, service: DesignService) -> None:
+    if os.path.exists(socket_path):
+        # 살아 있는 서버가 있으면 덮어쓰지 않음
+        try:
+            DesignClient(socket_path, timeout=1.0).close()
+        except DesignServerError:
+            os.unlink(socket_path)
+        else:
+            raise SystemExit(f"a design server is already listening on {socket_path}")
+    server = DesignServer(socket_path, service)
+    print(f"[server] {len(service.hierarchy.module_names())} modules loaded in {service.load_time:.2f}s, "
+          f"listening on {socket_path}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("[server] stopped")
+
+
+def add_server_argument(ap) -> None:
+    """Add --server SOCKET (thin-client mode) to an argparse parser."""
+    ap.add_argument('--server', default=None, metavar='SOCKET',
+                    help='Ask a running design_server.py instead of parsing (paths are resolved by the server)')
+
+
+def _parse_value(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Serve design queries over a Unix socket, or send one')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    s = sub.add_parser('serve', help='Load a design and answer queries until shutdown')
+    s.add_argument('-s', '--socket', required=True, help='Unix socket path')
+    s.add_argument('verilog', nargs='*', help='Input Verilog files')
+    s.add_argument('--db', default=None, help='Serve a design_db.py database instead of parsing')
+    s.add_argument('--cells', default=','.join(DEFAULT_CELLS),
+                   help='Default comma-separated cells for counts (default: tranif0,tranif1)')
+    q = sub.add_parser('query', help='Send one query and print the JSON result')
+    q.add_argument('-s', '--socket', required=True, help='Unix socket path')
+    q.add_argument('op', help='Query name (info, children, counts, ...)')
+    q.add_argument('args', nargs='*', metavar='KEY=VALUE', help='Arguments; values are JSON or plain strings')
+    add_fast_structural_argument(s)
+    add_jobs_argument(s)
+    add_cache_arguments(s)
+    args = ap.parse_args()
+
+    if args.cmd == 'serve':
+        if not args.verilog and not args.db:
+            ap.error('Verilog files or --db are required')
+        cells = [c.strip() for c in args.cells.split(',') if c.strip()]
+        service = DesignService(args.verilog, args.db, args.fast_structural, cells, args.jobs, cache_from_args(args))
+        serve(args.socket, service)
+        return
+
+    request = {}
+    for item in args.args:
+        key, sep, value = item.partition('=')
+        if not sep:
+            ap.error(f"expected KEY=VALUE, got '{item}'")
+        request[key] = _parse_value(value)
+    try:
+        with DesignClient(args.socket) as client:
+            result = client.query(args.op, **request)
+    except DesignServerError as e:
+        raise SystemExit(f"Error: {e}")
+    if isinstance(result, str):
+        sys.stdout.write(result if result.endswith('\n') else result + '\n')
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
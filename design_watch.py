@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Incremental re-analysis support for the netlist scripts (--watch modes).
+
+IncrementalDesign keeps the parsed modules in memory and, on refresh(), only
+re-parses files whose mtime/size changed *and* whose content hash differs, or
+one of whose `include files did. Each re-parsed module is compared by its source
+span and by local_hash() of its AST (a `define edited outside the module changes
+the latter only), so refresh() reports exactly which modules were added, removed
+or edited; affected() widens that to every module that transitively
+instantiates one of them, which is what a memoized bottom-up analysis has to
+drop.
+"""
+
+import hashlib
+import mmap
+import os
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from pyverilog.vparser.ast import ModuleDef
+from pyverilog.vparser.parser import ParseError
+from design_analysis import module_digest
+from design_hash import local_hash
+from verilog_frontend import (
+    default_cache,
+    instantiated_modules,
+    iter_module_spans,
+    normalize_defines,
+    parse_files,
+)
+from verilog_preprocess import PreprocessError, include_dependencies
+
+# 편집 중인 파일에서 생길 수 있는 오류: 다음 poll에서 다시 시도
+WATCH_ERRORS = (ParseError, PreprocessError, OSError)
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def module_digests(path: str) -> Dict[str, str]:
+    """{module name: sha1 of its module..endmodule bytes}"""
+    digests: Dict[str, str] = {}
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digests
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for name, start, end in iter_module_spans(mm):
+                digests[name] = hashlib.sha1(mm[start:end]).hexdigest()
+    return digests
+
+
+class IncrementalDesign:
+    def __init__(self, filelist, preprocess_include=None, preprocess_define=None, cache='default', jobs=1):
+        self.filelist = list(filelist)
+        self.jobs = jobs  # 바뀐 파일이 여러 개면 병렬 파싱 (첫 로드)
+        self.include = list(preprocess_include or [])
+        self.define = normalize_defines(preprocess_define)
+        self.cache = default_cache() if cache == 'default' else cache
+        self.file_state: Dict[str, Tuple[float, int, str]] = {}  # path -> (mtime, size, sha256)
+        self.file_modules: Dict[str, Dict[str, ModuleDef]] = {}
+        self.file_digests: Dict[str, Dict[str, str]] = {}
+        self.file_local_hashes: Dict[str, Dict[str, str]] = {}  # path -> {module: local_hash of the parsed AST}
+        self.children_of: Dict[str, Set[str]] = {}
+        self.module_defs: Dict[str, ModuleDef] = {}
+        self.module_hashes: Dict[str, str] = {}
+        self.file_includes: Dict[str, List[str]] = {}  # path -> `include files it reads (watched too)
+        self.failures: Dict[str, str] = {}  # path -> last reported error
+
+    def _file_changed(self, path: str) -> bool:
+        st = os.stat(path)
+        old = self.file_state.get(path)
+        if old is not None and old[:2] == (st.st_mtime, st.st_size):
+            return False
+        digest = file_digest(path)
+        self.file_state[path] = (st.st_mtime, st.st_size, digest)
+        return old is None or old[2] != digest
+
+    def refresh(self) -> Set[str]:
+        """Re-parse edited files; return the names of added/removed/edited modules.
+
+        A file counts as edited when it or one of its `include files changed. A
+        file that is missing (e.g. mid rename-save) or does not parse is reported
+        and skipped: its last good modules stay in the design and it is tried
+        again on the next refresh().
+        """
+        changed: Set[str] = set()
+        touched = set()
+        previous: Dict[str, Optional[Tuple[float, int, str]]] = {}
+        watched = dict.fromkeys(self.filelist)
+        for path in self.filelist:
+            watched.update(dict.fromkeys(self.file_includes.get(path, ())))
+        for path in watched:
+            old = self.file_state.get(path)
+            try:
+                if self._file_changed(path):
+                    touched.add(path)
+                    previous[path] = old
+            except OSError as e:
+                self._failed(path, e, previous)
+        edited = [path for path in self.filelist
+                  if path in touched or not touched.isdisjoint(self.file_includes.get(path, ()))]
+        if not edited:
+            return changed
+        for path, (definitions, _) in self._parse(edited, previous):
+            try:
+                new_digests = module_digests(path)
+                self._watch_includes(path)
+            except OSError as e:
+                self._failed(path, e, previous)
+                continue
+            for p in [path] + self.file_includes[path]:
+                self.failures.pop(p, None)
+            new_mods = {d.name: d for d in definitions if isinstance(d, ModuleDef)}
+            old_mods = self.file_modules.get(path, {})
+            old_digests = self.file_digests.get(path, {})
+            old_locals = self.file_local_hashes.get(path, {})
+            new_locals = {name: local_hash(mod) for name, mod in new_mods.items()}
+            # 텍스트가 그대로여도 `define/`include가 바뀌면 AST가 달라짐 -> local_hash도 비교
+            for name in old_mods.keys() | new_mods.keys():
+                if (name not in old_mods or name not in new_mods or old_digests.get(name) != new_digests.get(name)
+                        or old_locals.get(name) != new_locals[name]):
+                    changed.add(name)
+            self.file_modules[path] = new_mods
+            self.file_digests[path] = new_digests
+            self.file_local_hashes[path] = new_locals
+
+        if changed:
+            merged: Dict[str, ModuleDef] = {}
+            hashes: Dict[str, str] = {}
+            for path in self.filelist:
+                mods = self.file_modules.get(path, {})
+                merged.update(mods)
+                digests = self.file_digests.get(path, {})
+                locals_ = self.file_local_hashes.get(path, {})
+                hashes.update((name, f"{digests.get(name, '')}:{locals_[name]}") for name in mods)
+            self.module_defs = merged
+            self.module_hashes = hashes
+            for name in changed:
+                if name in merged:
+                    self.children_of[name] = set(instantiated_modules(merged[name]))
+                else:
+                    self.children_of.pop(name, None)
+        return changed
+
+    def _parse(self, edited, previous):
+        # 매크로를 공유하는 파일은 같이 다시 파싱됨 (텍스트는 그대로여도 `define이 바뀌었을 수 있음)
+        try:
+            return parse_files(self.filelist, self.include, self.define, self.cache, self.jobs, only=edited)
+        except WATCH_ERRORS:
+            pass
+        # 어느 파일이 문제인지 찾기 위해 하나씩 다시 시도
+        results = []
+        done = set()
+        for path in edited:
+            if path in done:
+                continue
+            try:
+                parsed = parse_files(self.filelist, self.include, self.define, self.cache, 1, only=[path])
+            except WATCH_ERRORS as e:
+                self._failed(path, e, previous)
+                continue
+            results.extend(parsed)
+            done.update(p for p, _ in parsed)
+        return results
+
+    def _watch_includes(self, path: str) -> None:
+        deps, _ = include_dependencies([path], self.include)
+        includes = [dep for _, dep in deps if dep is not None]
+        for dep in includes:
+            if dep not in self.file_state:
+                self._file_changed(dep)  # 처음 본 include 파일: 현재 상태를 기준으로 기록
+        self.file_includes[path] = includes
+
+    def _failed(self, path: str, error: Exception, previous) -> None:
+        """Keep the last good version of path and make the next refresh() try it again."""
+        for p in [path] + self.file_includes.get(path, []):
+            if p in previous:
+                old = previous.pop(p)
+                if old is None:
+                    self.file_state.pop(p, None)
+                else:
+                    self.file_state[p] = old
+        message = f"{type(error).__name__}: {error}"
+        if self.failures.get(path) != message:  # 같은 오류는 한 번만 출력
+            self.failures[path] = message
+            print(f"[watch] {path}: {message}; keeping the last good version, retrying")
+
+    def module_hash(self, mod: ModuleDef) -> str:
+        """AnalysisCache key of a loaded module (AnalysisEngine module_hash).
+
+        The key is the digest of the module's source span joined with local_hash()
+        of its parsed AST. The text alone is not enough: editing a `define in
+        another file changes the AST of a module whose text is untouched. Modules
+        that are not the loaded ones fall back to module_digest().
+        """
+        if self.module_defs.get(mod.name) is mod:
+            return self.module_hashes[mod.name]
+        return module_digest(mod)
+
+    def affected(self, changed: Set[str]) -> Set[str]:
+        """changed plus every module that transitively instantiates one of them."""
+        parents = defaultdict(set)
+        for parent, children in self.children_of.items():
+            for child in children:
+                parents[child].add(parent)
+        result = set(changed)
+        stack = list(changed)
+        while stack:
+            for parent in parents[stack.pop()]:
+                if parent not in result:
+                    result.add(parent)
+                    stack.append(parent)
+        return result
+
+
+def watch(design: IncrementalDesign, on_change: Callable[[Set[str], float], None], interval: float = 1.0) -> None:
+    """Call on_change(changed, reparse_seconds) after the first load and after each edit; Ctrl-C stops."""
+    print(f"[watch] watching {len(design.filelist)} file(s), Ctrl-C to stop")
+    pending: Set[str] = set()
+    try:
+        while True:
+            t0 = time.perf_counter()
+            pending |= design.refresh()
+            if pending:
+                try:
+                    on_change(pending, time.perf_counter() - t0)
+                except WATCH_ERRORS as e:
+                    # 예: 출력 파일을 쓸 수 없음 -- 다음 poll에서 같은 변경으로 다시 시도
+                    print(f"[watch] update failed ({type(e).__name__}: {e}); retrying")
+                else:
+                    pending = set()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("[watch] stopped")
+
+
+# ------------------------------
+# Regression check
+# ------------------------------
+
+SELF_CHECK_FILES = {
+    'defs.v': '`define CELL tranif1\n',
+    'use.v': 'module top(inout a, b, input g);\n  `CELL t0 (a, b, g);\n  mid m0 (a, b, g);\nendmodule\n',
+    'mid.v': '`define MIDCELL tranif1\nmodule mid(inout a, b, input g);\n  `MIDCELL t1 (a, b, g);\n'
+             '  leaf l0 (a);\nendmodule\n',
+    'cells.vh': '`define LEAFCELL nmos\n',
+    'leaf.v': '`include "cells.vh"\nmodule leaf(inout a);\n  `LEAFCELL n0 (a, a, a);\nendmodule\n',
+}
+
+
+def self_check() -> None:
+    """Regression check: edits that change a module's AST but not its text must reach
+    refresh() and the analysis cache -- a `define in another file, a `define outside the
+    module in the same file, and an `include file."""
+    import tempfile
+    from design_analysis import AnalysisCache
+    from design_db import AstHierarchy
+    from verilog_frontend import ParseCache
+
+    def write(path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # 같은 크기여도 mtime은 달라지게
+
+    with tempfile.TemporaryDirectory(prefix='design_watch_check_') as tmp:
+        paths = {name: os.path.join(tmp, name) for name in SELF_CHECK_FILES}
+        for label, cache in (('no cache', None), ('parse cache', ParseCache(os.path.join(tmp, 'cache')))):
+            for name, text in SELF_CHECK_FILES.items():
+                write(paths[name], text)
+            design = IncrementalDesign([paths[n] for n in ('defs.v', 'use.v', 'mid.v', 'leaf.v')],
+                                       [tmp], cache=cache)
+            analysis_cache = AnalysisCache()
+
+            def cells(name):
+                hierarchy = AstHierarchy(design.module_defs, cache=analysis_cache, module_hash=design.module_hash)
+                return [cell for _, cell, _ in hierarchy.instances(name)]
+
+            assert design.refresh() == {'top', 'mid', 'leaf'}, label
+            assert cells('top') == ['tranif1', 'mid'] and cells('mid') == ['tranif1', 'leaf'], label
+            assert cells('leaf') == ['nmos'], label
+
+            write(paths['defs.v'], '`define CELL tranif0\n')
+            assert design.refresh() == {'top'}, label
+            assert cells('top') == ['tranif0', 'mid'], (label, 'cross-file `define')
+
+            write(paths['mid.v'], SELF_CHECK_FILES['mid.v'].replace('tranif1', 'tranif0', 1))
+            assert design.refresh() == {'mid'}, label
+            assert cells('mid') == ['tranif0', 'leaf'], (label, '`define outside the module')
+
+            write(paths['cells.vh'], '`define LEAFCELL pmos\n')
+            assert design.refresh() == {'leaf'}, label
+            assert cells('leaf') == ['pmos'], (label, '`include file')
+
+            assert design.refresh() == set(), label
+            print(f"[OK] {label}")
+
+
+if __name__ == '__main__':
+    import argparse
+    from verilog_frontend import add_preprocess_arguments, preprocessor_from_args
+    ap = argparse.ArgumentParser(description='Incremental re-parse support for --watch (library); run its regression check')
+    ap.add_argument('--self-check', action='store_true', required=True,
+                    help='Edit macros in a small multi-file design and check what refresh() reports')
+    add_preprocess_arguments(ap)
+    preprocessor_from_args(ap.parse_args())
+    self_check()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Synthetic gate-level netlist generator for benchmarking the Verilog tools.
+
+The design is a layered DAG: level 0 holds the single top module, each deeper
+level holds `width` module types, and every module above the last level
+instantiates `fanout` children picked from the next level. Modules on the last
+level instantiate only primitives; the others get `glue` primitives as well.
+Instance ports are wired to random nets of the parent (ports + internal wires),
+named (.in0(n3)), positional or mixed per instance.
+
+Flattened totals are computed from the generated structure (path counts), so a
+tool's output can be checked against the returned summary.
+
+Usage:
+  python gen_netlist.py -o bench/d4 --depth 4 --fanout 8 --width 4 --prims 16 \\
+      --mix tranif1=4,tranif0=2,nmos=1,pmos=1 --ports mixed --files 4
+"""
+
+import argparse
+import json
+import os
+import random
+from collections import Counter
+from typing import Dict, List
+
+PORT_STYLES = ('named', 'positional', 'mixed')
+DEFAULT_MIX = 'tranif1=4,tranif0=2,nmos=1,pmos=1'
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """'tranif1=4,nmos=1' -> {'tranif1': 4, 'nmos': 1} (relative weights)."""
+    mix: Dict[str, int] = {}
+    for item in text.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name:
+            mix[name] = int(weight or 1)
+    if not mix:
+        raise ValueError('empty primitive mix')
+    return mix
+
+
+class NetlistSpec:
+    def __init__(self, depth: int = 3, fanout: int = 4, width: int = 2, prims: int = 8, glue: int = 2,
+                 inputs: int = 4, outputs: int = 2, wires: int = 8, mix: str = DEFAULT_MIX,
+                 ports: str = 'named', files: int = 1, seed: int = 1, top: str = 'top'):
+        if ports not in PORT_STYLES:
+            raise ValueError(f"ports must be one of {', '.join(PORT_STYLES)}")
+        self.depth = depth
+        self.fanout = fanout
+        self.width = width
+        self.prims = prims
+        self.glue = glue
+        self.inputs = inputs
+        self.outputs = outputs
+        self.wires = wires
+        self.mix = mix
+        self.ports = ports
+        self.files = max(1, files)
+        self.seed = seed
+        self.top = top
+
+    @classmethod
+    def from_string(cls, text: str) -> 'NetlistSpec':
+        """'depth=4,fanout=8,ports=mixed' (mix entries use ':' as 'mix=tranif1:4/nmos:1')."""
+        kwargs = {}
+        for item in text.split(','):
+            key, _, value = item.strip().partition('=')
+            if not key:
+                continue
+            if key == 'mix':
+                value = value.replace(':', '=').replace('/', ',')
+            kwargs[key] = value if key in ('mix', 'ports', 'top') else int(value)
+        return cls(**kwargs)
+
+    def as_dict(self) -> Dict[str, object]:
+        return dict(vars(self))
+
+    def label(self) -> str:
+        return f"d{self.depth}f{self.fanout}w{self.width}p{self.prims}{self.ports[0]}"
+
+    def module_name(self, level: int, k: int) -> str:
+        return self.top if level == 0 else f"L{level}_M{k}"
+
+    def level_width(self, level: int) -> int:
+        return 1 if level == 0 else self.width
+
+
+def generate(spec: NetlistSpec, out_dir: str) -> Dict[str, object]:
+    """Write the netlist files into out_dir; return the summary (also saved as design.json)."""
+    rng = random.Random(spec.seed)
+    mix = parse_mix(spec.mix)
+    prim_names = list(mix)
+    prim_weights = [mix[p] for p in prim_names]
+    port_names = [f'in{i}' for i in range(spec.inputs)] + [f'out{i}' for i in range(spec.outputs)]
+    nets = port_names + [f'n{i}' for i in range(spec.wires)]
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.join(out_dir, f'part{i}.v') for i in range(spec.files)]
+    handles = [open(p, 'w') for p in paths]
+    direct: Dict[str, Counter] = {}
+    children: Dict[str, List[str]] = {}
+    try:
+        n = 0
+        # 하위 레벨부터 써서 파일마다 정의 순서가 섞이지 않게 함
+        for level in range(spec.depth, -1, -1):
+            for k in range(spec.level_width(level)):
+                name = spec.module_name(level, k)
+                lines = [f"module {name} ({', '.join(port_names)});"]
+                lines.append(f"  input {', '.join(port_names[:spec.inputs])};")
+                lines.append(f"  output {', '.join(port_names[spec.inputs:])};")
+                if spec.wires:
+                    lines.append(f"  wire {', '.join(nets[len(port_names):])};")
+
+                kids: List[str] = []
+                if level < spec.depth:
+                    for i in range(spec.fanout):
+                        child = spec.module_name(level + 1, rng.randrange(spec.width))
+                        kids.append(child)
+                        conns = [rng.choice(nets) for _ in port_names]
+                        named = spec.ports == 'named' or (spec.ports == 'mixed' and rng.random() < 0.5)
+                        if named:
+                            args = ', '.join(f'.{p}({c})' for p, c in zip(port_names, conns))
+                        else:
+                            args = ', '.join(conns)
+                        lines.append(f"  {child} u{i} ({args});")
+
+                count = spec.prims if level == spec.depth else spec.glue
+                prims = Counter()
+                for i in range(count):
+                    prim = rng.choices(prim_names, prim_weights)[0]
+                    prims[prim] += 1
+                    lines.append(f"  {prim} g{i} ({', '.join(rng.choice(nets) for _ in range(3))});")
+                lines.append("endmodule")
+                lines.append("")
+
+                direct[name] = prims
+                children[name] = kids
+                handles[n % len(handles)].write('\n'.join(lines) + '\n')
+                n += 1
+    finally:
+        for f in handles:
+            f.close()
+
+    # TOP에서 평탄화했을 때의 모듈 등장 횟수 / primitive 총계
+    mult = Counter({spec.top: 1})
+    for level in range(spec.depth + 1):
+        for k in range(spec.level_width(level)):
+            name = spec.module_name(level, k)
+            for child in children[name]:
+                mult[child] += mult[name]
+    totals = Counter()
+    for name, times in mult.items():
+        for prim, c in direct[name].items():
+            totals[prim] += c * times
+
+    summary = {
+        'spec': spec.as_dict(),
+        'label': spec.label(),
+        'top': spec.top,
+        'files': paths,
+        'modules': len(direct),
+        'top_instances': [f'u{i}' for i in range(len(children[spec.top]))],
+        'leaf_module': spec.module_name(spec.depth, 0),
+        'flat_module_instances': sum(mult.values()) - 1,
+        'flat_primitives': dict(sorted(totals.items())),
+        'bytes': sum(os.path.getsize(p) for p in paths),
+    }
+    with open(os.path.join(out_dir, 'design.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def generate_cached(spec: NetlistSpec, root: str) -> Dict[str, object]:
+    """generate() into root/<label>-s<seed>, reusing an earlier run with the same spec."""
+    out_dir = os.path.join(root, f"{spec.label()}-s{spec.seed}")
+    meta = os.path.join(out_dir, 'design.json')
+    if os.path.exists(meta):
+        with open(meta) as f:
+            summary = json.load(f)
+        if summary.get('spec') == spec.as_dict() and all(os.path.exists(p) for p in summary['files']):
+            return summary
+    return generate(spec, out_dir)
+
+
+def add_spec_arguments(ap) -> None:
+    ap.add_argument('--depth', type=int, default=3, help='Hierarchy levels below the top (default: 3)')
+    ap.add_argument('--fanout', type=int, default=4, help='Child instances per non-leaf module (default: 4)')
+    ap.add_argument('--width', type=int, default=2, help='Module types per level (default: 2)')
+    ap.add_argument('--prims', type=int, default=8, help='Primitive instances per leaf module (default: 8)')
+    ap.add_argument('--glue', type=int, default=2, help='Primitive instances per non-leaf module (default: 2)')
+    ap.add_argument('--inputs', type=int, default=4, help='Input ports per module (default: 4)')
+    ap.add_argument('--outputs', type=int, default=2, help='Output ports per module (default: 2)')
+    ap.add_argument('--wires', type=int, default=8, help='Internal wires per module (default: 8)')
+    ap.add_argument('--mix', default=DEFAULT_MIX, help=f'Primitive weights (default: {DEFAULT_MIX})')
+    ap.add_argument('--ports', choices=PORT_STYLES, default='named', help='Instance port connection style')
+    ap.add_argument('--files', type=int, default=1, help='Spread the modules over N files (default: 1)')
+    ap.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    ap.add_argument('--top', default='top', help='Top module name (default: top)')
+
+
+def spec_from_args(args) -> NetlistSpec:
+    return NetlistSpec(args.depth, args.fanout, args.width, args.prims, args.glue, args.inputs, args.outputs,
+                       args.wires, args.mix, args.ports, args.files, args.seed, args.top)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Generate a synthetic layered gate-level netlist')
+    ap.add_argument('-o', '--out-dir', required=True, help='Output directory (part*.v + design.json)')
+    add_spec_arguments(ap)
+    args = ap.parse_args()
+
+    summary = generate(spec_from_args(args), args.out_dir)
+    print(f"[OK] {summary['modules']} modules, {summary['flat_module_instances']} flattened module instances, "
+          f"{sum(summary['flat_primitives'].values())} flattened primitives, {summary['bytes']} bytes")
+    for path in summary['files']:
+        print(f"  {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Columnar (Parquet / Arrow IPC) output for flattened instance listings.
+
+Instead of one InstancePath string per row, paths are prefix-compressed as a tree:
+each row stores the row index of its parent instance (Parent, -1 directly under
+the root), its Depth and its own InstanceName; the root path prefix lives in the
+schema metadata. ModuleName is dictionary-encoded against a fixed dictionary of
+every module/cell name, and the count columns are gathered per batch from a
+(name x count) table, so writing never holds more than one batch of rows.
+
+read_instance_table() rebuilds the InstancePath column level by level.
+
+Usage:
+  python instance_table.py out.parquet [--head N]      # print rows with InstancePath
+"""
+
+import argparse
+import os
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LAYOUT = b'instance-tree-v1'
+FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
+BATCH_ROWS = 65536
+
+# (parent row, depth, path prefix, instance name, module name)
+InstanceRow = Tuple[int, int, str, str, str]
+
+
+def table_format(path: str) -> Optional[str]:
+    """'parquet' / 'arrow' from the file extension, None for anything else (CSV)."""
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("pyarrow is required for Parquet/Arrow output (pip install pyarrow)")
+    return pyarrow
+
+
+def write_instance_table(rows: Iterable[InstanceRow], path: str, root: str, names: Sequence[str],
+                         count_columns: Sequence[str], counts_table: np.ndarray,
+                         batch_size: int = BATCH_ROWS) -> int:
+    """Stream rows into a Parquet/Arrow file; returns the number of rows written.
+
+    names is the ModuleName dictionary and counts_table[i] the count columns for names[i].
+    """
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    fmt = table_format(path)
+    code = {name: i for i, name in enumerate(names)}
+    dictionary = pa.array(list(names), pa.string())
+    schema = pa.schema(
+        [('Parent', pa.int64()), ('Depth', pa.int32()), ('InstanceName', pa.string()),
+         ('ModuleName', pa.dictionary(pa.int32(), pa.string()))]
+        + [(c, pa.int64()) for c in count_columns],
+        metadata={b'root': root.encode(), b'layout': LAYOUT},
+    )
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(path, schema)
+
+    parents: List[int] = []
+    depths: List[int] = []
+    inst_names: List[str] = []
+    codes: List[int] = []
+    total = 0
+
+    def flush():
+        idx = np.asarray(codes, dtype=np.int32)
+        counts = counts_table[idx]
+        columns = [
+            pa.array(parents, pa.int64()),
+            pa.array(depths, pa.int32()),
+            pa.array(inst_names, pa.string()),
+            pa.DictionaryArray.from_arrays(pa.array(idx), dictionary),
+        ] + [pa.array(counts[:, j]) for j in range(len(count_columns))]
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+        for buf in (parents, depths, inst_names, codes):
+            buf.clear()
+
+    try:
+        for parent, depth, _, inst_name, module in rows:
+            parents.append(parent)
+            depths.append(depth)
+            inst_names.append(inst_name)
+            codes.append(code[module])
+            if len(codes) >= batch_size:
+                total += len(codes)
+                flush()
+        if codes or total == 0:
+            total += len(codes)
+            flush()
+    finally:
+        writer.close()
+    return total
+
+
+def read_instance_table(path: str):
+    """Load a write_instance_table() file as a pyarrow.Table with an InstancePath column added."""
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    if table_format(path) == 'parquet':
+        table = pq.read_table(path)
+    else:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+    meta = table.schema.metadata or {}
+    if meta.get(b'layout') != LAYOUT:
+        raise ValueError(f"{path} is not an instance table")
+    root = meta[b'root'].decode()
+
+    parent = table.column('Parent').to_numpy()
+    depth = table.column('Depth').to_numpy()
+    names = np.asarray(table.column('InstanceName').to_pylist(), dtype=object)
+    paths = np.empty(len(names), dtype=object)
+    for d in range(int(depth.max()) + 1 if len(depth) else 0):
+        idx = np.nonzero(depth == d)[0]
+        paths[idx] = root + names[idx] if d == 0 else paths[parent[idx]] + '.' + names[idx]
+    return table.append_column('InstancePath', pa.array(paths.tolist(), pa.string()))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Print a Parquet/Arrow instance table with rebuilt InstancePath')
+    ap.add_argument('table', help='.parquet / .arrow file written by verilog_counter')
+    ap.add_argument('--head', type=int, default=20, help='Rows to print (default: 20)')
+    args = ap.parse_args()
+
+    table = read_instance_table(args.table)
+    cols = ['InstancePath', 'ModuleName'] + table.column_names[4:-1]
+    print(','.join(cols))
+    for row in table.slice(0, args.head).select(cols).to_pylist():
+        print(','.join(str(row[c]) for c in cols))
+    print(f"... {table.num_rows} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,125 +1,610 @@
 import re
 import argparse
-import difflib
-from typing import Dict, List, Tuple
+import bisect
+import csv
+import errno
+import glob
+import json
+import mmap
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from byte_io import COPY_CHUNK, write_all
 
-def get_comment_type_priority(line: str) -> str:
-    """Return 'line' or 'block' depending on which comment comes first, or None"""
-    line_idx = line.find('//')
-    block_idx = line.find('/*')
-    if line_idx != -1 and (block_idx == -1 or line_idx < block_idx):
-        return 'line'
-    elif block_idx != -1:
-        return 'block'
-    return None
+
+# ------------------------------
+# Lexer
+# ------------------------------
+#
+# One forward scan over the raw bytes. The scanner is a small state machine
+# (code / line comment / block comment / string) whose transitions are found with
+# one compiled regex, so runs of plain code are skipped inside the regex engine
+# instead of character by character in Python. Comments and strings are consumed
+# whole, so 'module' / 'endmodule' inside them never count, and any mix of
+# comments and code on one line is handled.
+
+# 모든 분기가 [/"me] 로 시작하도록 써서 regex 엔진의 첫 글자 필터가 걸리게 함
+LEX_RE = re.compile(
+    rb'[/"me](?:'
+    rb'(?<=/)/[^\n]*'                     # line comment
+    rb'|(?<=/)\*.*?(?:\*/|\Z)'             # block comment (an unterminated one runs to EOF)
+    rb'|(?<=")(?:\\.|[^"\\\n])*"?'         # string literal
+    rb'|(?<=m)(acromodule|odule)(?![\w$])'  # module / macromodule
+    rb'|(?<=e)(ndmodule)(?![\w$]))',       # endmodule
+    re.S,
+)
+IDENT_BYTES = frozenset(b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$\\')
+# 모듈 키워드 뒤 이름 (사이의 공백/주석 허용, escaped identifier 포함)
+MODULE_NAME_RE = re.compile(rb'(?:\s|//[^\n]*|/\*.*?\*/)*([A-Za-z_][\w$]*|\\\S+)', re.S)
+
+
+def iter_module_blocks(buf) -> Iterator[Tuple[str, int, int]]:
+    """Yield (module name, start, end) for every module in buf, widened to whole lines.
+
+    start is the beginning of the line holding 'module' and end is just past the
+    newline after 'endmodule', except where that would cut a comment or another
+    module in half: a block comment that ends on the 'module' line before the
+    keyword, and a block comment or module that starts after 'endmodule' on the
+    same line, stay outside the block. So every block can be copied, replaced or
+    commented out line by line on its own.
+    """
+    name = None
+    start = 0
+    last_token_end = 0      # 직전 주석/문자열의 끝
+    prev_end = 0            # 직전 블록의 끝
+    pending = None          # 끝 위치가 다음 토큰에 달린 블록: (name, start, endmodule 끝)
+    for m in LEX_RE.finditer(buf):
+        if (m.group(1) or m.group(2)) and m.start() > 0 and buf[m.start() - 1] in IDENT_BYTES:
+            continue  # foo_module 같은 식별자의 일부
+        if pending is not None:
+            prev_end = _block_end(buf, pending[2], m)
+            yield pending[0], pending[1], prev_end
+            pending = None
+        if m.group(1) is not None:
+            nm = MODULE_NAME_RE.match(buf, m.end())
+            name = nm.group(1).decode('utf-8', 'surrogateescape') if nm else ''
+            line_start = buf.rfind(b'\n', 0, m.start()) + 1
+            start = max(line_start, prev_end, last_token_end)
+        elif m.group(2) is not None:
+            if name is not None:
+                pending = (name, start, m.end())
+                name = None
+        else:
+            last_token_end = m.end()
+    if pending is not None:
+        yield pending[0], pending[1], _block_end(buf, pending[2], None)
+
+
+def _block_end(buf, kw_end: int, nxt) -> int:
+    nl = buf.find(b'\n', kw_end)
+    line_end = len(buf) if nl == -1 else nl + 1
+    if nxt is not None and nxt.start() < line_end and (nxt.group(1) is not None or nxt.end() > line_end):
+        return kw_end
+    return line_end
+
+
+# ------------------------------
+# Line diff
+# ------------------------------
+#
+# Lines are interned to ints, the common prefix/suffix is stripped, and the rest
+# is matched with a patience diff: lines that occur exactly once on both sides
+# are anchors (longest increasing subsequence), and the gaps between anchors are
+# diffed recursively. A gap without unique lines goes to a Myers O(ND) search
+# that gives up after max_edits edits; the gap is then replaced as a whole.
+# Blocks longer than max_lines are not diffed at all: the old block is commented
+# out and the new one inserted. Runtime is therefore bounded by the block size.
+
+DIFF_MAX_LINES = 200000     # 이보다 긴 모듈(원본+새 줄 수)은 통째로 교체
+DIFF_MAX_EDITS = 1000       # unique anchor가 없는 구간에서 Myers가 찾는 최대 편집 수
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+def diff_opcodes(a: List[str], b: List[str], max_lines: int = DIFF_MAX_LINES,
+                 max_edits: int = DIFF_MAX_EDITS) -> List[Opcode]:
+    """SequenceMatcher.get_opcodes()-style (tag, i1, i2, j1, j2) list turning a into b."""
+    if len(a) + len(b) > max_lines:
+        return _gap_opcode(0, len(a), 0, len(b))
+    table: Dict[str, int] = {}
+    x = [table.setdefault(line, len(table)) for line in a]
+    y = [table.setdefault(line, len(table)) for line in b]
+
+    pairs: List[Tuple[int, int]] = []
+    stack = [(0, len(x), 0, len(y))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        # 공통 앞/뒤 줄
+        while alo < ahi and blo < bhi and x[alo] == y[blo]:
+            pairs.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and x[ahi - 1] == y[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(x, alo, ahi, y, blo, bhi)
+        if anchors:
+            prev_i, prev_j = alo, blo
+            for i, j in anchors:
+                pairs.append((i, j))
+                stack.append((prev_i, i, prev_j, j))
+                prev_i, prev_j = i + 1, j + 1
+            stack.append((prev_i, ahi, prev_j, bhi))
+        else:
+            pairs.extend(_myers(x, alo, ahi, y, blo, bhi, max_edits))
+    pairs.sort()
+    return _pairs_to_opcodes(pairs, len(a), len(b))
+
+
+def _unique_anchors(x, alo, ahi, y, blo, bhi) -> List[Tuple[int, int]]:
+    """Patience anchors: longest increasing run of lines unique in both ranges."""
+    count: Dict[int, int] = {}
+    for v in x[alo:ahi]:
+        count[v] = count.get(v, 0) + 1
+    pos_b: Dict[int, int] = {}
+    for j in range(blo, bhi):
+        v = y[j]
+        if count.get(v) == 1:
+            pos_b[v] = -1 if v in pos_b else j
+    cand = [(i, pos_b[x[i]]) for i in range(alo, ahi) if pos_b.get(x[i], -1) >= 0]
+    if not cand:
+        return []
+    # j 기준 LIS (patience sorting)
+    tails: List[int] = []
+    tail_idx: List[int] = []
+    prev = [-1] * len(cand)
+    for n, (_, j) in enumerate(cand):
+        k = bisect.bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_idx.append(n)
+        else:
+            tails[k] = j
+            tail_idx[k] = n
+        prev[n] = tail_idx[k - 1] if k else -1
+    out = []
+    n = tail_idx[-1]
+    while n >= 0:
+        out.append(cand[n])
+        n = prev[n]
+    return out[::-1]
+
+
+def _myers(x, alo, ahi, y, blo, bhi, max_edits: int) -> List[Tuple[int, int]]:
+    """Matched (i, j) pairs of a shortest edit script, or [] past max_edits edits."""
+    n, m = ahi - alo, bhi - blo
+    max_d = min(n + m, max_edits)
+    off = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    for d in range(max_d + 1):
+        trace.append(v[off - d - 1:off + d + 2])  # k = -d-1 .. d+1
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[off + k - 1] < v[off + k + 1]):
+                i = v[off + k + 1]
+            else:
+                i = v[off + k - 1] + 1
+            j = i - k
+            while i < n and j < m and x[alo + i] == y[blo + j]:
+                i += 1
+                j += 1
+            v[off + k] = i
+            if i >= n and j >= m:
+                return _myers_backtrack(trace, n, m, alo, blo)
+    return []
+
+
+def _myers_backtrack(trace, n: int, m: int, alo: int, blo: int) -> List[Tuple[int, int]]:
+    pairs = []
+    i, j = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = i - j
+        if k == -d or (k != d and v[k - 1 + d + 1] < v[k + 1 + d + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_i = v[prev_k + d + 1]
+        prev_j = prev_i - prev_k
+        while i > prev_i and j > prev_j:
+            i -= 1
+            j -= 1
+            pairs.append((alo + i, blo + j))
+        i, j = prev_i, prev_j
+    return pairs
+
+
+def _gap_opcode(i1: int, i2: int, j1: int, j2: int) -> List[Opcode]:
+    if i1 < i2 and j1 < j2:
+        return [('replace', i1, i2, j1, j2)]
+    if i1 < i2:
+        return [('delete', i1, i2, j1, j2)]
+    if j1 < j2:
+        return [('insert', i1, i2, j1, j2)]
+    return []
+
+
+def _pairs_to_opcodes(pairs: List[Tuple[int, int]], na: int, nb: int) -> List[Opcode]:
+    ops: List[Opcode] = []
+    i = j = 0
+    for pi, pj in pairs:
+        if pi > i or pj > j:
+            ops.extend(_gap_opcode(i, pi, j, pj))
+        if ops and ops[-1][0] == 'equal' and ops[-1][2] == pi and ops[-1][4] == pj:
+            _, i1, _, j1, _ = ops[-1]
+            ops[-1] = ('equal', i1, pi + 1, j1, pj + 1)
+        else:
+            ops.append(('equal', pi, pi + 1, pj, pj + 1))
+        i, j = pi + 1, pj + 1
+    ops.extend(_gap_opcode(i, na, j, nb))
+    return ops
+
+
+def split_lines(data: bytes) -> List[str]:
+    # surrogateescape: 어떤 바이트든 그대로 되돌려 쓸 수 있음
+    return data.decode('utf-8', 'surrogateescape').splitlines(keepends=True)
+
+
+def open_buffer(f):
+    """mmap of an open binary file (b'' for an empty file)."""
+    if os.fstat(f.fileno()).st_size == 0:
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
 
 def parse_replacement_modules(path: str) -> Dict[str, List[str]]:
     """Reads the replacement Verilog file and returns a dict of {module_name: lines}"""
-    modules = {}
-    with open(path, 'r') as f:
-        lines = f.readlines()
-
-    in_module = False
-    current_name = ""
-    current_lines = []
-    in_block_comment = False
-
-    for line in lines:
-        comment_type = get_comment_type_priority(line)
-        code_part = line.split('//', 1)[0] if comment_type == 'line' else line
-
-        if in_block_comment:
-            current_lines.append(line)
-            if '*/' in code_part:
-                in_block_comment = False
-            continue
+    with open(path, 'rb') as f:
+        data = f.read()
+    return {name: split_lines(data[start:end]) for name, start, end in iter_module_blocks(data)}
+
+
+def parse_replacement_libraries(paths: List[str]) -> Dict[str, List[str]]:
+    """Merge several replacement files; a module defined again in a later file wins."""
+    merged: Dict[str, List[str]] = {}
+    origin: Dict[str, str] = {}
+    for path in paths:
+        for name, lines in parse_replacement_modules(path).items():
+            if name in merged:
+                print(f"[WARN] module '{name}' in {path} overrides the one in {origin[name]}", file=sys.stderr)
+            merged[name] = lines
+            origin[name] = path
+    return merged
+
+
+# ------------------------------
+# Module offset index
+# ------------------------------
+#
+# (name, start, end) of every module block of an original file, as
+# iter_module_blocks() reports them. For big files it is cached next to the file
+# as <file>.modidx, so replacing a few modules in a multi-GB netlist does not lex
+# the whole file again. A cached index is used while the file's size and mtime
+# match the ones recorded in it; every replaced block is lexed again when it is
+# read, and a mismatch rebuilds the index.
+
+INDEX_SUFFIX = '.modidx'
+INDEX_FORMAT = 1
+INDEX_MIN_BYTES = 16 << 20      # 이보다 작은 파일은 인덱스 파일 없이 매번 스캔
+
+
+class StaleIndexError(ValueError):
+    """The module index no longer matches the file."""
 
-        if comment_type == 'block' and '*/' not in code_part:
-            in_block_comment = True
-            current_lines.append(line)
-            continue
 
-        if not in_module:
-            match = re.match(r'\s*module\s+(\w+)', code_part)
-            if match:
-                in_module = True
-                current_name = match.group(1)
-                current_lines = [line]
+def file_stamp(st: os.stat_result) -> List[int]:
+    return [st.st_size, st.st_mtime_ns]
+
+
+def scan_module_index(path: str) -> List[Tuple[str, int, int]]:
+    with open(path, 'rb') as f:
+        buf = open_buffer(f)
+        try:
+            return list(iter_module_blocks(buf))
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+def save_module_index(index_path: str, st: os.stat_result, blocks: List[Tuple[str, int, int]]) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(index_path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'format': INDEX_FORMAT, 'stamp': file_stamp(st), 'modules': blocks}, f,
+                      separators=(',', ':'))
+        os.replace(tmp, index_path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def load_module_index(path: str, st: Optional[os.stat_result] = None, cache: bool = True,
+                      rebuild: bool = False) -> List[Tuple[str, int, int]]:
+    """Module blocks of path, from <path>.modidx when it is current (st: stat of path)."""
+    st = st or os.stat(path)
+    index_path = path + INDEX_SUFFIX
+    use_cache = cache and st.st_size >= INDEX_MIN_BYTES
+    if use_cache and not rebuild:
+        try:
+            with open(index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data and data.get('format') == INDEX_FORMAT and data.get('stamp') == file_stamp(st):
+            return [(name, start, end) for name, start, end in data['modules']]
+    blocks = scan_module_index(path)
+    if use_cache:
+        try:
+            save_module_index(index_path, st, blocks)
+        except OSError as e:
+            print(f"[WARN] cannot write module index {index_path}: {e}", file=sys.stderr)
+    return blocks
+
+
+# ------------------------------
+# Byte range copy
+# ------------------------------
+
+# 앞의 방법을 커널/파일시스템이 지원하지 않으면 다음 방법으로 내려감
+_COPY_METHODS = [m for m in ('copy_file_range', 'sendfile') if hasattr(os, m)] + ['read']
+_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def read_range(fd: int, offset: int, count: int) -> bytes:
+    parts = []
+    while count > 0:
+        if hasattr(os, 'pread'):
+            data = os.pread(fd, min(count, COPY_CHUNK), offset)
         else:
-            current_lines.append(line)
-            if re.match(r'\s*endmodule\b', code_part) and not in_block_comment:
-                in_module = False
-                modules[current_name] = current_lines
-
-    return modules
-
-
-def stream_refactor_with_diff(original_path: str, replacement_modules: Dict[str, List[str]], output_path: str):
-    """Stream process with difflib and comment out original if replaced."""
-    with open(original_path, 'r') as infile, open(output_path, 'w') as outfile:
-        in_module = False
-        in_block_comment = False
-        current_name = ""
-        current_lines = []
-
-        for line in infile:
-            comment_type = get_comment_type_priority(line)
-            code_part = line.split('//', 1)[0] if comment_type == 'line' else line
-
-            if in_block_comment:
-                current_lines.append(line)
-                if '*/' in code_part:
-                    in_block_comment = False
-                continue
+            os.lseek(fd, offset, os.SEEK_SET)
+            data = os.read(fd, min(count, COPY_CHUNK))
+        if not data:
+            raise StaleIndexError("file is shorter than its module index")
+        parts.append(data)
+        offset += len(data)
+        count -= len(data)
+    return b''.join(parts)
 
-            if comment_type == 'block' and '*/' not in code_part:
-                in_block_comment = True
-                current_lines.append(line)
-                continue
 
-            if not in_module:
-                match = re.match(r'\s*module\s+(\w+)', code_part)
-                if match:
-                    in_module = True
-                    current_name = match.group(1)
-                    current_lines = [line]
-                else:
-                    outfile.write(line)
+def copy_range(src_fd: int, dst_fd: int, offset: int, count: int) -> None:
+    """Append count bytes at offset of src_fd to dst_fd, inside the kernel where possible."""
+    while count > 0:
+        method = _COPY_METHODS[0]
+        size = min(count, COPY_CHUNK)
+        try:
+            if method == 'copy_file_range':
+                n = os.copy_file_range(src_fd, dst_fd, size, offset)
+            elif method == 'sendfile':
+                n = os.sendfile(dst_fd, src_fd, offset, size)
             else:
-                current_lines.append(line)
-                if re.match(r'\s*endmodule\b', code_part) and not in_block_comment:
-                    in_module = False
-                    if current_name in replacement_modules:
-                        original_mod = current_lines
-                        new_mod = replacement_modules[current_name]
-                        matcher = difflib.SequenceMatcher(None, original_mod, new_mod)
-                        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-                            if tag == 'equal':
-                                for l in original_mod[i1:i2]:
-                                    outfile.write(l)
-                            elif tag in ('replace', 'delete'):
-                                for l in original_mod[i1:i2]:
-                                    outfile.write(f"// {l.rstrip()}\n")
-                            if tag in ('replace', 'insert'):
-                                for l in new_mod[j1:j2]:
-                                    outfile.write(l)
-                    else:
-                        for l in current_lines:
-                            outfile.write(l)
-                    current_lines = []
+                n = write_all(dst_fd, read_range(src_fd, offset, size))
+        except OSError as e:
+            if method == 'read' or e.errno not in _COPY_UNSUPPORTED:
+                raise
+            _COPY_METHODS.pop(0)
+            continue
+        if n == 0:
+            raise StaleIndexError("file is shorter than its module index")
+        offset += n
+        count -= n
+
+
+# ------------------------------
+# Replacement
+# ------------------------------
+
+def stream_refactor_with_diff(original_path: str, replacement_modules: Dict[str, List[str]], output_path: str,
+                              max_lines: int = DIFF_MAX_LINES, max_edits: int = DIFF_MAX_EDITS,
+                              use_index: bool = True) -> List[str]:
+    """Comment out each replaced module of the original and insert the new one (line diff).
+
+    Module offsets come from load_module_index(); only the replaced modules are
+    read and decoded, everything between them is copied with copy_range().
+    Returns the names of the replaced modules in file order.
+    """
+    try:
+        return _replace_modules(original_path, replacement_modules, output_path, max_lines, max_edits,
+                                use_index, rebuild=False)
+    except StaleIndexError as e:
+        print(f"[WARN] {original_path}: {e}; rebuilding the module index", file=sys.stderr)
+        return _replace_modules(original_path, replacement_modules, output_path, max_lines, max_edits,
+                                use_index, rebuild=True)
+
+
+def _replace_modules(original_path, replacement_modules, output_path, max_lines, max_edits, use_index, rebuild):
+    replaced = []
+    with open(original_path, 'rb') as infile, open(output_path, 'wb', buffering=0) as outfile:
+        src, dst = infile.fileno(), outfile.fileno()
+        st = os.fstat(src)
+        blocks = load_module_index(original_path, st, use_index, rebuild)
+        pos = 0
+        for name, start, end in blocks:
+            if name not in replacement_modules:
+                continue
+            # 바뀌지 않는 구간은 디코딩 없이 그대로 복사
+            copy_range(src, dst, pos, start - pos)
+            pos = end
+            data = read_range(src, start, end - start)
+            found = [n for n, _, _ in iter_module_blocks(data)]
+            if found != [name]:
+                raise StaleIndexError(f"module '{name}' is not at {start}..{end} any more")
+            replaced.append(name)
+            original_mod = split_lines(data)
+            new_mod = replacement_modules[name]
+            out = []
+            for tag, i1, i2, j1, j2 in diff_opcodes(original_mod, new_mod, max_lines, max_edits):
+                if tag == 'equal':
+                    out.extend(original_mod[i1:i2])
+                elif tag in ('replace', 'delete'):
+                    out.extend(f"// {l.rstrip()}\n" for l in original_mod[i1:i2])
+                if tag in ('replace', 'insert'):
+                    out.extend(new_mod[j1:j2])
+            write_all(dst, ''.join(out).encode('utf-8', 'surrogateescape'))
+        copy_range(src, dst, pos, st.st_size - pos)
+        if file_stamp(os.fstat(src)) != file_stamp(st):
+            raise StaleIndexError("file changed while it was being copied")
+    return replaced
+
+
+# ------------------------------
+# Batch mode
+# ------------------------------
+#
+# The same replacement set applied to many netlists: the replacement files are
+# parsed once in the parent and handed to forked workers, one original per task.
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """Glob patterns (and plain paths) -> unique file list in argument order."""
+    files: List[str] = []
+    for pat in patterns:
+        matches = sorted(glob.glob(pat)) if glob.has_magic(pat) else [pat]
+        if not matches:
+            raise SystemExit(f"ERROR: no files match '{pat}'")
+        files.extend(matches)
+    return list(dict.fromkeys(files))
+
+
+def batch_outputs(originals: List[str], out_dir: str, suffix: str = '') -> List[str]:
+    """Output path per original: out_dir/<basename><suffix>, refusing collisions and in-place writes."""
+    outputs = []
+    seen: Dict[str, str] = {}
+    for src in originals:
+        base, ext = os.path.splitext(os.path.basename(src))
+        dst = os.path.join(out_dir, base + suffix + ext)
+        key = os.path.realpath(dst)
+        if key in seen:
+            raise SystemExit(f"ERROR: {src} and {seen[key]} would both be written to {dst}")
+        if key == os.path.realpath(src):
+            raise SystemExit(f"ERROR: output {dst} is the input file itself (use another --out-dir or --suffix)")
+        seen[key] = src
+        outputs.append(dst)
+    return outputs
+
+
+_batch_state = None
+
+
+def _init_batch_worker(state):
+    global _batch_state
+    _batch_state = state
+
+
+def _batch_worker(job: Tuple[str, str]) -> Tuple[str, str, List[str], float, Optional[str]]:
+    src, dst = job
+    replacements, max_lines, max_edits, use_index = _batch_state
+    t0 = time.perf_counter()
+    try:
+        replaced = stream_refactor_with_diff(src, replacements, dst, max_lines, max_edits, use_index)
+        error = None
+    except (OSError, ValueError) as e:
+        replaced, error = [], str(e)
+    return src, dst, replaced, time.perf_counter() - t0, error
+
+
+def resolve_jobs(jobs: int) -> int:
+    return (os.cpu_count() or 1) if jobs <= 0 else jobs
+
+
+def batch_replace(originals: List[str], outputs: List[str], replacements: Dict[str, List[str]], jobs: int = 1,
+                  max_lines: int = DIFF_MAX_LINES, max_edits: int = DIFF_MAX_EDITS, use_index: bool = True):
+    """Run stream_refactor_with_diff on every original; yields (src, dst, replaced, seconds, error) in order."""
+    state = (replacements, max_lines, max_edits, use_index)
+    tasks = list(zip(originals, outputs))
+    jobs = min(resolve_jobs(jobs), max(len(tasks), 1))
+    if jobs == 1:
+        _init_batch_worker(state)
+        yield from map(_batch_worker, tasks)
+        return
+    # fork면 교체 모듈 dict를 pickle 없이 물려받음
+    ctx = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx,
+                             initializer=_init_batch_worker, initargs=(state,)) as pool:
+        yield from pool.map(_batch_worker, tasks)
+
+
+def write_batch_summary(rows, path: str) -> None:
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['original', 'output', 'replaced_count', 'replaced_modules', 'seconds', 'error'])
+        for src, dst, replaced, secs, error in rows:
+            w.writerow([src, dst, len(replaced), ' '.join(replaced), f"{secs:.3f}", error or ''])
+
+
+def batch_main(args) -> int:
+    originals = expand_inputs(args.paths)
+    os.makedirs(args.out_dir, exist_ok=True)
+    outputs = batch_outputs(originals, args.out_dir, args.suffix)
+    replacements = parse_replacement_libraries(args.replacement)
+    print(f"[batch] {len(replacements)} replacement module(s), {len(originals)} file(s), jobs={args.jobs}")
+
+    rows = []
+    hits: Dict[str, int] = dict.fromkeys(replacements, 0)
+    for row in batch_replace(originals, outputs, replacements, args.jobs, args.diff_max_lines,
+                             args.diff_max_edits, not args.no_index):
+        src, dst, replaced, secs, error = row
+        rows.append(row)
+        if error:
+            print(f"[FAIL] {src}: {error}")
+            continue
+        for name in replaced:
+            hits[name] += 1
+        print(f"[OK] {src} -> {dst}: {len(replaced)} replaced ({secs:.2f}s)"
+              + (f": {', '.join(replaced)}" if replaced else ''))
+
+    failed = sum(1 for r in rows if r[4])
+    unused = [name for name, n in hits.items() if n == 0]
+    print(f"[batch] {len(rows) - failed} file(s) written, {failed} failed, "
+          f"{sum(len(r[2]) for r in rows)} module(s) replaced")
+    if unused:
+        print(f"[WARN] never found in any original: {', '.join(unused)}")
+    if args.summary:
+        write_batch_summary(rows, args.summary)
+        print(f"[batch] summary written to {args.summary}")
+    return 1 if failed else 0
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Verilog module replacer with difflib and accurate comment handling")
-    parser.add_argument("original", help="Path to the original Verilog file")
-    parser.add_argument("replacement", help="Path to the replacement Verilog file")
-    parser.add_argument("output", help="Path to write the modified Verilog file")
+    parser = argparse.ArgumentParser(
+        description="Verilog module replacer with line diff and accurate comment handling",
+        usage="%(prog)s original replacement output\n"
+              "       %(prog)s -r REPLACEMENT [-r ...] --out-dir DIR [-j N] original_or_glob ...")
+    parser.add_argument("paths", nargs='*', metavar="path",
+                        help="original replacement output; with --out-dir: original files or glob patterns")
+    parser.add_argument("-r", "--replacement", action='append', default=[],
+                        help="Batch mode: replacement file, repeatable (later files win on duplicate modules)")
+    parser.add_argument("--out-dir", default=None, help="Batch mode: directory for the output files")
+    parser.add_argument("--suffix", default='', help="Batch mode: appended to each output file stem")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Batch mode: process files in N worker processes (0 = one per core)")
+    parser.add_argument("--summary", default=None, metavar="CSV", help="Batch mode: per-file summary CSV")
+    parser.add_argument("--diff-max-lines", type=int, default=DIFF_MAX_LINES,
+                        help=f"Replace modules longer than this (old + new lines) without diffing (default: {DIFF_MAX_LINES})")
+    parser.add_argument("--diff-max-edits", type=int, default=DIFF_MAX_EDITS,
+                        help=f"Edit budget of the fallback search in regions without unique lines (default: {DIFF_MAX_EDITS})")
+    parser.add_argument("--no-index", action='store_true',
+                        help=f"Do not read or write {INDEX_SUFFIX} module offset files next to big originals "
+                             f"(>= {INDEX_MIN_BYTES >> 20} MB)")
     args = parser.parse_args()
 
-    replacements = parse_replacement_modules(args.replacement)
-    stream_refactor_with_diff(args.original, replacements, args.output)
+    if args.out_dir is not None:
+        if not args.replacement or not args.paths:
+            parser.error("batch mode needs -r/--replacement and at least one original file")
+        sys.exit(batch_main(args))
+    if len(args.paths) != 3 or args.replacement:
+        parser.error("expected: original replacement output (or use --out-dir for batch mode)")
+
+    original, replacement, output = args.paths
+    replacements = parse_replacement_modules(replacement)
+    stream_refactor_with_diff(original, replacements, output, args.diff_max_lines, args.diff_max_edits,
+                              not args.no_index)
 
 
 if __name__ == "__main__":
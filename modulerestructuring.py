@@ -1,5 +1,7 @@
 import argparse
 from pyverilog.vparser.parser import parse
+from verilog_frontend import parse_verilog, add_cache_arguments, cache_from_args
+from profiling import add_profile_arguments, profiler_from_args
 from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
 from pyverilog.vparser.ast import Decl, Input, Output, Inout
 from collections import defaultdict
@@ -104,35 +106,45 @@ def modify_top_module(ast, top_module_name, new_module_name, ports):
             module.items.append(inst_ast.description.definitions[0].items[0])
 
 
-if __name__ == "__main__":
+def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-v', '--verilog', required=True, help='Input Verilog file')
     parser.add_argument('-top', '--top_module', required=True, help='Top module name')
     parser.add_argument('-insta_list', required=True, help='File containing instance names to extract')
+    add_cache_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
 
     with open(args.insta_list, 'r') as f:
         instance_names = [line.strip() for line in f.readlines() if line.strip()]
 
-    ast, _ = parse([args.verilog])
-    instances = extract_instances(ast, args.top_module, instance_names)
-    module_port_directions = build_module_port_directions(ast)
-    ports, usage_map = determine_port_direction(instances, module_port_directions)
-    filtered_ports = filter_internal_nets(ports, usage_map, ast, args.top_module, instances)
-
-    new_module_name = "new_module"
-    new_module_code = create_new_module(new_module_name, instances, filtered_ports)
+    with profiler_from_args(args) as prof:
+        with prof.phase('parse'):
+            ast, _ = parse_verilog([args.verilog], cache=cache_from_args(args))
+        with prof.phase('analyze'):
+            instances = extract_instances(ast, args.top_module, instance_names)
+            module_port_directions = build_module_port_directions(ast)
+            ports, usage_map = determine_port_direction(instances, module_port_directions)
+            filtered_ports = filter_internal_nets(ports, usage_map, ast, args.top_module, instances)
 
-    modify_top_module(ast, args.top_module, new_module_name, filtered_ports)
+        new_module_name = "new_module"
+        with prof.phase('rewrite'):
+            new_module_code = create_new_module(new_module_name, instances, filtered_ports)
+            modify_top_module(ast, args.top_module, new_module_name, filtered_ports)
 
-    generator = ASTCodeGenerator()
-    modified_top_code = generator.visit(ast)
+        with prof.phase('emit'):
+            generator = ASTCodeGenerator()
+            modified_top_code = generator.visit(ast)
 
-    with open(f"{new_module_name}.v", 'w') as f:
-        f.write(new_module_code)
+            with open(f"{new_module_name}.v", 'w') as f:
+                f.write(new_module_code)
 
-    with open(f"modified_{args.verilog}", 'w') as f:
-        f.write(modified_top_code)
+            with open(f"modified_{args.verilog}", 'w') as f:
+                f.write(modified_top_code)
 
     print(f"Created module {new_module_name}.v and modified_{args.verilog}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Compare two netlist revisions by structural Merkle hashes (see design_hash).
+
+Each side is either Verilog files or a hash snapshot written earlier with the
+`snapshot` command, so a revision that was already hashed is not parsed again.
+Nothing is diffed textually; per module the report says:
+
+  + name             added
+  - name             removed
+  > old -> new       renamed (removed and added module with identical contents)
+  ~ name             the module itself changed
+  ^ name  (a, b)     only its subtree changed; a, b are the children that differ
+
+Exit status is 0 when the designs are identical, 1 when they differ (like diff).
+
+Usage:
+  python netlist_diff.py snapshot -o rev1.hash.json rev1/*.v
+  python netlist_diff.py diff --old rev1.hash.json --new rev2/*.v [--top TOP] [--json]
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Sequence
+
+from design_hash import DesignHashes
+from netlist_scanner import scan_structural, add_fast_structural_argument
+from verilog_frontend import parse_module_index, add_cache_arguments, add_jobs_argument, cache_from_args
+
+
+def load_hashes(paths: Sequence[str], fast_structural: bool = False, cache='default', jobs: int = 1) -> DesignHashes:
+    """A single *.json argument is a snapshot; anything else is a list of Verilog files."""
+    if len(paths) == 1 and paths[0].endswith('.json'):
+        return DesignHashes.load(paths[0])
+    if fast_structural:
+        module_defs = scan_structural(paths)
+    else:
+        _, module_defs = parse_module_index(paths, cache=cache, jobs=jobs)
+    return DesignHashes.from_modules(module_defs, {'files': list(paths)})
+
+
+def diff_hashes(old: DesignHashes, new: DesignHashes) -> Dict[str, List]:
+    """Classify modules as added / removed / renamed / changed / subtree / unchanged."""
+    removed = [n for n in old.module_names() if n not in new]
+    added = [n for n in new.module_names() if n not in old]
+
+    # 내용이 같은 삭제/추가 모듈 쌍은 이름 변경으로 봄
+    by_local: Dict[str, List[str]] = {}
+    for n in removed:
+        by_local.setdefault(old.local[n], []).append(n)
+    renamed = []
+    for n in list(added):
+        candidates = by_local.get(new.local[n])
+        if candidates:
+            o = candidates.pop(0)
+            renamed.append([o, n])
+            removed.remove(o)
+            added.remove(n)
+
+    changed, subtree, unchanged = [], [], 0
+    for n in old.module_names():
+        if n not in new:
+            continue
+        if old.local[n] != new.local[n]:
+            changed.append(n)
+        elif old.merkle[n] != new.merkle[n]:
+            via = [c for c in new.children[n] if old.merkle.get(c) != new.merkle.get(c)]
+            subtree.append([n, via])
+        else:
+            unchanged += 1
+    return {
+        'added': sorted(added),
+        'removed': sorted(removed),
+        'renamed': sorted(renamed),
+        'changed': sorted(changed),
+        'subtree': sorted(subtree),
+        'unchanged': unchanged,
+    }
+
+
+def has_differences(result: Dict[str, List]) -> bool:
+    return any(result[k] for k in ('added', 'removed', 'renamed', 'changed', 'subtree'))
+
+
+def print_diff(result: Dict[str, List], old: DesignHashes, new: DesignHashes, out=sys.stdout) -> None:
+    for n in result['added']:
+        out.write(f"+ {n}\n")
+    for n in result['removed']:
+        out.write(f"- {n}\n")
+    for o, n in result['renamed']:
+        out.write(f"> {o} -> {n}\n")
+    for n in result['changed']:
+        out.write(f"~ {n}\n")
+    for n, via in result['subtree']:
+        out.write(f"^ {n}  ({', '.join(via)})\n")
+    sys.stderr.write(
+        f"[diff] old={len(old.local)} new={len(new.local)} modules: added={len(result['added'])} "
+        f"removed={len(result['removed'])} renamed={len(result['renamed'])} changed={len(result['changed'])} "
+        f"subtree={len(result['subtree'])} unchanged={result['unchanged']}\n")
+
+
+def restrict_to_top(hashes: DesignHashes, top: str, what: str) -> DesignHashes:
+    """hashes.restrict(top); exits with an error when top is not defined in them."""
+    if top not in hashes:
+        raise SystemExit(f"ERROR: top '{top}' is not defined in the {what}")
+    return hashes.restrict(top)
+
+
+def add_load_arguments(ap) -> None:
+    ap.add_argument('--top', default=None, help='Only compare TOP and the modules below it')
+    add_fast_structural_argument(ap)
+    add_jobs_argument(ap)
+    add_cache_arguments(ap)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Diff two netlist revisions by structural module hashes')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    s = sub.add_parser('snapshot', help='Hash Verilog files and save the hashes as JSON')
+    s.add_argument('verilog', nargs='+', help='Input Verilog files')
+    s.add_argument('-o', '--out', required=True, help='Output snapshot (.json)')
+    add_load_arguments(s)
+    d = sub.add_parser('diff', help='Compare two revisions (Verilog files or snapshots)')
+    d.add_argument('--old', nargs='+', required=True, help='Old revision: Verilog files or one snapshot .json')
+    d.add_argument('--new', nargs='+', required=True, help='New revision: Verilog files or one snapshot .json')
+    d.add_argument('--json', action='store_true', help='Print the result as JSON')
+    add_load_arguments(d)
+    args = ap.parse_args()
+
+    cache = cache_from_args(args)
+    if args.cmd == 'snapshot':
+        hashes = load_hashes(args.verilog, args.fast_structural, cache, args.jobs)
+        if args.top:
+            hashes = restrict_to_top(hashes, args.top, 'input files')
+        hashes.save(args.out)
+        print(f"[OK] {len(hashes.local)} module hashes written to {args.out}")
+        return
+
+    old = load_hashes(args.old, args.fast_structural, cache, args.jobs)
+    new = load_hashes(args.new, args.fast_structural, cache, args.jobs)
+    if args.top:
+        old = restrict_to_top(old, args.top, 'old revision')
+        new = restrict_to_top(new, args.top, 'new revision')
+    result = diff_hashes(old, new)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        print_diff(result, old, new)
+    sys.exit(1 if has_differences(result) else 0)
+
+
+if __name__ == '__main__':
+    main()
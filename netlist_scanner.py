@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Streaming scanner for flat structural (gate-level) netlists.
+
+Builds the same Pyverilog nodes the yacc parser would produce -- ModuleDef,
+Portlist/Port/Ioport, Decl of Input/Output/Inout/Wire/Reg/Tri/Supply and
+InstanceList/Instance/PortArg over Identifier/Pointer/Partselect/IntConst/
+Concat/Repeat -- straight from a regex tokenizer over an mmap, one module at a
+time. Anything else inside a module (assign, always, parameters, macros,
+arithmetic, hierarchical names, ...) makes that module fall back to Pyverilog,
+so the result is always a complete {name: ModuleDef} view of the netlist.
+
+Usage:
+  python netlist_scanner.py netlist1.v [netlist2.v ...]   # per-module summary
+"""
+
+import argparse
+import mmap
+import os
+import re
+import sys
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pyverilog.vparser.lexer import VerilogLexer
+from pyverilog.vparser.ast import (
+    ModuleDef,
+    Paramlist,
+    Portlist,
+    Port,
+    Ioport,
+    Input,
+    Output,
+    Inout,
+    Wire,
+    Reg,
+    Tri,
+    Supply,
+    Decl,
+    Width,
+    InstanceList,
+    Instance,
+    ParamArg,
+    PortArg,
+    IntConst,
+    Identifier,
+    Pointer,
+    Partselect,
+    Concat,
+    Repeat,
+)
+from verilog_frontend import iter_module_spans, normalize_defines, parse_module_text
+from design_hash import local_hash
+
+TOKEN_RE = re.compile(rb"""
+    (?P<skip>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<num>[0-9]*'[sS]?[bBoOdDhH][0-9a-fA-FxXzZ?_]+|[0-9][0-9_]*)
+  | (?P<id>[A-Za-z_][A-Za-z0-9_$]*|\\\S+)
+  | (?P<op>.)
+""", re.S | re.X)
+
+RESERVED = set(VerilogLexer.reserved)
+SIGTYPES = ('input', 'output', 'inout', 'tri', 'reg', 'wire', 'signed', 'supply0', 'supply1')
+DIRECTIONS = ('input', 'output', 'inout')
+
+Token = Tuple[Optional[str], Optional[str]]  # (kind, text); (None, None) at end of module
+
+
+class StructuralFallback(Exception):
+    """Raised on anything the structural subset does not cover."""
+
+
+def tokenize(buf, start: int, end: int) -> Iterator[Token]:
+    for m in TOKEN_RE.finditer(buf, start, end):
+        if m.lastgroup != 'skip':
+            yield m.lastgroup, m.group().decode('utf-8', errors='replace')
+
+
+# ------------------------------
+# Single-module recursive descent
+# ------------------------------
+
+class ModuleScanner:
+    def __init__(self, tokens: Iterator[Token]):
+        self.tokens = tokens
+        self.kind, self.text = next(tokens, (None, None))
+
+    def advance(self) -> str:
+        text = self.text
+        self.kind, self.text = next(self.tokens, (None, None))
+        return text
+
+    def expect(self, text: str) -> None:
+        if self.text != text:
+            raise StructuralFallback(f"expected {text!r}, got {self.text!r}")
+        self.advance()
+
+    def ident(self) -> str:
+        if self.kind != 'id' or self.text in RESERVED:
+            raise StructuralFallback(f"expected identifier, got {self.text!r}")
+        return self.advance()
+
+    # -- module ------------------------------------------------------------
+
+    def parse_module(self) -> ModuleDef:
+        self.expect('module')
+        name = self.ident()
+        portlist = self.portlist()
+        items = []
+        while self.text != 'endmodule':
+            items.append(self.item())
+        self.advance()
+        return ModuleDef(name, Paramlist(params=()), portlist, tuple(items))
+
+    def portlist(self) -> Portlist:
+        if self.text == ';':
+            self.advance()
+            return Portlist(ports=())
+        self.expect('(')
+        ports = []
+        if self.text in SIGTYPES:
+            ports.append(self.ioport())
+            while self.text == ',':
+                self.advance()
+                if self.text in SIGTYPES:
+                    ports.append(self.ioport())
+                else:
+                    ports.append(self.inherit_ioport(ports, self.ident()))
+        elif self.text != ')':
+            ports.append(Port(self.ident(), None, None, None))
+            while self.text == ',':
+                self.advance()
+                ports.append(Port(self.ident(), None, None, None))
+        self.expect(')')
+        self.expect(';')
+        return Portlist(ports=tuple(ports))
+
+    def sigtypes(self) -> List[str]:
+        types = []
+        while self.text in SIGTYPES:
+            types.append(self.advance())
+        return types
+
+    def ioport(self) -> Ioport:
+        types = self.sigtypes()
+        if not any(t in DIRECTIONS for t in types) or 'supply0' in types or 'supply1' in types:
+            raise StructuralFallback(f"unsupported port type {' '.join(types)!r}")
+        width = self.width() if self.text == '[' else None
+        name = self.ident()
+        if self.text == '[':
+            raise StructuralFallback('port dimensions')
+        signed = 'signed' in types
+        first = second = None
+        for cls, t in ((Input, 'input'), (Output, 'output'), (Inout, 'inout')):
+            if t in types:
+                first = cls(name=name, width=width, signed=signed)
+        for cls, t in ((Wire, 'wire'), (Reg, 'reg'), (Tri, 'tri')):
+            if t in types:
+                second = cls(name=name, width=width, signed=signed)
+        return Ioport(first, second)
+
+    @staticmethod
+    def inherit_ioport(ports: List[Ioport], name: str) -> Optional[Ioport]:
+        # Same rules as VerilogParser.p_ioports for a bare name after 'input [3:0] a,'
+        for r in reversed(ports):
+            if isinstance(r.first, Input):
+                return Ioport(Input(name=name, width=r.first.width))
+            if isinstance(r.first, Output) and r.second is None:
+                return Ioport(Output(name=name, width=r.first.width))
+            if isinstance(r.first, Output) and isinstance(r.second, Reg):
+                return Ioport(Output(name=name, width=r.first.width), Reg(name=name, width=r.first.width))
+            if isinstance(r.first, Inout):
+                return Ioport(Inout(name=name, width=r.first.width))
+        return None
+
+    def width(self) -> Width:
+        self.expect('[')
+        msb = self.expr()
+        self.expect(':')
+        lsb = self.expr()
+        self.expect(']')
+        return Width(msb, lsb)
+
+    # -- module items ------------------------------------------------------
+
+    def item(self):
+        if self.text in SIGTYPES:
+            return self.decl()
+        if self.kind == 'id' and (self.text not in RESERVED or self.text == 'or'):
+            return self.instance(self.advance())
+        raise StructuralFallback(f"unsupported construct {self.text!r}")
+
+    def decl(self) -> Decl:
+        types = self.sigtypes()
+        if types == ['signed']:
+            raise StructuralFallback('bare signed declaration')
+        width = self.width() if self.text == '[' else None
+        names = [self.ident()]
+        while self.text == ',':
+            self.advance()
+            names.append(self.ident())
+        if self.text != ';':
+            raise StructuralFallback(f"unsupported declaration near {self.text!r}")
+        self.advance()
+        signed = 'signed' in types
+        decls = []
+        for name in names:
+            # Same node order as VerilogParser.create_decl
+            for cls, t in ((Input, 'input'), (Output, 'output'), (Inout, 'inout'),
+                           (Wire, 'wire'), (Reg, 'reg'), (Tri, 'tri')):
+                if t in types:
+                    decls.append(cls(name=name, width=width, signed=signed))
+            for value, t in (('0', 'supply0'), ('1', 'supply1')):
+                if t in types:
+                    decls.append(Supply(name=name, value=IntConst(value), width=width, signed=signed))
+        return Decl(tuple(decls))
+
+    def instance(self, module: str) -> InstanceList:
+        params = ()
+        if self.text == '#':
+            self.advance()
+            self.expect('(')
+            params = self.param_args()
+            self.expect(')')
+        bodies = []
+        if self.text == '(' and not params:
+            # unnamed primitive: and (y, a, b);
+            while True:
+                self.expect('(')
+                bodies.append(('', self.port_args(), None))
+                self.expect(')')
+                if self.text != ',':
+                    break
+                self.advance()
+        else:
+            while True:
+                name = self.ident()
+                array = self.width() if self.text == '[' else None
+                self.expect('(')
+                bodies.append((name, self.port_args(), array))
+                self.expect(')')
+                if self.text != ',':
+                    break
+                self.advance()
+        self.expect(';')
+        instances = tuple(Instance(module, name, ports, params, array) for name, ports, array in bodies)
+        return InstanceList(module, params, instances)
+
+    def param_args(self) -> tuple:
+        if self.text == ')':
+            return ()
+        named = self.text == '.'
+        args = []
+        while True:
+            if named:
+                self.expect('.')
+                pname = self.ident()
+                self.expect('(')
+                args.append(ParamArg(pname, self.expr()))
+                self.expect(')')
+            else:
+                args.append(ParamArg(None, self.expr()))
+            if self.text != ',':
+                return tuple(args)
+            self.advance()
+
+    def port_args(self) -> tuple:
+        if self.text == ')':
+            return ()
+        named = self.text == '.'
+        args = []
+        while True:
+            if named:
+                self.expect('.')
+                pname = self.ident()
+                self.expect('(')
+                if self.text == ')':
+                    args.append(PortArg(pname, None))
+                else:
+                    args.append(PortArg(pname, self.expr()))
+                self.expect(')')
+            else:
+                args.append(PortArg(None, self.expr()))
+            if self.text != ',':
+                return tuple(args)
+            self.advance()
+
+    # -- expressions -------------------------------------------------------
+
+    def expr(self):
+        if self.kind == 'num':
+            return IntConst(self.advance())
+        if self.text == '{':
+            self.advance()
+            first = self.expr()
+            if self.text == '{':
+                self.advance()
+                inner = self.expr_list('}')
+                self.expect('}')
+                return Repeat(Concat(inner), first)
+            items = [first]
+            while self.text == ',':
+                self.advance()
+                items.append(self.expr())
+            self.expect('}')
+            return Concat(tuple(items))
+        node = Identifier(self.ident())
+        if self.text == '[':
+            self.advance()
+            msb = self.expr()
+            if self.text == ':':
+                self.advance()
+                lsb = self.expr()
+                self.expect(']')
+                node = Partselect(node, msb, lsb)
+            else:
+                self.expect(']')
+                node = Pointer(node, msb)
+            if self.text == '[':
+                raise StructuralFallback('multi-dimensional select')
+        return node
+
+    def expr_list(self, closing: str) -> tuple:
+        items = [self.expr()]
+        while self.text == ',':
+            self.advance()
+            items.append(self.expr())
+        if self.text != closing:
+            raise StructuralFallback(f"expected {closing!r}, got {self.text!r}")
+        self.advance()
+        return tuple(items)
+
+
+# ------------------------------
+# File level
+# ------------------------------
+
+class ScanStats:
+    def __init__(self):
+        self.scanned = 0
+        self.fallback: Dict[str, str] = {}  # module -> reason
+        self.identical = 0                  # duplicate definitions equal to the indexed one
+
+    def report(self) -> str:
+        msg = f"[fast-structural] scanned={self.scanned} fallback={len(self.fallback)}"
+        if self.fallback:
+            shown = list(self.fallback.items())[:5]
+            msg += ' (' + '; '.join(f"{m}: {r}" for m, r in shown)
+            msg += ', ...)' if len(self.fallback) > len(shown) else ')'
+        if self.identical:
+            msg += f" identical-duplicates={self.identical}"
+        return msg
+
+
+def iter_structural_modules(path: str, preprocess_include=None, preprocess_define=None,
+                            stats: Optional[ScanStats] = None) -> Iterator[ModuleDef]:
+    """Yield one ModuleDef per module in path; only the current module is held in memory."""
+    include = list(preprocess_include or [])
+    define = normalize_defines(preprocess_define)
+    stats = stats if stats is not None else ScanStats()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for name, start, end in iter_module_spans(mm):
+                tokens = tokenize(mm, start, end)
+                try:
+                    mod = ModuleScanner(tokens).parse_module()
+                    stats.scanned += 1
+                except StructuralFallback as e:
+                    stats.fallback[name] = str(e)
+                    mod = None
+                finally:
+                    tokens.close()  # release the mmap buffer held by finditer
+                if mod is None:
+                    mod = parse_module_text(mm[start:end].decode('utf-8', errors='replace'), include, define)
+                yield mod
+
+
+def scan_structural(filelist: Sequence[str], preprocess_include=None, preprocess_define=None) -> Dict[str, ModuleDef]:
+    """Drop-in for build_module_defs(parse(...)): {module name: ModuleDef}."""
+    stats = ScanStats()
+    index: Dict[str, ModuleDef] = {}
+    origin: Dict[str, str] = {}
+    for path in filelist:
+        for mod in iter_structural_modules(path, preprocess_include, preprocess_define, stats):
+            if mod.name in index:
+                if local_hash(mod) == local_hash(index[mod.name]):
+                    stats.identical += 1
+                    continue
+                sys.stderr.write(f"[WARN] Duplicate module definition: {mod.name} ({origin[mod.name]}, {path})\n")
+            index[mod.name] = mod
+            origin[mod.name] = path
+    sys.stderr.write(stats.report() + '\n')
+    return index
+
+
+def add_fast_structural_argument(ap) -> None:
+    ap.add_argument('--fast-structural', action='store_true',
+                    help='Scan gate-level modules without pyverilog (behavioral modules fall back to it)')
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Scan structural Verilog netlists without the yacc parser')
+    ap.add_argument('verilog', nargs='+', help='Input Verilog files')
+    args = ap.parse_args()
+
+    stats = ScanStats()
+    for path in args.verilog:
+        for mod in iter_structural_modules(path, stats=stats):
+            n_inst = sum(len(item.instances) for item in mod.items if isinstance(item, InstanceList))
+            n_ports = len(mod.portlist.ports) if mod.portlist else 0
+            print(f"{mod.name}\tports={n_ports}\tinstances={n_inst}")
+    sys.stderr.write(stats.report() + '\n')
+
+
+if __name__ == '__main__':
+    main()
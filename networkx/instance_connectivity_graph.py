@@ -1,8 +1,11 @@
+import os
+import sys
 from typing import List, Optional
-from pyverilog.vparser.parser import parse
-from pyverilog.vparser.ast import ModuleDef, InstanceList, PortArg, Input, Output, Inout, Node
+from pyverilog.vparser.ast import ModuleDef, InstanceList, PortArg, Input, Output, Inout, Node, Decl, Ioport
 import networkx as nx
-import matplotlib.pyplot as plt
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from verilog_frontend import parse_verilog
 
 class ModuleInterface:
     def __init__(self, name: str):
@@ -32,17 +35,20 @@ class ModuleInterface:
     def create_from_module_def(module_def: ModuleDef) -> "ModuleInterface":
         interface = ModuleInterface(module_def.name)
 
-        # Port order
+        # Port order (ANSI 포트는 Ioport 안에 방향이 같이 있음)
         if module_def.portlist:
             for port in module_def.portlist.ports:
-                interface.port_order.append(port.name)
+                if isinstance(port, Ioport):
+                    interface.port_order.append(port.first.name)
+                    interface.port_directions[port.first.name] = port.first.__class__.__name__.lower()
+                else:
+                    interface.port_order.append(port.name)
 
-        # Port directions
+        # Port directions ('input a, b;'는 Decl 하나에 묶여 있음)
         for item in module_def.items:
-            if isinstance(item, (Input, Output, Inout)):
-                direction = item.__class__.__name__.lower()
-                for name in item.names:
-                    interface.port_directions[name] = direction
+            for decl in (item.list if isinstance(item, Decl) else (item,)):
+                if isinstance(decl, (Input, Output, Inout)):
+                    interface.port_directions[decl.name] = decl.__class__.__name__.lower()
 
         interface.validate()
         return interface
@@ -156,6 +162,8 @@ class GraphCreator:
         return self.graph
 
 def draw_connectivity_graph(G: nx.Graph) -> None:
+    import matplotlib.pyplot as plt  # 그릴 때만 필요
+
     pos = nx.spring_layout(G, seed=42)
 
     net_colors = {
@@ -192,8 +200,10 @@ def draw_connectivity_graph(G: nx.Graph) -> None:
     plt.tight_layout()
     plt.show()
 
-def main(filename: str, target_module_name: str) -> nx.Graph:
-    ast, _ = parse([filename])
+def main(filename, target_module_name: str, ast: Optional[Node] = None) -> nx.Graph:
+    # filename: 파일 하나 또는 파일 목록 (ast를 주면 파싱 생략)
+    if ast is None:
+        ast, _ = parse_verilog([filename] if isinstance(filename, str) else list(filename))
 
     # Step 1: Create all module interfaces
     module_defs = create_module_interfaces(ast)
@@ -244,7 +254,8 @@ def find_equivalent_connectivity_modules(module_defs: List[ModuleInterface], ast
             elif d["type"] == "net":
                 types["net"] += 1
                 directions[d.get("direction")] += 1
-        return (types, directions, modules)
+        # Counter는 dict 키로 쓸 수 없으므로 frozenset으로
+        return tuple(frozenset(c.items()) for c in (types, directions, modules))
 
     for name, g in graphs.items():
         summaries[name] = module_summary(g)
@@ -284,3 +295,22 @@ def find_equivalent_connectivity_modules(module_defs: List[ModuleInterface], ast
 # Example usage:
 # graph = main("your_file.v", "your_module_name")
 # draw_connectivity_graph(graph)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Instance/net connectivity graph of one module")
+    ap.add_argument("verilog", nargs="+", help="Input Verilog files")
+    ap.add_argument("-t", "--top", required=True, help="Module to build the graph for")
+    ap.add_argument("--equivalent", action="store_true",
+                    help="Also list groups of modules with isomorphic connectivity")
+    ap.add_argument("--draw", action="store_true", help="Show the graph with matplotlib")
+    args = ap.parse_args()
+
+    ast, _ = parse_verilog(args.verilog)
+    graph = main(args.verilog, args.top, ast)
+    if args.equivalent:
+        print("\nEquivalent modules:")
+        for cluster in find_equivalent_connectivity_modules(create_module_interfaces(ast), ast):
+            print(", ".join(sorted(cluster)))
+    if args.draw:
+        draw_connectivity_graph(graph)
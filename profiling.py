@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Phase-level profiling for the netlist CLIs (--profile and friends).
+
+A script wraps its main work in a Profiler and its steps in profiler.phase(name),
+or, in long straight-line code, starts each step with profiler.mark(name):
+
+    with profiler_from_args(args) as prof:
+        with prof.phase('parse'):
+            ast, _ = parse_verilog(...)
+        prof.mark('emit')          # runs until the next mark() or the end
+        write_verilog(ast, f)
+
+Per phase it records wall time, CPU time, current RSS, the RSS high-water mark so
+far and the number of GC-tracked objects, and prints the table to stderr at the
+end. Optionally the whole run is also profiled with cProfile (pstats file, open
+with `python -m pstats FILE` or snakeviz) and/or sampled with SIGPROF into a
+collapsed-stack file for flamegraph.pl / speedscope; sampled stacks are rooted at
+the phase they were taken in.
+
+A disabled Profiler (the default, NULL_PROFILER) makes phase() and mark() no-ops.
+"""
+
+import cProfile
+import gc
+import json
+import os
+import resource
+import signal
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+def maxrss_mb(usage=None) -> float:
+    """Peak RSS in MB of an rusage (default: this process so far)."""
+    usage = usage or resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss: KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss * scale / (1024 * 1024), 1)
+
+
+def current_rss_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+
+class StackSampler:
+    """SIGPROF sampler (CPU time) producing flamegraph collapsed stacks: 'a;b;c count'."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        if not hasattr(signal, 'setitimer'):
+            raise SystemExit("--profile-collapsed needs setitimer/SIGPROF (not available on this platform)")
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.root = 'main'
+        self._previous = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.append(self.root)
+        self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous or signal.SIG_DFL)
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, pstats_path: Optional[str] = None,
+                 collapsed_path: Optional[str] = None, json_path: Optional[str] = None,
+                 count_objects: bool = True, interval: float = DEFAULT_SAMPLE_INTERVAL, out=None):
+        self.enabled = enabled or bool(pstats_path or collapsed_path or json_path)
+        self.pstats_path = pstats_path
+        self.collapsed_path = collapsed_path
+        self.json_path = json_path
+        self.count_objects = count_objects
+        self.interval = interval
+        self.out = out
+        self.rows: List[Dict[str, object]] = []
+        self._cprofile = None
+        self._sampler = None
+        self._marked = None
+        self._t0 = self._c0 = 0.0
+
+    def __enter__(self) -> 'Profiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.finish()
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        if self.collapsed_path:
+            self._sampler = StackSampler(self.interval)
+            self._sampler.start()
+        if self.pstats_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return nullcontext()
+        return self._phase(name)
+
+    def mark(self, name: str) -> None:
+        """End the phase opened by the previous mark() (if any) and start name."""
+        if not self.enabled:
+            return
+        self._end_mark()
+        self._marked = self._phase(name)
+        self._marked.__enter__()
+
+    def _end_mark(self) -> None:
+        if self._marked is not None:
+            marked, self._marked = self._marked, None
+            marked.__exit__(None, None, None)
+
+    @contextmanager
+    def _phase(self, name: str):
+        if self._sampler is not None:
+            outer, self._sampler.root = self._sampler.root, f'{self._sampler.root};{name}'
+        t0 = time.perf_counter()
+        c0 = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            cpu = time.process_time() - c0
+            if self._sampler is not None:
+                self._sampler.root = outer
+            self.rows.append(self._row(name, wall, cpu))
+
+    def _row(self, name: str, wall: float, cpu: float) -> Dict[str, object]:
+        row = {
+            'phase': name,
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'rss_mb': current_rss_mb(),
+            'peak_rss_mb': maxrss_mb(),
+        }
+        if self.count_objects:
+            row['objects'] = len(gc.get_objects())
+        return row
+
+    def finish(self) -> None:
+        if not self.enabled:
+            return
+        self._end_mark()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.pstats_path)
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler.write(self.collapsed_path)
+        self.rows.append(self._row('total', time.perf_counter() - self._t0, time.process_time() - self._c0))
+        if self.json_path:
+            with open(self.json_path, 'w') as f:
+                json.dump(self.rows, f, indent=2)
+        self.report()
+
+    def report(self) -> None:
+        out = self.out or sys.stderr
+        out.write(f"[profile] {'phase':<16} {'wall s':>9} {'cpu s':>9} {'rss MB':>8} {'peak MB':>8} {'objects':>10}\n")
+        for row in self.rows:
+            rss = '-' if row['rss_mb'] is None else f"{row['rss_mb']:.1f}"
+            out.write(f"[profile] {row['phase']:<16} {row['wall_s']:>9.3f} {row['cpu_s']:>9.3f} {rss:>8} "
+                      f"{row['peak_rss_mb']:>8.1f} {row.get('objects', '-'):>10}\n")
+        for label, path in (('pstats', self.pstats_path), ('collapsed stacks', self.collapsed_path),
+                            ('phase table', self.json_path)):
+            if path:
+                out.write(f"[profile] {label} written to {path}\n")
+
+
+NULL_PROFILER = Profiler()
+
+
+def add_profile_arguments(ap) -> None:
+    """Add --profile/--profile-pstats/--profile-collapsed/--profile-json to an argparse parser."""
+    ap.add_argument('--profile', action='store_true',
+                    help='Print per-phase wall/CPU time, RSS and object counts to stderr')
+    ap.add_argument('--profile-pstats', default=None, metavar='FILE',
+                    help='Also run cProfile and write pstats data to FILE (implies --profile)')
+    ap.add_argument('--profile-collapsed', default=None, metavar='FILE',
+                    help='Also sample stacks into a flamegraph-compatible collapsed file (implies --profile)')
+    ap.add_argument('--profile-json', default=None, metavar='FILE',
+                    help='Write the per-phase table as JSON (implies --profile)')
+
+
+def profiler_from_args(args) -> Profiler:
+    return Profiler(getattr(args, 'profile', False), getattr(args, 'profile_pstats', None),
+                    getattr(args, 'profile_collapsed', None), getattr(args, 'profile_json', None))
@@ -8,42 +8,69 @@ PyVerilog로 다음을 수행:
 """
 
 import argparse
-from pyverilog.vparser.parser import parse
+from verilog_frontend import (
+    parse_verilog, parse_module_text, make_source, add_cache_arguments, cache_from_args,
+    add_preprocess_arguments, preprocessor_from_args
+)
+from verilog_preprocess import PreprocessError
+from netlist_scanner import scan_structural, add_fast_structural_argument
+from design_db import AstHierarchy, DesignDB
 from pyverilog.vparser.ast import (
-    NodeVisitor, ModuleDef, Decl, Input, Output, Inout,
-    Parameter, Localparam, InstanceList
+    ModuleDef, Decl, Input, Output, Inout,
+    Parameter, Localparam
 )
-from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+from verilog_emitter import write_verilog
+from profiling import NULL_PROFILER, add_profile_arguments, profiler_from_args
 
-# --- 1) TOP의 직접 자식 모듈 수집기 -----------------------------------------
-class InstModuleCollector(NodeVisitor):
-    def __init__(self):
-        self.children = set()
+# --- 1) 모듈별 직접 자식 모듈 (generate 내부 포함, 모듈당 AST 한 번만 순회) ------
+def build_hierarchy(ast_root):
+    return AstHierarchy({d.name: d for d in getattr(ast_root.description, 'definitions', [])
+                         if isinstance(d, ModuleDef)})
 
-    def visit_InstanceList(self, node: InstanceList):
-        # InstanceList.module: 인스턴스화된 모듈의 이름 (str)
-        if hasattr(node, 'module'):
-            self.children.add(node.module)
-        self.generic_visit(node)
+def instantiated_children(hierarchy, name):
+    return {child for _, child in hierarchy.children(name, include_generate=True)}
 
 # --- 2) TOP 추정(명시가 없을 때) ---------------------------------------------
-def autodetect_top(ast_root, explicit_top=None):
+def autodetect_top(hierarchy, explicit_top=None):
     if explicit_top:
         return explicit_top
 
-    modules = set()
     instantiated = set()
-    for d in getattr(ast_root.description, 'definitions', []):
-        if isinstance(d, ModuleDef):
-            modules.add(d.name)
-            col = InstModuleCollector()
-            col.visit(d)
-            instantiated |= col.children
+    for name in hierarchy.module_names():
+        instantiated |= instantiated_children(hierarchy, name)
 
     # 인스턴스되지 않은 정의를 TOP 후보로 보고 첫 번째를 선택
-    candidates = [m for m in modules if m not in instantiated]
+    candidates = [m for m in hierarchy.module_names() if m not in instantiated]
     return candidates[0] if candidates else None
 
+# --- 2b) design DB에서 TOP + 직접 자식 모듈만 골라 파싱 ------------------------
+def load_top_and_children_from_db(db_path, explicit_top, incdir, defines):
+    db = DesignDB.open(db_path)
+    top_name = explicit_top
+    if not top_name:
+        instantiated = set()
+        for cid in range(db.num_modules):
+            instantiated.update(db.child_cells(cid))
+        candidates = [db.cell_name(c) for c in range(db.num_modules) if c not in instantiated]
+        top_name = candidates[0] if candidates else None
+    if top_name is None or top_name not in db:
+        return make_source([])
+
+    keep = {top_name} | {child for _, child in db.children(top_name, include_generate=True)}
+    defs = []
+    for name in db.module_names():
+        if name not in keep:
+            continue
+        span = db.source_span(name)
+        if span is None:
+            raise SystemExit(f"ERROR: DB에 '{name}' 모듈의 소스 위치가 없습니다.")
+        path, start, end = span
+        with open(path, 'rb') as f:
+            f.seek(start)
+            text = f.read(end - start).decode('utf-8', errors='replace')
+        defs.append(parse_module_text(text, incdir, defines))
+    return make_source(defs)
+
 # --- 3) 시그니처(포트/파라미터)만 남기기 --------------------------------------
 def keep_signature_only(items):
     kept = []
@@ -57,16 +84,8 @@ def keep_signature_only(items):
         # 그 외(Always, Assign, InstanceList, Generate 등)는 버림
     return kept
 
-# --- 4) 메인 ---------------------------------------------------------------
-def main():
-    ap = argparse.ArgumentParser(description="Keep TOP, stub its direct children, drop others (PyVerilog).")
-    ap.add_argument('sources', nargs='+', help='Verilog sources (*.v)')
-    ap.add_argument('-t', '--top', help='Top module name (if omitted, auto-detect)')
-    ap.add_argument('-I', '--incdir', action='append', default=[], help='include search dir')
-    ap.add_argument('-D', '--define', action='append', default=[], help='macro define (e.g. FOO=1)')
-    ap.add_argument('-o', '--out', default='pruned.v', help='output verilog file')
-    args = ap.parse_args()
-
+# --- 4) TOP 유지 + 자식 스텁 + 출력 ---------------------------------------
+def prune_design(args, prof=NULL_PROFILER):
     # PyVerilog 전처리 define 형식 맞추기
     defines = []
     for d in args.define:
@@ -76,13 +95,22 @@ def main():
         else:
             defines.append((d, None))
 
-    ast, _ = parse(
-        args.sources,
-        preprocess_include=args.incdir,
-        preprocess_define=defines
-    )
-
-    top_name = autodetect_top(ast, args.top)
+    prof.mark('parse')
+    if args.db:
+        ast = load_top_and_children_from_db(args.db, args.top, args.incdir, defines)
+    elif args.fast_structural:
+        ast = make_source(scan_structural(args.sources, args.incdir, defines).values())
+    else:
+        ast, _ = parse_verilog(
+            args.sources,
+            preprocess_include=args.incdir,
+            preprocess_define=defines,
+            cache=cache_from_args(args)
+        )
+
+    prof.mark('hierarchy')
+    hierarchy = build_hierarchy(ast)
+    top_name = autodetect_top(hierarchy, args.top)
     if not top_name:
         raise SystemExit("ERROR: TOP을 찾지 못했습니다. --top 으로 지정하세요.")
 
@@ -96,10 +124,9 @@ def main():
         raise SystemExit(f"ERROR: 지정한 TOP '{top_name}' 모듈 정의를 찾을 수 없습니다.")
 
     # TOP의 직접 하위 모듈 수집
-    col = InstModuleCollector()
-    col.visit(top_def)
-    direct_children = col.children
+    direct_children = instantiated_children(hierarchy, top_name)
 
+    prof.mark('prune')
     # 정의 목록 재구성
     new_defs = []
     for d in ast.description.definitions:
@@ -118,18 +145,40 @@ def main():
             # 그 외 모듈은 버림
             pass
 
-    # 결과를 AST에 반영하고 코드 생성
+    prof.mark('emit')
+    # 결과를 AST에 반영하고 모듈 단위로 바로 파일에 기록
     ast.description.definitions = tuple(new_defs)
-    codegen = ASTCodeGenerator()
-    verilog_out = codegen.visit(ast)
-
     with open(args.out, 'w', encoding='utf-8') as f:
-        f.write(verilog_out)
+        write_verilog(ast, f)
 
     kept = [d.name for d in new_defs]
     print(f"[OK] Wrote {args.out}")
     print(f" Top      : {top_name}")
     print(f" Kept mods: {', '.join(kept)}")
 
+# --- 5) 메인 ---------------------------------------------------------------
+def main():
+    ap = argparse.ArgumentParser(description="Keep TOP, stub its direct children, drop others (PyVerilog).")
+    ap.add_argument('sources', nargs='*', help='Verilog sources (*.v)')
+    ap.add_argument('-t', '--top', help='Top module name (if omitted, auto-detect)')
+    ap.add_argument('-I', '--incdir', action='append', default=[], help='include search dir')
+    ap.add_argument('-D', '--define', action='append', default=[], help='macro define (e.g. FOO=1)')
+    ap.add_argument('-o', '--out', default='pruned.v', help='output verilog file')
+    ap.add_argument('--db', default=None, help='design_db.py database: parse only TOP and its direct children')
+    add_fast_structural_argument(ap)
+    add_cache_arguments(ap)
+    add_preprocess_arguments(ap)
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+    if not args.sources and not args.db:
+        ap.error('Verilog sources or --db are required')
+    preprocessor_from_args(args)
+
+    with profiler_from_args(args) as prof:
+        try:
+            prune_design(args, prof)
+        except PreprocessError as e:
+            raise SystemExit(f"ERROR: {e}")
+
 if __name__ == '__main__':
     main()
@@ -24,7 +24,7 @@ import copy
 import re
 from typing import Dict, Set, Tuple, List, Optional
 
-from pyverilog.vparser.parser import parse
+from verilog_frontend import parse_module_index, add_cache_arguments, add_jobs_argument, cache_from_args
 from pyverilog.vparser.ast import (
     ModuleDef,
     Ioport,
@@ -47,7 +47,8 @@ from pyverilog.vparser.ast import (
     Concat,
     Repeat,
 )
-from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+from verilog_emitter import StreamingCodeGenerator, write_verilog
+from profiling import NULL_PROFILER, add_profile_arguments, profiler_from_args
 
 # ------------------------------
 # Utilities
@@ -289,7 +290,7 @@ class ExternalRewriter:
         self.symtab = symtab
         self.dir_context = dir_context
         self.port_map = port_map
-        self.codegen = ASTCodeGenerator()
+        self.codegen = StreamingCodeGenerator()
 
     def is_pure_external(self, expr) -> bool:
         ids: Set[str] = set()
@@ -367,26 +368,19 @@ class ExternalRewriter:
 # Main flow
 # ------------------------------
 
-def main():
-    ap = argparse.ArgumentParser(description='submod-like pass using Pyverilog (v3)')
-    ap.add_argument('-f', '--file', required=True, help='Path to instance list file')
-    ap.add_argument('-t', '--target', required=True, help='Target module name')
-    ap.add_argument('-n', '--name', default=None, help='New submodule name (optional)')
-    ap.add_argument('-o', '--out', default='-', help='Output file (default: stdout)')
-    ap.add_argument('verilog', nargs='+', help='Input Verilog files')
-    args = ap.parse_args()
-
+def run_submod(args, prof=NULL_PROFILER):
     inst_names = read_instance_list(args.file)
     if not inst_names:
         sys.stderr.write('[ERROR] Instance list is empty or not found.\n')
         sys.exit(1)
 
-    ast, _ = parse(args.verilog)
-    mod_index = build_module_index(ast)
+    prof.mark('parse')
+    ast, mod_index = parse_module_index(args.verilog, cache=cache_from_args(args), jobs=args.jobs)
     if args.target not in mod_index:
         sys.stderr.write(f"[ERROR] Module {args.target} not found.\n")
         sys.exit(1)
 
+    prof.mark('analyze')
     target_mod = mod_index[args.target]
     module_meta = build_module_meta_index(ast)  # dirs + order for all modules
     symtab = decl_width_symtab(target_mod)
@@ -408,6 +402,7 @@ def main():
             i += 1
             newmod_name = f"{base}_{i}"
 
+    prof.mark('rewrite')
     # Rewrite selected instances (replace external subexprs with new ports)
     port_map = {}  # key -> {'name', 'expr', 'width', 'dirs'}
     rewritten_ilists = []
@@ -499,14 +494,29 @@ def main():
     new_ilist = InstanceList(newmod_name, None, [new_inst])
     target_mod.items.append(new_ilist)
 
-    # Emit code
-    codegen = ASTCodeGenerator()
-    result = codegen.visit(ast)
+    prof.mark('emit')
+    # Emit code (streamed module by module)
     if args.out == '-' or args.out == '/dev/stdout':
-        sys.stdout.write(result)
+        write_verilog(ast, sys.stdout)
     else:
         with open(args.out, 'w') as f:
-            f.write(result)
+            write_verilog(ast, f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='submod-like pass using Pyverilog (v3)')
+    ap.add_argument('-f', '--file', required=True, help='Path to instance list file')
+    ap.add_argument('-t', '--target', required=True, help='Target module name')
+    ap.add_argument('-n', '--name', default=None, help='New submodule name (optional)')
+    ap.add_argument('-o', '--out', default='-', help='Output file (default: stdout)')
+    ap.add_argument('verilog', nargs='+', help='Input Verilog files')
+    add_jobs_argument(ap)
+    add_cache_arguments(ap)
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+
+    with profiler_from_args(args) as prof:
+        run_submod(args, prof)
 
 
 if __name__ == '__main__':
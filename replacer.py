@@ -1,89 +1,613 @@
 import argparse
-from pyverilog.vparser.parser import parse
-from pyverilog.vparser.ast import InstanceList, Instance
-from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+import csv
+import mmap
+import os
+import re
+import sys
+import tempfile
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from verilog_frontend import parse_verilog, add_cache_arguments, cache_from_args, iter_module_spans
+from netlist_scanner import TOKEN_RE, RESERVED
+from byte_io import COPY_CHUNK, write_all
+from pyverilog.vparser.ast import InstanceList
+from verilog_emitter import write_verilog
+from profiling import add_profile_arguments, profiler_from_args
 
 
-def replace_module_instance(ast, replace_dict):
+# ------------------------------
+# Rename rules
+# ------------------------------
+
+RULE_SYNTAX = """\
+rule syntax:  OLD=NEW[;parent=PAT][;inst=PAT]
+  OLD          exact module name, 'glob:GLOB' or 're:REGEX' (matched against the whole name)
+  NEW          new module name; for glob/re rules \\1, \\g<name>, \\g<0> refer to the
+               match (each glob wildcard * ? [..] is one group)
+  parent=PAT   only instances inside modules matching PAT (same pattern syntax)
+  inst=PAT     only instances whose instance name matches PAT (not in --splice mode)
+Rules are tried in the order given; the first matching rule decides.
+--rules FILE takes one rule per line ('#' starts a comment line)."""
+
+
+def glob_to_regex(pattern: str) -> str:
+    """fnmatch-style glob -> regex source with one capture group per wildcard."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '*':
+            out.append('(.*)')
+        elif c == '?':
+            out.append('(.)')
+        elif c == '[' and pattern.find(']', i + 2) > 0:
+            j = pattern.find(']', i + 2)
+            body = pattern[i + 1:j]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            out.append('([' + body.replace('\\', '\\\\') + '])')
+            i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def regex_literal_prefix(source: str) -> str:
+    # 항상 이 문자열로 시작해야만 매치되는 앞부분 ('|'가 있으면 알 수 없으므로 '')
+    if '|' in source:
+        return ''
+    prefix = re.match(r'[^.^$*+?{}\[\]\\|()]*', source).group()
+    if prefix and source[len(prefix):len(prefix) + 1] in ('*', '?', '{'):
+        prefix = prefix[:-1]
+    return prefix
+
+
+class NamePattern:
+    """Exact name, 'glob:GLOB' or 're:REGEX', matched against a whole name."""
+
+    def __init__(self, text: str):
+        self.text = text
+        if text.startswith('re:'):
+            self.regex = re.compile(text[3:])
+            self.prefix = regex_literal_prefix(text[3:])
+        elif text.startswith('glob:'):
+            self.regex = re.compile(glob_to_regex(text[5:]))
+            self.prefix = re.split(r'[*?\[]', text[5:], maxsplit=1)[0]
+        else:
+            self.regex = None
+            self.prefix = text
+
+    def match(self, name: str):
+        if self.regex is None:
+            return name == self.text
+        return self.regex.fullmatch(name)
+
+
+TEMPLATE_REF_RE = re.compile(r'\\(?:g<(\w+)>|(\d\d?))')
+
+
+def compile_template(template: str, regex) -> Optional[list]:
+    """Split a substitution template into literals and group refs (None: leave it to Match.expand)."""
+    parts = []
+    pos = 0
+    for m in TEMPLATE_REF_RE.finditer(template):
+        parts.append(template[pos:m.start()])
+        ref = m.group(1) or m.group(2)
+        ref = int(ref) if ref.isdigit() else ref
+        if ref not in regex.groupindex and not (isinstance(ref, int) and ref <= regex.groups):
+            raise ValueError(f"invalid group reference {m.group()} in '{template}'")
+        parts.append(ref)
+        pos = m.end()
+    parts.append(template[pos:])
+    if any(isinstance(p, str) and '\\' in p for p in parts):
+        return None
+    return parts
+
+
+class RenameRule:
+    def __init__(self, index: int, text: str, old: NamePattern, new: str,
+                 parent: Optional[NamePattern] = None, inst: Optional[NamePattern] = None):
+        self.index = index
+        self.text = text
+        self.old = old
+        self.new = new
+        self.parent = parent
+        self.inst = inst
+        self._parent_ok: Dict[str, bool] = {}
+        # Match.expand()는 호출마다 템플릿을 다시 파싱하므로 미리 나눠 둠
+        self.template = compile_template(new, old.regex) if old.regex is not None else None
+
+    @classmethod
+    def parse(cls, index: int, text: str) -> 'RenameRule':
+        head, *options = text.split(';')
+        old, sep, new = head.rpartition('=')
+        if not sep or not old or not new:
+            raise ValueError(f"Invalid format for replace rule: {text}")
+        scopes = {}
+        for opt in options:
+            key, sep, value = opt.partition('=')
+            if key.strip() not in ('parent', 'inst') or not sep or not value:
+                raise ValueError(f"Invalid scope '{opt}' in replace rule: {text}")
+            scopes[key.strip()] = NamePattern(value.strip())
+        return cls(index, text, NamePattern(old.strip()), new.strip(), scopes.get('parent'), scopes.get('inst'))
+
+    def rename(self, module: str) -> Optional[str]:
+        m = self.old.match(module)
+        if not m:
+            return None
+        if self.old.regex is None:
+            return self.new
+        if self.template is not None:
+            return ''.join(p if isinstance(p, str) else (m.group(p) or '') for p in self.template)
+        try:
+            return m.expand(self.new)
+        except (re.error, IndexError) as e:
+            raise ValueError(f"replace rule '{self.text}': {e}") from None
+
+    def parent_ok(self, parent: str) -> bool:
+        ok = self._parent_ok.get(parent)
+        if ok is None:
+            ok = self._parent_ok[parent] = bool(self.parent.match(parent))
+        return ok
+
+
+class RenameRules:
+    """Ordered rename rules behind one dispatch structure.
+
+    Exact rules are found by a dict lookup and pattern rules by their literal
+    prefix (one dict lookup per distinct prefix length), so the rules tried for a
+    module name are only those that can match it. The result -- candidate rules
+    with their new names -- is cached per module name; an instance then only
+    checks the scopes of those few candidates.
+    """
+
+    def __init__(self, rules: List[RenameRule]):
+        self.rules = rules
+        self.exact: Dict[str, List[int]] = {}
+        self.by_prefix: Dict[str, List[int]] = {}
+        for rule in rules:
+            table = self.exact if rule.old.regex is None else self.by_prefix
+            table.setdefault(rule.old.prefix, []).append(rule.index)
+        self.prefix_lengths = sorted({len(p) for p in self.by_prefix})
+        self.has_instance_scope = any(r.inst is not None for r in rules)
+        self._candidates: Dict[str, tuple] = {}
+        self._hits: List[tuple] = []        # (rule index, old, new, [instances])
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> 'RenameRules':
+        return cls([RenameRule.parse(i, t) for i, t in enumerate(texts)])
+
+    @classmethod
+    def coerce(cls, rules) -> 'RenameRules':
+        # 예전 호출 방식: {old: new} dict
+        if isinstance(rules, RenameRules):
+            return rules
+        return cls([RenameRule(i, f"{old}={new}", NamePattern(old), new) for i, (old, new) in enumerate(rules.items())])
+
+    @property
+    def exact_only(self) -> bool:
+        return not self.by_prefix
+
+    def candidates(self, module: str) -> tuple:
+        found = self._candidates.get(module)
+        if found is None:
+            idx = list(self.exact.get(module, ()))
+            for n in self.prefix_lengths:
+                if n > len(module):
+                    break
+                idx.extend(self.by_prefix.get(module[:n], ()))
+            found = []
+            for i in sorted(idx):
+                rule = self.rules[i]
+                new = rule.rename(module)
+                if new is not None:
+                    hits = [0]
+                    self._hits.append((i, module, new, hits))
+                    found.append((rule, new, hits))
+            found = self._candidates[module] = tuple(found)
+        return found
+
+    def needs_instance_names(self, module: str) -> bool:
+        return self.has_instance_scope and any(r.inst is not None for r, _, _ in self.candidates(module))
+
+    def resolve(self, module: str, parent: Optional[str], inst: Optional[str] = None, n: int = 1) -> Optional[str]:
+        """New name for n instances of module (None: no rule applies); counts the hit."""
+        for rule, new, hits in self.candidates(module):
+            if rule.parent is not None and (parent is None or not rule.parent_ok(parent)):
+                continue
+            if rule.inst is not None and (inst is None or not rule.inst.match(inst)):
+                continue
+            hits[0] += n
+            return new
+        return None
+
+    @property
+    def counts(self) -> Counter:
+        """(rule index, old, new) -> instances renamed (or kept) by that rule."""
+        return Counter({(i, old, new): hits[0] for i, old, new, hits in self._hits if hits[0]})
+
+    def report(self, out=None) -> None:
+        out = out or sys.stdout
+        counts = self.counts
+        pairs: Counter = Counter()
+        for (_, old, new), n in counts.items():
+            if old != new:
+                pairs[(old, new)] += n
+        for (old, new), n in sorted(pairs.items()):
+            out.write(f"Replacing module: {old} → {new} ({n})\n")
+        used = {i for i, _, _ in counts}
+        unused = [r.text for r in self.rules if r.index not in used]
+        out.write(f"[rules] {len(self.rules)} rule(s), {sum(pairs.values())} instance(s) renamed, "
+                  f"{len(pairs)} module(s) renamed, {len(unused)} rule(s) unused\n")
+        for text in unused[:20]:
+            out.write(f"[rules] unused: {text}\n")
+        if len(unused) > 20:
+            out.write(f"[rules] ... {len(unused) - 20} more unused\n")
+
+    def write_report(self, path: str) -> None:
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['rule', 'old', 'new', 'instances'])
+            used = set()
+            for (i, old, new), n in sorted(self.counts.items()):
+                used.add(i)
+                w.writerow([self.rules[i].text, old, new, n])
+            for r in self.rules:
+                if r.index not in used:
+                    w.writerow([r.text, '', '', 0])
+
+
+def read_rule_file(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def replace_module_instance(ast, rules):
+    """Rename instantiated modules in place; returns ast if anything changed, else None.
+
+    rules: RenameRules or a plain {old: new} dict. Only module-level instance
+    statements are looked at (not generate blocks). An InstanceList is only split
+    when an inst= scope gives its instances different names.
+    """
+    rules = RenameRules.coerce(rules)
     changed = False
     for desc in ast.description.definitions:
         new_items = []
+        split = False
         for item in desc.items:
-            if isinstance(item, InstanceList):
-                old_module_name = item.module
-                new_module_name = replace_dict.get(old_module_name, old_module_name)
-
-                if old_module_name != new_module_name:
-                    print(f"Replacing module: {old_module_name} → {new_module_name}")
-                    changed = True
-
-                    # 인스턴스 내부도 같이 바꿔주기
-                    new_instances = []
-                    for inst in item.instances:
-                        new_inst = Instance(
-                            name=inst.name,
-                            module=new_module_name,  # ✅ 같이 바꿔줌
-                            portlist=inst.portlist,
-                            parameterlist=inst.parameterlist
-                        )
-                        new_instances.append(new_inst)
-
-                    new_item = InstanceList(
-                        module=new_module_name,
-                        parameterlist=item.parameterlist,
-                        instances=new_instances
-                    )
-                    new_items.append(new_item)
-                else:
-                    new_items.append(item)
+            new_items.append(item)
+            if not isinstance(item, InstanceList) or not rules.candidates(item.module):
+                continue
+            old = item.module
+            if rules.needs_instance_names(old):
+                news = [rules.resolve(old, desc.name, inst.name) or old for inst in item.instances]
             else:
-                new_items.append(item)
-        desc.items = new_items
+                news = [rules.resolve(old, desc.name, None, len(item.instances)) or old] * len(item.instances)
+            if all(n == news[0] for n in news):
+                if news[0] != old:
+                    # 이름만 바꾸면 되므로 객체를 새로 만들지 않음
+                    item.module = news[0]
+                    for inst in item.instances:
+                        inst.module = news[0]
+                    changed = True
+                continue
+            # inst= 범위로 인스턴스마다 이름이 다름 -> 연속 구간별로 InstanceList 분리
+            new_items.pop()
+            start = 0
+            for k in range(1, len(news) + 1):
+                if k == len(news) or news[k] != news[start]:
+                    insts = item.instances[start:k]
+                    for inst in insts:
+                        inst.module = news[start]
+                    new_items.append(InstanceList(news[start], item.parameterlist, tuple(insts), item.lineno))
+                    start = k
+            split = changed = True
+        if split:
+            desc.items = tuple(new_items)
     return ast if changed else None
 
 
+# ------------------------------
+# Splice mode: untouched bytes are copied verbatim, only the module name of a
+# replaced instance statement is rewritten
+# ------------------------------
+
+BLOCK_OPEN = {'begin', 'generate', 'case', 'casex', 'casez', 'fork', 'function', 'task', 'specify'}
+BLOCK_CLOSE = {'end', 'endgenerate', 'endcase', 'join', 'endfunction', 'endtask', 'endspecify'}
+DIRECTIVE_RE = re.compile(rb'(?:ifdef|ifndef|elsif|else|endif|define|undef|include|timescale'
+                          rb'|celldefine|endcelldefine|default_nettype|resetall)\b')
+# gate/switch primitive: AST 모드와 같이 인스턴스의 셀 이름으로 취급 (pmos=PMOS_LVT 등)
+PRIMITIVES = frozenset('''
+    and nand or nor xor xnor buf not bufif0 bufif1 notif0 notif1 nmos pmos rnmos rpmos
+    cmos rcmos tran tranif0 tranif1 rtran rtranif0 rtranif1 pullup pulldown
+'''.split())
+# 그 밖의 IEEE 1364-2005 키워드 (pyverilog 렉서의 reserved에는 defparam, tri0, wand 등이 빠져 있음)
+# 문장 맨 앞의 이 단어들은 셀 이름이 아니므로 '*' 같은 규칙에도 바뀌지 않아야 함
+STATEMENT_KEYWORDS = frozenset('''
+    always assign automatic begin case casex casez cell config deassign default defparam
+    design disable edge else end endcase endconfig endfunction endgenerate endmodule
+    endprimitive endspecify endtable endtask event for force forever fork function generate
+    genvar highz0 highz1 if ifnone incdir include initial inout input instance integer join
+    large liblist library localparam macromodule medium module negedge noshowcancelled
+    output parameter posedge primitive pull0 pull1 pulsestyle_onevent pulsestyle_ondetect
+    real realtime reg release repeat scalared showcancelled signed small specify specparam
+    strong0 strong1 supply0 supply1 table task time tri tri0 tri1 triand trior trireg
+    unsigned use uwire vectored wait wand weak0 weak1 while wire wor
+'''.split()) | (RESERVED - PRIMITIVES)
+
+
+def iter_instance_sites(buf, start: int, end: int):
+    """Yield (module name, name start, name end, instances) for each module-level instance statement in buf[start:end].
+
+    instances is the number of instances in the statement (`cell a (...), b (...);` is 2).
+    Same scope as replace_module_instance(): instances inside generate/begin blocks are not reported.
+    """
+    depth = 0
+    at_stmt = False          # module header runs up to the first ';'
+    pending = None
+    site = None              # 인스턴스 문장 안: [name, start, end, instances]
+    nest = 0
+    skip_until = -1
+    for m in TOKEN_RE.finditer(buf, start, end):
+        kind = m.lastgroup
+        if kind == 'skip' or m.start() < skip_until:
+            continue
+        text = m.group()
+        if pending is not None:
+            # `cell inst (...)`, `cell #(...) inst (...)` 또는 이름 없는 primitive `and (y, a, b)`
+            if kind == 'id' or text == b'#' or (text == b'(' and pending[0] in PRIMITIVES):
+                site = [*pending, 1]
+                nest = 0
+            pending = None
+        if kind == 'op':
+            if text == b';':
+                if site is not None:
+                    yield tuple(site)
+                    site = None
+                at_stmt = True
+                continue
+            if text == b'`' and DIRECTIVE_RE.match(buf, m.end()):
+                # `ifdef ... / `endif 등 지시어 줄은 문장 경계에 영향 없음
+                eol = buf.find(b'\n', m.end(), end)
+                skip_until = end if eol < 0 else eol
+                continue
+            if site is not None:
+                if text in (b'(', b'[', b'{'):
+                    nest += 1
+                elif text in (b')', b']', b'}'):
+                    nest -= 1
+                elif text == b',' and nest == 0:
+                    site[3] += 1
+        elif kind == 'id' and site is None:
+            word = text.decode('utf-8', errors='replace')
+            if word in BLOCK_OPEN:
+                depth += 1
+            elif word in BLOCK_CLOSE:
+                depth -= 1
+                at_stmt = True
+                continue
+            elif at_stmt and depth == 0 and word not in STATEMENT_KEYWORDS:
+                pending = (word, m.start(), m.end())
+        at_stmt = False
+
+
+def _copy_range(src_fd: int, dst_fd: int, src_mm, offset: int, count: int) -> None:
+    if hasattr(os, 'sendfile'):
+        try:
+            while count > 0:
+                sent = os.sendfile(dst_fd, src_fd, offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+                count -= sent
+        except OSError:
+            pass
+    # sendfile을 못 쓰면 mmap에서 COPY_CHUNK씩 복사 (범위 전체를 한 번에 slice하지 않음)
+    if count > 0:
+        with memoryview(src_mm) as view:
+            for pos in range(offset, offset + count, COPY_CHUNK):
+                write_all(dst_fd, view[pos:min(pos + COPY_CHUNK, offset + count)])
+
+
+def splice_replace(filelist, output: str, rules) -> int:
+    """Write filelist (concatenated) to output with instance module names rewritten in place.
+
+    rules: RenameRules (without inst= scopes) or a plain {old: new} dict. With
+    exact rules only, only modules whose text mentions an old name are tokenized;
+    everything else is copied with sendfile. Returns the number of renamed
+    instances.
+    """
+    rules = RenameRules.coerce(rules)
+    if rules.has_instance_scope:
+        raise ValueError("inst= scoped rules need the AST mode (drop --splice)")
+    names_re = None
+    if rules.exact_only:
+        keys = [r.old.text for r in rules.rules if r.new != r.old.text]
+        if not keys:
+            return 0
+        names_re = re.compile(rb'(?<![\w$])(?:' + b'|'.join(re.escape(k.encode()) for k in keys) + rb')(?![\w$])')
+
+    files = []  # (path, [(start, end, new bytes)])
+    total = 0
+    for path in filelist:
+        edits = []
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if names_re is None or names_re.search(mm):
+                        for parent, start, end in iter_module_spans(mm):
+                            if names_re is not None and names_re.search(mm, start, end) is None:
+                                continue
+                            for old, s, e, n in iter_instance_sites(mm, start, end):
+                                if not rules.candidates(old):
+                                    continue
+                                new = rules.resolve(old, parent, None, n)
+                                if new is not None and new != old:
+                                    edits.append((s, e, new.encode()))
+                                    total += n
+        files.append((path, edits))
+    if total == 0:
+        return 0
+
+    # 입력 파일에 그대로 덮어써도 안전하도록 임시 파일에 쓴 뒤 교체
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), suffix='.tmp')
+    try:
+        if os.path.exists(output):
+            os.chmod(tmp, os.stat(output).st_mode & 0o777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+        for path, edits in files:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    pos = 0
+                    for s, e, new in edits:
+                        _copy_range(f.fileno(), fd, mm, pos, s - pos)
+                        write_all(fd, new)
+                        pos = e
+                    _copy_range(f.fileno(), fd, mm, pos, size - pos)
+                    if mm[size - 1:size] != b'\n':
+                        write_all(fd, b'\n')
+        os.close(fd)
+        fd = -1
+        os.replace(tmp, output)
+    finally:
+        if fd >= 0:
+            os.close(fd)
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return total
+
+
+# ------------------------------
+# Regression check: splice mode must rename the same instances as the AST mode
+# ------------------------------
+
+SELF_CHECK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gcd_tr_level', 'substractor.v')
+SELF_CHECK_RULES = (
+    ['pmos=PMOS_LVT'],
+    ['re:(n|p)mos=\\1mos_hvt', 'glob:*_gate=std_\\1'],
+    ['glob:*=X_\\1'],
+)
+
+
+def _instance_modules(ast) -> Dict[str, List]:
+    return {d.name: sorted((i.module, len(i.instances)) for i in d.items if isinstance(i, InstanceList))
+            for d in ast.description.definitions}
+
+
+def self_check(path: str = SELF_CHECK_FILE) -> None:
+    """Rename with each SELF_CHECK_RULES set in both modes; the renamed instances and counts must agree."""
+    with tempfile.TemporaryDirectory(prefix='replacer_check_') as tmp:
+        for texts in SELF_CHECK_RULES:
+            ast_rules = RenameRules.from_texts(texts)
+            ast, _ = parse_verilog([path], cache=None)
+            replace_module_instance(ast, ast_rules)
+            splice_rules = RenameRules.from_texts(texts)
+            splice_out = os.path.join(tmp, 'splice.v')
+            splice_replace([path], splice_out, splice_rules)
+            got, _ = parse_verilog([splice_out], cache=None)
+            assert _instance_modules(got) == _instance_modules(ast), texts
+            assert splice_rules.counts == ast_rules.counts, (texts, splice_rules.counts, ast_rules.counts)
+            print(f"[OK] {' '.join(texts)}: {sum(ast_rules.counts.values())} instance(s)")
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Replace Verilog module instances.")
+    parser = argparse.ArgumentParser(description="Replace Verilog module instances.", epilog=RULE_SYNTAX,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument(
         "-i", "--inputs",
         nargs="+",
-        help="Input Verilog file(s)",
-        required=True
+        help="Input Verilog file(s)"
     )
     parser.add_argument(
         "-o", "--output",
-        help="Output Verilog file (single merged output)",
-        required=True
+        help="Output Verilog file (single merged output)"
     )
     parser.add_argument(
         "--replace",
         nargs="+",
-        help="Replacement pairs: old1=new1 old2=new2 ...",
-        required=True
+        default=[],
+        help="Replacement rules: old1=new1 'glob:cell_*=lib_\\1' ... (see rule syntax below)"
+    )
+    parser.add_argument(
+        "--rules",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="File with one replacement rule per line (tried after --replace rules)"
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        metavar="CSV",
+        help="Write per-rule replacement counts (rule, old, new, instances)"
+    )
+    parser.add_argument(
+        "--splice",
+        action="store_true",
+        help="Copy the input files byte-for-byte and rewrite only the replaced instance "
+             "module names (keeps comments/formatting, no preprocessing)"
+    )
+    parser.add_argument(
+        "--self-check",
+        action="store_true",
+        help="Check that --splice and the AST mode rename the same instances of gcd_tr_level/substractor.v"
     )
+    add_cache_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    if args.self_check:
+        self_check()
+        return
+    if not args.inputs or not args.output:
+        parser.error("the following arguments are required: -i/--inputs, -o/--output")
+
+    # Parse replacement rules
+    texts = list(args.replace)
+    for path in args.rules:
+        texts.extend(read_rule_file(path))
+    if not texts:
+        parser.error("no replacement rules (use --replace and/or --rules)")
+    rules = RenameRules.from_texts(texts)
+    if args.splice and rules.has_instance_scope:
+        parser.error("inst= scoped rules need the AST mode (drop --splice)")
+
+    with profiler_from_args(args) as prof:
+        if args.splice:
+            with prof.phase('splice'):
+                replaced = splice_replace(args.inputs, args.output, rules)
+            rules.report()
+            if args.report:
+                rules.write_report(args.report)
+            if replaced:
+                print(f"Modified file written to: {args.output}")
+            else:
+                print("No module instances replaced.")
+            return
+
+        # Parse multiple Verilog files
+        with prof.phase('parse'):
+            ast, _ = parse_verilog(args.inputs, cache=cache_from_args(args))
+        with prof.phase('replace'):
+            modified_ast = replace_module_instance(ast, rules)
+        rules.report()
+        if args.report:
+            rules.write_report(args.report)
 
-    # Parse replacement pairs
-    replace_dict = {}
-    for pair in args.replace:
-        if "=" not in pair:
-            raise ValueError(f"Invalid format for replace pair: {pair}")
-        old, new = pair.split("=", 1)
-        replace_dict[old] = new
-
-    # Parse multiple Verilog files
-    ast, _ = parse(args.inputs)
-    modified_ast = replace_module_instance(ast, replace_dict)
-
-    if modified_ast:
-        codegen = ASTCodeGenerator()
-        new_code = codegen.visit(modified_ast)
-        with open(args.output, 'w') as f:
-            f.write(new_code)
-        print(f"Modified file written to: {args.output}")
-    else:
-        print("No module instances replaced.")
+        if modified_ast:
+            with prof.phase('emit'):
+                with open(args.output, 'w') as f:
+                    write_verilog(modified_ast, f)
+            print(f"Modified file written to: {args.output}")
+        else:
+            print("No module instances replaced.")
 
 
 if __name__ == "__main__":
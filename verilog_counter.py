@@ -1,112 +1,354 @@
-from pyverilog.vparser.parser import parse
-from pyverilog.vparser.ast import ModuleDef, InstanceList, Instance
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from verilog_frontend import (
+    LazyModuleIndex, parse_module_index, add_cache_arguments, add_jobs_argument, cache_from_args, resolve_jobs,
+)
+from netlist_scanner import scan_structural, add_fast_structural_argument
+from design_db import AstHierarchy, DesignDB
+from design_watch import IncrementalDesign, watch
+from design_analysis import AnalysisCache
+from design_server import DesignClient, DesignServerError, add_server_argument
+from cell_histogram import CellHistogram, leaf_cell_types
+from instance_table import BATCH_ROWS, table_format, write_instance_table
+from profiling import NULL_PROFILER, add_profile_arguments, profiler_from_args
+from pyverilog.vparser.ast import ModuleDef
 import csv
+import numpy as np
 
 def build_module_defs(ast):
     return {d.name: d for d in ast.description.definitions if isinstance(d, ModuleDef)}
 
-def is_leaf_module(module_name):
-    if module_name in leaf_cache:
-        return leaf_cache[module_name]
-    module = module_defs[module_name]
-    for item in module.items:
-        if isinstance(item, InstanceList):
-            leaf_cache[module_name] = False
-            return False
-    leaf_cache[module_name] = True
-    return True
-
-def recursive_tranif_count(module_name):
-    if module_name in tranif_cache:
-        return tranif_cache[module_name]
-    
-    tcount = {'tranif0': 0, 'tranif1': 0}
-    module = module_defs[module_name]
-    
-    for item in module.items:
-        if isinstance(item, InstanceList):
-            for inst in item.instances:
-                if inst.module == 'tranif0':
-                    tcount['tranif0'] += 1
-                elif inst.module == 'tranif1':
-                    tcount['tranif1'] += 1
-                elif inst.module in module_defs:
-                    child_tcount = recursive_tranif_count(inst.module)
-                    tcount['tranif0'] += child_tcount['tranif0']
-                    tcount['tranif1'] += child_tcount['tranif1']
-    tranif_cache[module_name] = tcount
-    return tcount
-
-def traverse_and_collect(module_name, path_prefix, rows):
-    module = module_defs[module_name]
-    for item in module.items:
-        if isinstance(item, InstanceList):
-            for inst in item.instances:
-                if inst.module in module_defs:
-                    tcount = recursive_tranif_count(inst.module)
-                    rows.append({
-                        'InstancePath': path_prefix + inst.name,
-                        'ModuleName': inst.module,
-                        'tranif0_count': tcount['tranif0'],
-                        'tranif1_count': tcount['tranif1']
-                    })
-                    traverse_and_collect(inst.module, path_prefix + inst.name + ".", rows)
-                elif inst.module in ('tranif0', 'tranif1'):
-                    # primitive tranif 직접 인스턴스
-                    count0 = 1 if inst.module == 'tranif0' else 0
-                    count1 = 1 if inst.module == 'tranif1' else 0
-                    rows.append({
-                        'InstancePath': path_prefix + inst.name,
-                        'ModuleName': inst.module,
-                        'tranif0_count': count0,
-                        'tranif1_count': count1
-                    })
-                else:
-                    # 다른 primitive
-                    rows.append({
-                        'InstancePath': path_prefix + inst.name,
-                        'ModuleName': inst.module,
-                        'tranif0_count': 0,
-                        'tranif1_count': 0
-                    })
-
-def main(top_module_name, verilog_files, csv_output):
-    ast, _ = parse(verilog_files)
-    global module_defs, leaf_cache, tranif_cache
-    module_defs = build_module_defs(ast)
-    leaf_cache = {}
-    tranif_cache = {}
-
-    if top_module_name not in module_defs:
-        print(f"Error: Top module '{top_module_name}' not found.")
-        return
-
-    # 디자인 전체 leaf module stdout 출력
-    leaf_modules = set()
-    for modname in module_defs:
-        if is_leaf_module(modname):
-            leaf_modules.add(modname)
-    print("Leaf modules found in design (unique):")
-    for m in sorted(leaf_modules):
-        print(m)
-
-    # TOP 하위 instance tranif 집계
-    rows = []
-    traverse_and_collect(top_module_name, top_module_name + ".", rows)
-
-    # CSV 출력
-    with open(csv_output, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=['InstancePath', 'ModuleName', 'tranif0_count', 'tranif1_count'])
-        writer.writeheader()
-        writer.writerows(rows)
-    print(f"TOP hierarchy instance tranif counts written to {csv_output}")
+def load_hierarchy(top_modules, verilog_files, jobs=1, cache='default', lazy=False, fast_structural=False,
+                   db_path=None):
+    if db_path:
+        # 미리 만들어 둔 design DB (design_db.py build) 사용, 파싱 없음
+        return DesignDB.open(db_path)
+    if fast_structural:
+        return AstHierarchy(scan_structural(verilog_files))
+    if lazy:
+        # TOP들에서 도달 가능한 모듈만 파싱 (leaf 목록도 그 범위로 한정)
+        index = LazyModuleIndex(verilog_files)
+        module_defs = {}
+        for top in top_modules:
+            module_defs.update(index.load_reachable(top))
+        return AstHierarchy(module_defs)
+    _, module_defs = parse_module_index(verilog_files, cache=cache, jobs=jobs)
+    return AstHierarchy(module_defs)
+
+def output_path(path, top_module_name, multi):
+    """'{top}' in path is replaced; with several tops and no placeholder, 'out.csv' -> 'out.TOP.csv'."""
+    if '{top}' in path:
+        return path.replace('{top}', top_module_name)
+    if not multi:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{top_module_name}{ext}"
+
+class DesignCounter:
+    """One parsed hierarchy plus its memoized per-module results.
+
+    report() can be called for any number of tops; they all share the leaf cache
+    and the bottom-up cell histogram, so each module's subtree is counted once.
+    """
+
+    def __init__(self, hierarchy, cells=('tranif0', 'tranif1')):
+        self.hierarchy = hierarchy
+        self.all_cells = cells is None
+        self.leaf_cache = {}
+        # cells가 None이면 디자인에서 정의되지 않은 모든 leaf cell 종류
+        self.histogram = CellHistogram(hierarchy, leaf_cell_types(hierarchy) if cells is None else cells)
+
+    @classmethod
+    def from_files(cls, top_modules, verilog_files, cells=('tranif0', 'tranif1'), **load_options):
+        return cls(load_hierarchy(top_modules, verilog_files, **load_options), cells)
+
+    def update(self, hierarchy, dirty):
+        """Swap in a re-parsed hierarchy; only dirty modules (and their ancestors) are recomputed."""
+        self.hierarchy = hierarchy
+        for name in dirty:
+            self.leaf_cache.pop(name, None)
+        if self.all_cells:
+            self.histogram = CellHistogram(hierarchy, leaf_cell_types(hierarchy))
+        else:
+            self.histogram.update(hierarchy, dirty)
+
+    def is_leaf_module(self, module_name):
+        if module_name in self.leaf_cache:
+            return self.leaf_cache[module_name]
+        self.leaf_cache[module_name] = not self.hierarchy.children(module_name)
+        return self.leaf_cache[module_name]
+
+    def leaf_modules(self):
+        return sorted(m for m in self.hierarchy.module_names() if self.is_leaf_module(m))
+
+    def count_columns(self):
+        return [f'{cell}_count' for cell in self.histogram.cells]
+
+    def iter_instances(self, module_name, path_prefix):
+        """Flattened instances below module_name in DFS pre-order, without recursion.
+
+        Yields (parent row, depth, path prefix, instance name, module name); parent row
+        is the index of the parent instance's own row, -1 directly under module_name.
+        """
+        hierarchy = self.hierarchy
+        row = 0
+        stack = [(iter(hierarchy.children(module_name)), -1, 0, path_prefix)]
+        while stack:
+            children, parent, depth, prefix = stack[-1]
+            for inst_name, child in children:
+                me = row
+                row += 1
+                yield parent, depth, prefix, inst_name, child
+                if child in hierarchy:
+                    stack.append((iter(hierarchy.children(child)), me, depth + 1, prefix + inst_name + "."))
+                    break
+            else:
+                stack.pop()
+
+    def resolve_instance_path(self, top_module_name, inst_path):
+        """'TOP.u1.u2' -> module name of that instance ('TOP' -> TOP); None if not found."""
+        parts = inst_path.split('.')
+        if parts[0] != top_module_name:
+            return None
+        module = top_module_name
+        for name in parts[1:]:
+            module = dict(self.hierarchy.children(module)).get(name)
+            if module is None or module not in self.hierarchy:
+                return None
+        return module
+
+    def write_paths(self, module_name, path_prefix, csv_output):
+        # 모듈이면 하위 전체 집계, 대상 cell 직접 인스턴스면 1, 그 외 primitive는 0
+        histogram = self.histogram
+        rows = self.iter_instances(module_name, path_prefix)
+        if table_format(csv_output):
+            # .parquet / .arrow: ModuleName 사전 인코딩 + Parent 행 번호로 경로 압축
+            names = list(self.hierarchy.module_names()) + leaf_cell_types(self.hierarchy)
+            counts_table = np.array([histogram.counts(n) for n in names], dtype=np.int64).reshape(len(names), -1)
+            write_instance_table(rows, csv_output, path_prefix, names, self.count_columns(), counts_table)
+            return
+
+        counts_of = {}
+        with open(csv_output, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['InstancePath', 'ModuleName'] + self.count_columns())
+            batch = []
+            for _, _, prefix, inst_name, child in rows:
+                counts = counts_of.get(child)
+                if counts is None:
+                    counts = counts_of[child] = histogram.counts(child).tolist()
+                batch.append([prefix + inst_name, child] + counts)
+                if len(batch) >= BATCH_ROWS:
+                    writer.writerows(batch)
+                    batch.clear()
+            writer.writerows(batch)
+
+    def write_aggregate(self, top_module_name, csv_output):
+        # 경로를 펼치지 않고 모듈별 등장 횟수(DAG 경로 수) x 인스턴스당 집계 = 평탄화 총계
+        histogram = self.histogram
+        mult = histogram.multiplicity(top_module_name)
+        totals = [f'{cell}_total' for cell in histogram.cells]
+        with open(csv_output, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['ModuleName', 'Instances'] + self.count_columns() + totals)
+            for i in reversed(histogram.order):
+                if mult[i]:
+                    counts = histogram.matrix[i]
+                    writer.writerow([histogram.modules[i], int(mult[i])] + counts.tolist() + (counts * mult[i]).tolist())
+            # 대상 cell 자체: 평탄화된 인스턴스 수
+            for cell, flat in zip(histogram.cells, histogram.counts(top_module_name).tolist()):
+                if flat:
+                    one = histogram.counts(cell)
+                    writer.writerow([cell, flat] + one.tolist() + (one * flat).tolist())
+
+    def write_module_histogram(self, module_csv):
+        # 모듈별 전체 하위 히스토그램 (자식 모듈 먼저)
+        with open(module_csv, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['ModuleName'] + self.count_columns())
+            for name, counts in self.histogram.iter_rows():
+                writer.writerow([name] + counts.tolist())
+        print(f"Per-module cell histogram written to {module_csv}")
+
+    def report(self, top_module_name, csv_output, aggregate=False, expand=None, paths_csv=None):
+        """Write the outputs of one top (the hierarchy must contain it)."""
+        if aggregate:
+            self.write_aggregate(top_module_name, csv_output)
+            print(f"Per-module flattened cell totals written to {csv_output}")
+
+        # TOP(또는 --expand로 고른 하위 계층) 아래 instance 경로별 cell 집계
+        if expand or not aggregate:
+            inst_path = expand or top_module_name
+            module_name = self.resolve_instance_path(top_module_name, inst_path)
+            if module_name is None:
+                print(f"Error: Instance path '{inst_path}' not found under '{top_module_name}'.")
+                return
+            out = (paths_csv or os.path.splitext(csv_output)[0] + '.paths.csv') if aggregate else csv_output
+            self.write_paths(module_name, inst_path + ".", out)
+            print(f"{inst_path} hierarchy instance cell counts written to {out}")
+
+    def report_many(self, top_modules, csv_output, module_csv=None, aggregate=False, expand=None, paths_csv=None,
+                    workers=1):
+        """Report every top; outputs are named by output_path(). workers > 1 fans the tops out to processes."""
+        tops = []
+        for top in top_modules:
+            if top in self.hierarchy:
+                tops.append(top)
+            else:
+                print(f"Error: Top module '{top}' not found.")
+        if not tops:
+            return
+
+        # 디자인 전체 leaf module stdout 출력
+        print("Leaf modules found in design (unique):")
+        for m in self.leaf_modules():
+            print(m)
+
+        multi = len(top_modules) > 1
+        jobs = []
+        for top in tops:
+            # --expand 경로는 그 경로가 시작하는 TOP에만 적용
+            top_expand = expand if expand and expand.split('.')[0] == top else None
+            jobs.append((top, output_path(csv_output, top, multi),
+                         aggregate, top_expand, paths_csv and output_path(paths_csv, top, multi)))
+
+        workers = min(resolve_jobs(workers), len(jobs))
+        if workers <= 1:
+            for job in jobs:
+                self.report(*job)
+        else:
+            # fork면 카운터(히스토그램 포함)를 복사 없이 물려받음
+            sys.stdout.flush()
+            ctx = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_init_report_worker, initargs=(self,)) as pool:
+                list(pool.map(_report_worker, jobs))
+
+        if module_csv:
+            self.write_module_histogram(module_csv)
+
+_worker_counter = None
+
+def _init_report_worker(counter):
+    global _worker_counter
+    _worker_counter = counter
+
+def _report_worker(job):
+    _worker_counter.report(*job)
+    sys.stdout.flush()
+
+def split_tops(top_module_name):
+    if isinstance(top_module_name, str):
+        return [t.strip() for t in top_module_name.split(',') if t.strip()]
+    return list(top_module_name)
+
+def main(top_module_name, verilog_files, csv_output, jobs=1, cache='default', lazy=False, fast_structural=False,
+         db_path=None, cells=('tranif0', 'tranif1'), module_csv=None, aggregate=False, expand=None, paths_csv=None,
+         top_jobs=1, profiler=NULL_PROFILER):
+    # top_module_name: 'TOP' 또는 'A,B,C' (한 번 파싱해서 모든 TOP 처리)
+    tops = split_tops(top_module_name)
+    with profiler.phase('parse'):
+        hierarchy = load_hierarchy(tops, verilog_files, jobs=jobs, cache=cache, lazy=lazy,
+                                   fast_structural=fast_structural, db_path=db_path)
+    with profiler.phase('analysis'):
+        # 모듈별 AST 순회 + 셀 히스토그램
+        counter = DesignCounter(hierarchy, cells)
+    with profiler.phase('report'):
+        counter.report_many(tops, csv_output, module_csv, aggregate, expand, paths_csv, workers=top_jobs)
+    return counter
+
+def watch_main(top_module_name, verilog_files, csv_output, cache='default', interval=1.0,
+               cells=('tranif0', 'tranif1'), module_csv=None, aggregate=False, expand=None, paths_csv=None):
+    # 파일 변경 시 바뀐 모듈과 그 상위 모듈의 캐시/행만 다시 계산
+    tops = split_tops(top_module_name)
+    design = IncrementalDesign(verilog_files, cache=cache)
+    analysis_cache = AnalysisCache()  # 바뀌지 않은 모듈은 다시 순회하지 않음
+    counter = None
+
+    def on_change(changed, reparse_time):
+        nonlocal counter
+        hierarchy = AstHierarchy(design.module_defs, cache=analysis_cache, module_hash=design.module_hash)
+        dirty = design.affected(changed)
+        t0 = time.perf_counter()
+        if counter is None:
+            counter = DesignCounter(hierarchy, cells)
+        else:
+            counter.update(hierarchy, dirty)
+        counter.report_many(tops, csv_output, module_csv, aggregate, expand, paths_csv)
+        print(f"[watch] {len(changed)} module(s) changed, {len(dirty)} invalidated, "
+              f"re-parse {reparse_time:.2f}s, analysis {time.perf_counter() - t0:.2f}s")
+
+    watch(design, on_change, interval)
+
+def server_main(socket_path, top_module_name, csv_output, cells=('tranif0', 'tranif1'), module_csv=None,
+                aggregate=False, expand=None, paths_csv=None):
+    # design_server.py에 이미 올라가 있는 디자인으로 리포트 (파싱 없음, 경로는 서버 기준이라 절대 경로로)
+    with DesignClient(socket_path) as client:
+        log = client.query('report', top=top_module_name, csv_output=os.path.abspath(csv_output),
+                           cells='*' if cells is None else list(cells),
+                           module_csv=module_csv and os.path.abspath(module_csv), aggregate=aggregate,
+                           expand=expand, paths_csv=paths_csv and os.path.abspath(paths_csv))
+    sys.stdout.write(log)
 
 if __name__ == '__main__':
-    import sys
-    if len(sys.argv) < 4:
-        print("Usage: python script.py <top_module_name> <output_csv> <verilog_file1> [<verilog_file2> ...]")
-    else:
-        top_module_name = sys.argv[1]
-        csv_output = sys.argv[2]
-        verilog_files = sys.argv[3:]
-        main(top_module_name, verilog_files, csv_output)
+    ap = argparse.ArgumentParser(description="Count cells (default tranif0/tranif1) under each instance of the TOP hierarchy")
+    ap.add_argument('top_module_name', help="Top module name, or several as 'A,B,C' (parsed once)")
+    ap.add_argument('csv_output', help="Output CSV file (.parquet / .arrow for a columnar instance listing); "
+                                       "with several tops use '{top}' or get out.TOP.csv")
+    ap.add_argument('verilog_files', nargs='*', help='Input Verilog files')
+    ap.add_argument('--db', default=None, help='Read the hierarchy from a design_db.py database instead of parsing')
+    ap.add_argument('--lazy', action='store_true',
+                    help='Only parse modules reachable from the top (byte-offset module index)')
+    ap.add_argument('--watch', action='store_true',
+                    help='Keep the design in memory and re-run whenever an input file changes')
+    ap.add_argument('--interval', type=float, default=1.0, help='--watch polling interval in seconds')
+    ap.add_argument('--cells', default='tranif0,tranif1',
+                    help='Comma-separated primitives/leaf cells to count (default: tranif0,tranif1)')
+    ap.add_argument('--all-cells', action='store_true',
+                    help='Count every instantiated cell type that is not a defined module')
+    ap.add_argument('--module-csv', default=None,
+                    help='Also write the full-subtree cell histogram of every module to this CSV')
+    ap.add_argument('--aggregate', action='store_true',
+                    help='Write per-module instance counts and flattened cell totals instead of every instance path')
+    ap.add_argument('--expand', default=None, metavar='INSTPATH',
+                    help='Only list instance paths under this instance (e.g. TOP.u1, applies to that TOP); '
+                         'with --aggregate they go to --paths-csv')
+    ap.add_argument('--paths-csv', default=None,
+                    help='Instance path output for --aggregate --expand, .csv/.parquet/.arrow (default: <csv_output>.paths.csv)')
+    ap.add_argument('--top-jobs', type=int, default=1,
+                    help='Worker processes for reporting several tops (0 = one per core)')
+    add_fast_structural_argument(ap)
+    add_jobs_argument(ap)
+    add_cache_arguments(ap)
+    add_server_argument(ap)
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+    if not args.verilog_files and not args.db and not args.server:
+        ap.error('Verilog files, --db or --server are required')
+    if args.server and args.watch:
+        ap.error('--watch cannot be used with --server (send a reload query to the server instead)')
+    cells = None if args.all_cells else [c.strip() for c in args.cells.split(',') if c.strip()]
+    with profiler_from_args(args) as prof:
+        if args.server:
+            try:
+                with prof.phase('server'):
+                    server_main(args.server, args.top_module_name, args.csv_output,
+                                cells=cells, module_csv=args.module_csv, aggregate=args.aggregate,
+                                expand=args.expand, paths_csv=args.paths_csv)
+            except DesignServerError as e:
+                raise SystemExit(f"Error: {e}")
+        elif args.watch:
+            watch_main(args.top_module_name, args.verilog_files, args.csv_output,
+                       cache=cache_from_args(args), interval=args.interval,
+                       cells=cells, module_csv=args.module_csv, aggregate=args.aggregate,
+                       expand=args.expand, paths_csv=args.paths_csv)
+        else:
+            main(args.top_module_name, args.verilog_files, args.csv_output,
+                 jobs=args.jobs, cache=cache_from_args(args), lazy=args.lazy,
+                 fast_structural=args.fast_structural, db_path=args.db,
+                 cells=cells, module_csv=args.module_csv, aggregate=args.aggregate,
+                 expand=args.expand, paths_csv=args.paths_csv, top_jobs=args.top_jobs, profiler=prof)
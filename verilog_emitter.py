@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Streaming Verilog writer for the netlist scripts.
+
+ASTCodeGenerator().visit(ast) renders the whole Source through jinja templates and
+returns one string for the design, which the scripts then write out. write_verilog()
+walks the same AST and writes every module item to the file handle as soon as it is
+rendered, so only one item is ever held as text.
+
+The node types that make up a gate-level netlist (instances, port connections,
+identifiers, selects, net/port declarations) are formatted with plain string
+operations that reproduce the templates exactly; everything else falls through to
+the stock ASTCodeGenerator visitors. The output is byte-identical to
+ASTCodeGenerator().visit(ast).
+
+Usage:
+  with open('out.v', 'w') as f:
+      write_verilog(ast, f)
+"""
+
+from typing import TextIO
+
+from pyverilog.ast_code_generator.codegen import ASTCodeGenerator, del_paren, del_space, escape
+from pyverilog.vparser.ast import Description, ModuleDef, Source
+
+
+def _indent_line(text: str) -> str:
+    # textwrap.indent() for the common single-line case
+    return '  ' + text if text.strip() else text
+
+
+class StreamingCodeGenerator(ASTCodeGenerator):
+    """ASTCodeGenerator with template-free fast paths for structural nodes."""
+
+    def indent_text(self, text: str) -> str:
+        return self.indent(text) if '\n' in text else _indent_line(text)
+
+    # ------------------------------
+    # Streaming entry points
+    # ------------------------------
+
+    def write(self, node, out: TextIO) -> None:
+        if isinstance(node, Source):
+            self.write_description(node.description, out)
+        elif isinstance(node, Description):
+            self.write_description(node, out)
+        elif isinstance(node, ModuleDef):
+            self.write_moduledef(node, out)
+        else:
+            out.write(self.visit(node))
+
+    def write_description(self, node: Description, out: TextIO) -> None:
+        # description.txt: "\n{{ definition }}\n" per definition
+        for definition in node.definitions:
+            out.write('\n')
+            if isinstance(definition, ModuleDef):
+                self.write_moduledef(definition, out)
+            else:
+                out.write(self.visit(definition))
+            out.write('\n')
+
+    def write_moduledef(self, node: ModuleDef, out: TextIO) -> None:
+        # moduledef.txt, one item at a time
+        out.write('\nmodule ' + escape(node.name))
+        if node.paramlist is not None:
+            paramlist = self.indent(self.visit(node.paramlist))
+            if paramlist != '':
+                out.write(' #\n(\n' + paramlist + '\n)')
+        portlist = self.indent(self.visit(node.portlist)) if node.portlist is not None else ''
+        out.write('\n(\n' + portlist + '\n);\n\n')
+        for item in node.items or ():
+            out.write(self.indent_text(self.visit(item)))
+            out.write('\n')
+        out.write('\nendmodule\n')
+
+    # ------------------------------
+    # Fast paths (must match template/*.txt)
+    # ------------------------------
+
+    def visit_Portlist(self, node):
+        return ',\n'.join([self.visit(port) for port in node.ports])
+
+    def visit_Port(self, node):
+        return escape(node.name)
+
+    def visit_Width(self, node):
+        return '[' + del_space(del_paren(self.visit(node.msb))) + ':' + del_space(del_paren(self.visit(node.lsb))) + ']'
+
+    def visit_Decl(self, node):
+        return ''.join([self.visit(item) for item in node.list])
+
+    def _variable(self, keyword, node):
+        text = keyword + ' '
+        if node.signed:
+            text += 'signed '
+        if node.width is not None:
+            text += self.visit(node.width) + ' '
+        text += escape(node.name)
+        if node.dimensions is not None:
+            text += ' ' + self.visit(node.dimensions)
+        return text + ';'
+
+    def visit_Input(self, node):
+        return self._variable('input', node)
+
+    def visit_Output(self, node):
+        return self._variable('output', node)
+
+    def visit_Inout(self, node):
+        return self._variable('inout', node)
+
+    def visit_Tri(self, node):
+        return self._variable('tri', node)
+
+    def visit_Wire(self, node):
+        return self._variable('wire', node)
+
+    def visit_Reg(self, node):
+        return self._variable('reg', node)
+
+    def visit_Identifier(self, node):
+        if node.scope is not None:
+            return super().visit_Identifier(node)
+        return escape(node.name)
+
+    def visit_IntConst(self, node):
+        return node.value
+
+    def visit_Pointer(self, node):
+        return self.visit(node.var) + '[' + del_paren(self.visit(node.ptr)) + ']'
+
+    def visit_Partselect(self, node):
+        return (self.visit(node.var) + '[' + del_space(del_paren(self.visit(node.msb)))
+                + ':' + del_space(del_paren(self.visit(node.lsb))) + ']')
+
+    def visit_Concat(self, node):
+        return '{ ' + ', '.join([del_paren(self.visit(item)) for item in node.list]) + ' }'
+
+    def visit_Repeat(self, node):
+        return '{ ' + del_paren(self.visit(node.times)) + del_paren(self.visit(node.value)) + ' }'
+
+    def visit_PortArg(self, node):
+        argname = '' if node.argname is None else del_paren(self.visit(node.argname))
+        if node.portname is None:
+            return argname
+        return '.' + escape(node.portname) + '(' + argname + ')'
+
+    def visit_Instance(self, node):
+        array = '' if node.array is None else self.visit(node.array)
+        ports = [self.indent_text(self.visit(port)) for port in node.portlist]
+        if not ports:
+            return escape(node.name) + array + '\n(\n)'
+        return escape(node.name) + array + '\n(\n' + ',\n'.join(ports) + '\n)'
+
+    def visit_InstanceList(self, node):
+        text = '\n' + escape(node.module)
+        if node.parameterlist:
+            params = [self.indent_text(self.visit(param)) for param in node.parameterlist]
+            text += '\n#(\n' + ',\n'.join(params) + '\n)'
+        instances = [self.visit(instance) for instance in node.instances]
+        return text + '\n' + ',\n'.join(instances) + ';\n'
+
+
+def write_verilog(node, out: TextIO) -> None:
+    """Write node (Source/Description/ModuleDef/...) to out, same text as ASTCodeGenerator().visit(node)."""
+    StreamingCodeGenerator().write(node, out)
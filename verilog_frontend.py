@@ -0,0 +1,833 @@
+#!/usr/bin/env python3
+"""
+Shared Pyverilog front-end for the netlist scripts.
+
+parse_verilog() is a drop-in for ``pyverilog.vparser.parser.parse``: it returns
+the same ``(ast, directives)`` pair, but parses every source file on its own and
+keeps the resulting definition list in an on-disk cache. Entries are keyed by
+the file content hash plus the include/define settings, so a second run on an
+unchanged netlist only unpickles the cached ModuleDefs. With jobs > 1 the files
+are parsed in a process pool, and parse_module_index() merges them into one
+{name: ModuleDef} index that reports duplicate module names across files.
+LazyModuleIndex instead scans files for module/endmodule byte offsets and only
+parses the modules reachable from a given top, on demand.
+
+Cache settings (environment, or --ast-cache / --no-ast-cache on the CLIs):
+  VERILOG_AST_CACHE      cache directory (default: ~/.cache/verilog_ast, 'off' disables)
+  VERILOG_AST_CACHE_MB   size limit; least recently used entries are evicted past it
+
+Preprocessing goes through a Preprocessor (get_preprocessor()): 'iverilog' runs
+pyverilog's `iverilog -E` subprocess as before, 'python' uses the in-process subset
+preprocessor from verilog_preprocess, and 'auto' tries that first and falls back to
+iverilog for sources it does not handle. The preprocessed text is cached on disk,
+keyed by the source, the hashes of every file it transitively `include`s and the
+define set, so repeated runs skip the subprocess and its temp files.
+  VERILOG_PREPROCESSOR   iverilog (default), python or auto (--preprocessor)
+  VERILOG_PP_CACHE       preprocessed text cache (default: ~/.cache/verilog_pp, 'off' disables)
+  VERILOG_PP_CACHE_MB    size limit of that cache
+
+With the cache or jobs enabled files are preprocessed one by one, except where macro
+state carries over: a file that `define/`undef/`include's, together with every later
+file that uses a macro or a conditional, is preprocessed as one ordered unit (as
+pyverilog's parse() does with the whole list) and cached under the unit's key.
+"""
+
+import bisect
+import hashlib
+import mmap
+import os
+import pickle
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyverilog
+from pyverilog.vparser.parser import VerilogParser, parse
+from pyverilog.vparser.preprocessor import preprocess
+from pyverilog.vparser.ast import Source, Description, ModuleDef, InstanceList
+
+from verilog_preprocess import PASSTHROUGH, PreprocessError, include_dependencies, preprocess_sources
+
+CACHE_FORMAT = 3
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'verilog_ast')
+DEFAULT_CACHE_MB = 4096
+DEFAULT_PP_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'verilog_pp')
+DEFAULT_PP_CACHE_MB = 1024
+PREPROCESSOR_MODES = ('iverilog', 'python', 'auto')
+PARSER_TABLE_DIR = os.path.join(tempfile.gettempdir(), 'pyverilog_parsetab')
+
+ParseEntry = Tuple[tuple, tuple]  # (definitions, directives)
+
+
+def normalize_defines(define) -> List[str]:
+    """Accept 'FOO', 'FOO=1' or ('FOO', '1') / ('FOO', None); return iverilog -D strings."""
+    out: List[str] = []
+    for d in define or []:
+        if isinstance(d, (tuple, list)):
+            name, value = d
+            out.append(name if value is None else f"{name}={value}")
+        else:
+            out.append(str(d))
+    return out
+
+
+# ------------------------------
+# On-disk AST cache
+# ------------------------------
+
+def update_source_hash(h, sources: Sequence[str], include: Sequence[str]) -> bool:
+    """Feed sources and their transitive `include files into h.
+
+    Returns False when an include name comes from a macro, i.e. the key cannot
+    capture every file the preprocessor may read.
+    """
+    for source in sources:
+        if os.path.isfile(source):
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        else:
+            # pyverilog also accepts Verilog code given as a string
+            h.update(source.encode())
+        h.update(b'\0')
+    deps, resolvable = include_dependencies(sources, include)
+    for name, path in deps:
+        h.update(b'F' + name.encode() + b'\0')
+        if path is None:
+            h.update(b'-\0')
+            continue
+        h.update(os.path.abspath(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return resolvable
+
+
+class ParseCache:
+    """Pickled per-file parse results, evicted least-recently-used past max_mb."""
+
+    SUFFIX = '.ast.pkl'
+    LABEL = 'ast-cache'
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_mb: float = DEFAULT_CACHE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, source, include: Sequence[str], define: Sequence[str]) -> str:
+        """Key of one source, or of an ordered preprocessing unit when given a list of sources."""
+        sources = [source] if isinstance(source, str) else list(source)
+        h = hashlib.sha256()
+        h.update(f"v{CACHE_FORMAT}|pyverilog-{pyverilog.__version__}\0".encode())
+        for inc in include:
+            h.update(b'I' + os.path.abspath(inc).encode() + b'\0')
+        for d in define:
+            h.update(b'D' + d.encode() + b'\0')
+        h.update(b'P' + get_preprocessor().mode.encode() + b'\0')
+        if len(sources) > 1:
+            h.update(b'U%d\0' % len(sources))
+        update_source_hash(h, sources, include)
+        return h.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def load(self, key: str) -> Optional[ParseEntry]:
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Truncated or stale entry: drop it and parse again
+            if os.path.exists(path):
+                os.remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return entry
+
+    def store(self, key: str, entry: ParseEntry) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.entry_path(key))
+        except RecursionError:
+            # Extremely deep expressions: not worth caching
+            os.remove(tmp)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evicted += 1
+
+    def report(self) -> str:
+        return (f"[{self.LABEL}] hits={self.hits} misses={self.misses} "
+                f"evicted={self.evicted} dir={self.cache_dir}")
+
+
+class PreprocessCache(ParseCache):
+    """Preprocessed text of a source list, keyed like ParseCache plus the preprocessor mode."""
+
+    SUFFIX = '.pp.pkl'
+    LABEL = 'pp-cache'
+
+    def key(self, sources: Sequence[str], include: Sequence[str], define: Sequence[str],
+            mode: str = 'iverilog') -> Optional[str]:
+        h = hashlib.sha256()
+        h.update(f"v{CACHE_FORMAT}|pp-{mode}|{os.environ.get('PYVERILOG_IVERILOG', 'iverilog')}\0".encode())
+        for inc in include:
+            h.update(b'I' + os.path.abspath(inc).encode() + b'\0')
+        for d in define:
+            h.update(b'D' + d.encode() + b'\0')
+        if not update_source_hash(h, sources, include):
+            return None
+        return h.hexdigest()
+
+
+def default_cache() -> Optional[ParseCache]:
+    cache_dir = os.environ.get('VERILOG_AST_CACHE', DEFAULT_CACHE_DIR)
+    if cache_dir.lower() in ('', '0', 'off', 'none'):
+        return None
+    max_mb = float(os.environ.get('VERILOG_AST_CACHE_MB', DEFAULT_CACHE_MB))
+    return ParseCache(cache_dir, max_mb)
+
+
+def add_cache_arguments(ap) -> None:
+    """Add --ast-cache/--no-ast-cache to an argparse parser."""
+    ap.add_argument('--ast-cache', default=None, metavar='DIR',
+                    help='Parsed AST cache directory (default: $VERILOG_AST_CACHE or ~/.cache/verilog_ast)')
+    ap.add_argument('--no-ast-cache', action='store_true', help='Always parse from scratch')
+
+
+def add_jobs_argument(ap) -> None:
+    ap.add_argument('-j', '--jobs', type=int, default=1,
+                    help='Parse input files in N worker processes (0 = one per core)')
+
+
+def cache_from_args(args) -> Optional[ParseCache]:
+    if getattr(args, 'no_ast_cache', False):
+        return None
+    if getattr(args, 'ast_cache', None):
+        max_mb = float(os.environ.get('VERILOG_AST_CACHE_MB', DEFAULT_CACHE_MB))
+        return ParseCache(args.ast_cache, max_mb)
+    return default_cache()
+
+
+# ------------------------------
+# Preprocessing
+# ------------------------------
+
+class Preprocessor:
+    """Source list -> preprocessed text, through the on-disk cache when one is given.
+
+    mode 'iverilog' runs pyverilog's preprocess() (an `iverilog -E` subprocess plus
+    temp files), 'python' the in-process subset (PreprocessError on anything else),
+    'auto' the in-process one with a fallback to iverilog.
+    """
+
+    def __init__(self, mode: str = 'iverilog', cache: Optional[PreprocessCache] = None):
+        if mode not in PREPROCESSOR_MODES:
+            raise ValueError(f"preprocessor must be one of {', '.join(PREPROCESSOR_MODES)}")
+        self.mode = mode
+        self.cache = cache
+        self.fallbacks = 0
+
+    @property
+    def plain(self) -> bool:
+        """True when this is exactly what pyverilog's parse() does on its own."""
+        return self.mode == 'iverilog' and self.cache is None
+
+    def spec(self) -> tuple:
+        """Picklable settings for worker processes (see from_spec)."""
+        if self.cache is None:
+            return self.mode, None
+        return self.mode, (self.cache.cache_dir, self.cache.max_bytes / (1024 * 1024))
+
+    @classmethod
+    def from_spec(cls, spec) -> 'Preprocessor':
+        mode, cache_spec = spec
+        return cls(mode, PreprocessCache(*cache_spec) if cache_spec else None)
+
+    def without_cache(self) -> 'Preprocessor':
+        return self if self.cache is None else Preprocessor(self.mode)
+
+    def run(self, sources: Sequence[str], include: Sequence[str] = (), define: Sequence[str] = ()) -> str:
+        sources = list(sources)
+        key = self.cache.key(sources, include, define, self.mode) if self.cache else None
+        if key is not None:
+            text = self.cache.load(key)
+            if text is not None:
+                return text
+        text = self._run(sources, include, define)
+        if key is not None:
+            self.cache.store(key, text)
+        return text
+
+    def _run(self, sources: List[str], include: Sequence[str], define: Sequence[str]) -> str:
+        if self.mode != 'iverilog':
+            try:
+                return preprocess_sources(sources, include, define)
+            except PreprocessError:
+                if self.mode == 'python':
+                    raise
+                self.fallbacks += 1
+        fd, pp_out = tempfile.mkstemp(prefix='pyverilog_pp_', suffix='.v')
+        os.close(fd)
+        return preprocess(sources, output=pp_out, include=list(include), define=list(define))
+
+
+_preprocessor: Optional[Preprocessor] = None
+
+
+def default_preprocessor() -> Preprocessor:
+    mode = os.environ.get('VERILOG_PREPROCESSOR', 'iverilog') or 'iverilog'
+    cache_dir = os.environ.get('VERILOG_PP_CACHE', DEFAULT_PP_CACHE_DIR)
+    cache = None
+    if cache_dir.lower() not in ('', '0', 'off', 'none'):
+        cache = PreprocessCache(cache_dir, float(os.environ.get('VERILOG_PP_CACHE_MB', DEFAULT_PP_CACHE_MB)))
+    return Preprocessor(mode, cache)
+
+
+def get_preprocessor() -> Preprocessor:
+    """The process-wide preprocessor (from the environment unless set_preprocessor() was called)."""
+    global _preprocessor
+    if _preprocessor is None:
+        _preprocessor = default_preprocessor()
+    return _preprocessor
+
+
+def set_preprocessor(pp: Preprocessor) -> Preprocessor:
+    global _preprocessor
+    _preprocessor = pp
+    return pp
+
+
+def add_preprocess_arguments(ap) -> None:
+    """Add --preprocessor/--pp-cache/--no-pp-cache to an argparse parser."""
+    ap.add_argument('--preprocessor', choices=PREPROCESSOR_MODES, default=None,
+                    help='iverilog -E subprocess, in-process python subset, or auto (python, falling back '
+                         'to iverilog); default: $VERILOG_PREPROCESSOR or iverilog')
+    ap.add_argument('--pp-cache', default=None, metavar='DIR',
+                    help='Preprocessed text cache directory (default: $VERILOG_PP_CACHE or ~/.cache/verilog_pp)')
+    ap.add_argument('--no-pp-cache', action='store_true', help='Always run the preprocessor')
+
+
+def preprocessor_from_args(args) -> Preprocessor:
+    """Build the preprocessor selected on the command line and make it the process-wide one."""
+    pp = default_preprocessor()
+    if getattr(args, 'preprocessor', None):
+        pp.mode = args.preprocessor
+    if getattr(args, 'no_pp_cache', False):
+        pp.cache = None
+    elif getattr(args, 'pp_cache', None):
+        pp.cache = PreprocessCache(args.pp_cache, float(os.environ.get('VERILOG_PP_CACHE_MB', DEFAULT_PP_CACHE_MB)))
+    return set_preprocessor(pp)
+
+
+# ------------------------------
+# Parsing
+# ------------------------------
+
+_parser: Optional[VerilogParser] = None
+
+
+def get_parser() -> VerilogParser:
+    """One VerilogParser per process; building the yacc tables is the expensive part."""
+    global _parser
+    if _parser is None:
+        _parser = VerilogParser(outputdir=PARSER_TABLE_DIR, debug=False)
+    return _parser
+
+
+# 주석을 건너뛰고 정의 키워드가 하나라도 있는지 (빈 파일, 지시어만 있는 파일은 yacc에 넘기지 않음)
+DEFINITION_RE = re.compile(r'//[^\n]*|/\*.*?\*/|\b(module|macromodule|primitive)\b', re.S)
+
+
+def parse_text(text: str) -> ParseEntry:
+    """Parse already preprocessed text; return (definitions, directives)."""
+    if not any(m.group(1) for m in DEFINITION_RE.finditer(text)):
+        return (), ()
+    parser = get_parser()
+    parser.lexer.directives = []
+    parser.lexer.lexer.lineno = 1  # 파서를 재사용하므로 줄 번호를 파일마다 다시 시작
+    ast = parser.parse(text)
+    definitions = tuple(ast.description.definitions) if ast is not None else ()
+    return definitions, parser.get_directives()
+
+
+def parse_file(source: str, include: Sequence[str] = (), define: Sequence[str] = (),
+               pp: Optional[Preprocessor] = None) -> ParseEntry:
+    """Preprocess and parse a single file; return (definitions, directives)."""
+    pp = pp or get_preprocessor()
+    return parse_text(pp.run([source], include, define))
+
+
+# ------------------------------
+# Macro state across files
+# ------------------------------
+
+MACRO_TOKEN_RE = re.compile(rb'`([A-Za-z_][\w$]*)')
+MACRO_WRITERS = frozenset((b'define', b'undef', b'undefineall', b'include'))
+MACRO_PASSTHROUGH = frozenset(name.encode() for name in PASSTHROUGH)
+BOUNDARY_MODULE = '_verilog_frontend_file_boundary_'
+
+
+def macro_usage(source: str) -> Tuple[bool, bool]:
+    """(writes, reads): whether source may change the macro state later files see,
+    and whether its preprocessed text may depend on the state earlier files left."""
+    if not os.path.isfile(source):
+        data = source.encode()
+    elif os.path.getsize(source) == 0:
+        return False, False
+    else:
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _macro_usage(mm)
+    return _macro_usage(data)
+
+
+def _macro_usage(data) -> Tuple[bool, bool]:
+    writes = reads = False
+    for m in MACRO_TOKEN_RE.finditer(data):
+        name = m.group(1)
+        if name in MACRO_PASSTHROUGH:
+            continue
+        reads = True  # `define 본문, `include된 파일도 앞의 매크로를 쓸 수 있음
+        if name in MACRO_WRITERS:
+            writes = True
+            break
+    return writes, reads
+
+
+def plan_units(filelist: Sequence[str]) -> List[List[int]]:
+    """Group file indices into preprocessing units, in input order.
+
+    Every file is its own unit unless macro state crosses files: then the files
+    that write it and every reader after the first writer form one unit, which
+    is preprocessed in order like pyverilog's parse() does with the whole list.
+    Files that neither read nor write macros are unaffected and stay separate.
+    """
+    usage = [macro_usage(s) for s in filelist]
+    first = next((i for i, (writes, _) in enumerate(usage) if writes), None)
+    shared = [] if first is None else [i for i, (w, r) in enumerate(usage) if w or (r and i > first)]
+    if len(shared) < 2:
+        return [[i] for i in range(len(filelist))]
+    units = [[i] for i in range(len(filelist)) if i not in set(shared)]
+    units.append(shared)
+    units.sort(key=lambda unit: unit[0])
+    return units
+
+
+def parse_unit(sources: Sequence[str], include: Sequence[str] = (), define: Sequence[str] = (),
+               pp: Optional[Preprocessor] = None) -> List[ParseEntry]:
+    """Preprocess sources as one unit (macros carry over) and split the result back per file.
+
+    A one-line boundary module is put between the files; its position in the
+    parsed definitions (and its line number, for the directives) marks where
+    each file's output starts.
+    """
+    sources = list(sources)
+    if len(sources) == 1:
+        return [parse_file(sources[0], include, define, pp)]
+    pp = pp or get_preprocessor()
+    with tempfile.TemporaryDirectory(prefix='verilog_unit_') as tmp:
+        chain = []
+        for k, source in enumerate(sources):
+            if k:
+                marker = os.path.join(tmp, f'boundary{k}.v')
+                with open(marker, 'w') as f:
+                    f.write(f"\nmodule {BOUNDARY_MODULE}{k}; endmodule\n")
+                chain.append(marker)
+            chain.append(source)
+        definitions, directives = parse_text(pp.run(chain, include, define))
+    per_file = [([], []) for _ in sources]
+    bounds = []
+    k = 0
+    for d in definitions:
+        if isinstance(d, ModuleDef) and d.name.startswith(BOUNDARY_MODULE):
+            k = int(d.name[len(BOUNDARY_MODULE):])
+            bounds.append(d.lineno)
+            continue
+        per_file[k][0].append(d)
+    for directive in directives:
+        per_file[bisect.bisect_right(bounds, directive[0])][1].append(directive)
+    return [(tuple(defs), tuple(dirs)) for defs, dirs in per_file]
+
+
+def make_source(definitions) -> Source:
+    return Source(name='', description=Description(definitions=tuple(definitions)))
+
+
+def _parse_worker(task):
+    """Process-pool worker: parse one unit, going through the cache when given one.
+
+    On a cache hit only the key travels back; the parent unpickles the entry from
+    disk instead of having it pickled twice through the pool.
+    """
+    sources, include, define, cache_spec, pp_spec = task
+    pp = set_preprocessor(Preprocessor.from_spec(pp_spec))
+    if cache_spec is None:
+        return None, parse_unit(sources, include, define, pp)
+    cache = ParseCache(*cache_spec)
+    key = cache.key(_unit_key_source(sources), include, define)
+    if os.path.exists(cache.entry_path(key)):
+        return key, None
+    entries = parse_unit(sources, include, define, pp.without_cache())
+    cache.store(key, _unit_cache_entry(entries))
+    return key, entries
+
+
+def _unit_key_source(sources: Sequence[str]):
+    # 파일 하나면 예전과 같은 키 (기존 캐시 항목 그대로 사용)
+    return sources[0] if len(sources) == 1 else list(sources)
+
+
+def _unit_cache_entry(entries: List[ParseEntry]):
+    return entries[0] if len(entries) == 1 else entries
+
+
+def _unit_entries(entry, n: int) -> List[ParseEntry]:
+    return [entry] if n == 1 else list(entry)
+
+
+def resolve_jobs(jobs: int) -> int:
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+def parse_files(filelist, include: Sequence[str] = (), define: Sequence[str] = (),
+                cache: Optional[ParseCache] = None, jobs: int = 1,
+                only: Optional[Sequence[str]] = None) -> List[Tuple[str, ParseEntry]]:
+    """Parse each file on its own; return [(source, (definitions, directives)), ...] in input order.
+
+    Files that share macro state are preprocessed together (plan_units()) but
+    still reported one entry per file. jobs > 1 spreads the units over worker
+    processes (0 = one per core). With an AST cache the preprocessed text is not
+    cached as well, the AST entry covers it. only: parse just the units that
+    contain one of these files (the other files still decide the units).
+    """
+    filelist = list(filelist)
+    units = [[filelist[i] for i in unit] for unit in plan_units(filelist)]
+    if only is not None:
+        wanted = set(only)
+        units = [unit for unit in units if wanted.intersection(unit)]
+    jobs = min(resolve_jobs(jobs), max(len(units), 1))
+    results: List[Tuple[str, ParseEntry]] = []
+    pp = get_preprocessor().without_cache() if cache else get_preprocessor()
+
+    if jobs == 1:
+        for unit in units:
+            key = cache.key(_unit_key_source(unit), include, define) if cache else None
+            entry = cache.load(key) if cache else None
+            if entry is None:
+                entries = parse_unit(unit, include, define, pp)
+                if cache:
+                    cache.store(key, _unit_cache_entry(entries))
+            else:
+                entries = _unit_entries(entry, len(unit))
+            results.extend(zip(unit, entries))
+    else:
+        cache_spec = (cache.cache_dir, cache.max_bytes / (1024 * 1024)) if cache else None
+        pp_spec = get_preprocessor().spec()
+        tasks = [(unit, list(include), list(define), cache_spec, pp_spec) for unit in units]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for unit, (key, entries) in zip(units, pool.map(_parse_worker, tasks)):
+                if entries is None:
+                    entry = cache.load(key)
+                    if entry is None:  # evicted by another worker in the meantime
+                        entries = parse_unit(unit, include, define, pp)
+                    else:
+                        entries = _unit_entries(entry, len(unit))
+                elif cache:
+                    cache.misses += 1
+                results.extend(zip(unit, entries))
+    order = {source: i for i, source in enumerate(filelist)}
+    results.sort(key=lambda r: order[r[0]])
+    return results
+
+
+def parse_verilog(filelist, preprocess_include=None, preprocess_define=None, cache='default', jobs=1):
+    """Drop-in for pyverilog's parse(); returns (ast, directives).
+
+    cache: a ParseCache, None to disable, or 'default' for default_cache().
+    jobs:  number of parser processes (0 = one per core).
+    """
+    include = list(preprocess_include or [])
+    define = normalize_defines(preprocess_define)
+    if cache == 'default':
+        cache = default_cache()
+    if cache is None and jobs == 1:
+        pp = get_preprocessor()
+        if pp.plain:
+            return parse(list(filelist), preprocess_include=include, preprocess_define=define,
+                         outputdir=PARSER_TABLE_DIR, debug=False)
+        # 파일 전체를 한 번에 전처리 (앞 파일의 `define이 뒤 파일에 보이도록)
+        definitions, directives = parse_text(pp.run(filelist, include, define))
+        if pp.cache:
+            sys.stderr.write(pp.cache.report() + '\n')
+        return make_source(definitions), directives
+
+    definitions = []
+    directives = []
+    for _, (defs, dirs) in parse_files(filelist, include, define, cache, jobs):
+        definitions.extend(defs)
+        directives.extend(dirs)
+    if cache:
+        sys.stderr.write(cache.report() + '\n')
+    return make_source(definitions), tuple(directives)
+
+
+# ------------------------------
+# Merged module index
+# ------------------------------
+
+class DuplicateModuleError(ValueError):
+    pass
+
+
+def build_module_index(parsed: Sequence[Tuple[str, ParseEntry]], on_duplicate: str = 'warn',
+                       identical: Optional[List[ModuleDef]] = None) -> Dict[str, ModuleDef]:
+    """Merge per-file results into {module name: ModuleDef}.
+
+    A duplicate definition that is structurally identical to the one already
+    indexed (same design_hash.local_hash) is dropped silently and appended to
+    identical. For real conflicts, on_duplicate: 'error' raises
+    DuplicateModuleError, 'warn' reports on stderr and keeps the last definition
+    (what a plain dict over the definitions does), 'first' keeps the first one silently.
+    """
+    from design_hash import local_hash  # design_hash imports this module
+
+    index: Dict[str, ModuleDef] = {}
+    origin: Dict[str, str] = {}
+    hashes: Dict[str, str] = {}
+    duplicates: List[str] = []
+    dropped = 0
+    for source, (definitions, _) in parsed:
+        for d in definitions:
+            if not isinstance(d, ModuleDef):
+                continue
+            if d.name in index:
+                if d.name not in hashes:
+                    hashes[d.name] = local_hash(index[d.name])
+                if local_hash(d) == hashes[d.name]:
+                    dropped += 1
+                    if identical is not None:
+                        identical.append(d)
+                    continue
+                duplicates.append(f"{d.name} ({origin[d.name]}, {source})")
+                if on_duplicate == 'first':
+                    continue
+            index[d.name] = d
+            origin[d.name] = source
+            hashes.pop(d.name, None)
+    if dropped:
+        sys.stderr.write(f"[dedup] {dropped} identical duplicate module definition(s) merged\n")
+    if duplicates and on_duplicate == 'error':
+        raise DuplicateModuleError('Duplicate module definitions: ' + '; '.join(duplicates))
+    if duplicates and on_duplicate == 'warn':
+        for dup in duplicates:
+            sys.stderr.write(f"[WARN] Duplicate module definition: {dup}\n")
+    return index
+
+
+def parse_module_index(filelist, preprocess_include=None, preprocess_define=None,
+                       cache='default', jobs=1, on_duplicate='warn'):
+    """Parse files (optionally in parallel) and return (ast, module index)."""
+    include = list(preprocess_include or [])
+    define = normalize_defines(preprocess_define)
+    if cache == 'default':
+        cache = default_cache()
+    parsed = parse_files(filelist, include, define, cache, jobs)
+    if cache:
+        sys.stderr.write(cache.report() + '\n')
+    identical: List[ModuleDef] = []
+    index = build_module_index(parsed, on_duplicate, identical)
+    dropped = {id(d) for d in identical}
+    ast = make_source(d for _, (defs, _) in parsed for d in defs if id(d) not in dropped)
+    return ast, index
+
+
+# ------------------------------
+# Lazy, reachability-driven parsing
+# ------------------------------
+
+# Comments and strings are matched first so that 'module' inside them is skipped.
+MODULE_SCAN_RE = re.compile(
+    rb'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"'
+    rb'|\b(?:macro)?module\s+([A-Za-z_][\w$]*)|\bendmodule\b',
+    re.S,
+)
+
+
+def iter_module_spans(buf, pos: int = 0, endpos: Optional[int] = None):
+    """Yield (module name, start, end) from a bytes-like buffer (e.g. an mmap)."""
+    name = None
+    start = 0
+    endpos = len(buf) if endpos is None else endpos
+    for m in MODULE_SCAN_RE.finditer(buf, pos, endpos):
+        if m.group(1) is not None:
+            name = m.group(1).decode()
+            start = m.start()
+        elif name is not None and m.group(0) == b'endmodule':
+            yield name, start, m.end()
+            name = None
+
+
+def scan_module_offsets(path: str) -> List[Tuple[str, int, int]]:
+    """Return [(module name, start byte, end byte)] for a file without parsing it."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return list(iter_module_spans(mm))
+
+
+def instantiated_modules(node) -> List[str]:
+    """Module names instantiated anywhere under node (generate blocks included)."""
+    names: List[str] = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, InstanceList):
+            names.append(n.module)
+            continue
+        stack.extend(n.children())
+    return names
+
+
+def parse_module_text(text: str, include: Sequence[str] = (), define: Sequence[str] = ()) -> ModuleDef:
+    """Parse the source of a single module cut out of a larger file.
+
+    Text without any backtick is handed straight to the parser; text that uses
+    macros goes through the preprocessor with the given include/define settings
+    (`define`s from elsewhere in the original file are not seen in that case).
+    """
+    if '`' in text:
+        definitions, _ = parse_file(text, include, define)
+    else:
+        definitions = get_parser().parse(text).description.definitions
+    return next(d for d in definitions if isinstance(d, ModuleDef))
+
+
+class LazyModuleIndex:
+    """module name -> (file, start, end); ModuleDefs are parsed only when asked for."""
+
+    def __init__(self, filelist, preprocess_include=None, preprocess_define=None):
+        self.include = list(preprocess_include or [])
+        self.define = normalize_defines(preprocess_define)
+        self.spans: Dict[str, Tuple[str, int, int]] = {}
+        self.parsed: Dict[str, ModuleDef] = {}
+        for path in filelist:
+            for name, start, end in scan_module_offsets(path):
+                if name in self.spans:
+                    sys.stderr.write(f"[WARN] Duplicate module definition: {name} "
+                                     f"({self.spans[name][0]}, {path})\n")
+                self.spans[name] = (path, start, end)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.spans
+
+    def source_text(self, name: str) -> str:
+        path, start, end = self.spans[name]
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start).decode('utf-8', errors='replace')
+
+    def get(self, name: str) -> ModuleDef:
+        if name not in self.parsed:
+            self.parsed[name] = parse_module_text(self.source_text(name), self.include, self.define)
+        return self.parsed[name]
+
+    def load_reachable(self, top: str) -> Dict[str, ModuleDef]:
+        """Parse top and, transitively, every defined module it instantiates."""
+        result: Dict[str, ModuleDef] = {}
+        stack = [top]
+        while stack:
+            name = stack.pop()
+            if name in result or name not in self.spans:
+                continue
+            mod = self.get(name)
+            result[name] = mod
+            stack.extend(c for c in instantiated_modules(mod) if c not in result)
+        return result
+
+
+def parse_reachable(filelist, top: str, preprocess_include=None, preprocess_define=None) -> Dict[str, ModuleDef]:
+    return LazyModuleIndex(filelist, preprocess_include, preprocess_define).load_reachable(top)
+
+
+# ------------------------------
+# Self check
+# ------------------------------
+
+SELF_CHECK_FILES = {
+    'defs.v': '`define CELL tranif1\n',
+    'empty.v': '',
+    'directives.v': '`timescale 1ns/1ps\n// no module here\n',
+    'use.v': 'module top(inout a, b, input g);\n  `CELL t0 (a, b, g);\n  leaf l0 (.a(a));\nendmodule\n',
+    'leaf.v': '`timescale 1ns/1ps\nmodule leaf(inout a);\n  tranif1 t1 (a, a, a);\nendmodule\n',
+}
+
+
+def self_check() -> None:
+    """Regression check: a macro defined in an earlier file, plus empty and directive-only
+    files, through every parse path (no cache / cache miss / cache hit, 1 and 2 jobs)."""
+    with tempfile.TemporaryDirectory(prefix='verilog_frontend_check_') as tmp:
+        files = []
+        for name, text in SELF_CHECK_FILES.items():
+            files.append(os.path.join(tmp, name))
+            with open(files[-1], 'w') as f:
+                f.write(text)
+        cache = ParseCache(os.path.join(tmp, 'cache'))
+        for label, cache_arg, jobs in (('no cache', None, 1), ('no cache, -j 2', None, 2),
+                                       ('cache miss', cache, 1), ('cache hit', cache, 1),
+                                       ('cache hit, -j 2', cache, 2)):
+            _, index = parse_module_index(files, cache=cache_arg, jobs=jobs)
+            cells = [i.module for i in index['top'].items if isinstance(i, InstanceList)]
+            assert sorted(index) == ['leaf', 'top'] and cells == ['tranif1', 'leaf'], (label, cells)
+            ast, _ = parse_verilog(files, cache=cache_arg, jobs=jobs)
+            assert [d.name for d in ast.description.definitions] == ['top', 'leaf'], label
+            print(f"[OK] {label}")
+        assert index['leaf'].lineno == 2, index['leaf'].lineno
+
+
+if __name__ == '__main__':
+    import argparse
+    ap = argparse.ArgumentParser(description='Shared Verilog front-end (library); run its regression check')
+    ap.add_argument('--self-check', action='store_true', required=True,
+                    help='Parse a small multi-file design through every cache/jobs path')
+    add_preprocess_arguments(ap)
+    preprocessor_from_args(ap.parse_args())
+    self_check()
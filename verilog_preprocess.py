@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+In-process Verilog preprocessor for the common directive subset.
+
+Handles `define (object-like and function-like macros, backslash line
+continuation), `undef, `ifdef / `ifndef / `elsif / `else / `endif, `include "file"
+and macro expansion, plus `__FILE__ / `__LINE__. Other compiler directives
+(`timescale, `default_nettype, `celldefine, ...) are passed through untouched for
+the parser. Comments and string literals are copied as-is and never expanded.
+
+Anything outside that subset (token pasting ``, `" stringification, an `include
+whose file name is a macro, an undefined macro, a missing include file) raises
+PreprocessError, so a caller can fall back to `iverilog -E` for that source.
+
+Like `iverilog -E`, several sources are preprocessed as one unit (a macro defined
+in one file is visible in the next), -D FOO defines FOO as 1, and `include paths
+are looked up as given (relative to the working directory) and then in each
+include directory. Skipped lines and directives are replaced by the same number
+of newlines, so outside included text parser line numbers still match the source.
+
+Usage:
+  python verilog_preprocess.py -I inc -D WIDTH=8 top.v > top.pp.v
+"""
+
+import argparse
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MAX_INCLUDE_DEPTH = 64
+MAX_EXPANSION_DEPTH = 64
+
+# 지시어/매크로 사용 위치만 찾고, 주석과 문자열은 통째로 건너뜀
+SCAN_RE = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|`([A-Za-z_][\w$]*)', re.S)
+NAME_RE = re.compile(r'[ \t]*([A-Za-z_][\w$]*)')
+INCLUDE_RE = re.compile(r'[ \t]*(?:"([^"\n]+)"|<([^>\n]+)>)')
+DEFINE_LINE_RE = re.compile(r'(?:[^\\\n]|\\[^\n])*(?:\\\n(?:[^\\\n]|\\[^\n])*)*')
+LINE_COMMENT_RE = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+STRING_RE = re.compile(r'"(?:\\.|[^"\\\n])*"')
+DEFINE_HEAD_RE = re.compile(r'[ \t]*([A-Za-z_][\w$]*)(\([^)]*\))?')
+ARGS_OPEN_RE = re.compile(r'\s*\(')
+
+CONDITIONALS = frozenset(('ifdef', 'ifndef', 'elsif', 'else', 'endif'))
+PASSTHROUGH = frozenset((
+    'timescale', 'default_nettype', 'resetall', 'celldefine', 'endcelldefine',
+    'unconnected_drive', 'nounconnected_drive', 'line', 'pragma',
+    'begin_keywords', 'end_keywords', 'default_decay_time', 'default_trireg_strength',
+    'delay_mode_distributed', 'delay_mode_path', 'delay_mode_unit', 'delay_mode_zero',
+))
+
+Macro = Tuple[Optional[List[str]], str]  # (parameter names or None, body)
+
+
+class PreprocessError(ValueError):
+    pass
+
+
+def parse_define_option(text: str) -> Tuple[str, str]:
+    """'FOO=1' -> ('FOO', '1'); a bare 'FOO' is defined as 1, as with iverilog -D."""
+    name, eq, value = text.partition('=')
+    return name.strip(), value if eq else '1'
+
+
+def resolve_include(name: str, include: Sequence[str]) -> Optional[str]:
+    if os.path.isabs(name):
+        return name if os.path.isfile(name) else None
+    for base in ('',) + tuple(include):
+        path = os.path.join(base, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def split_macro_args(text: str, pos: int) -> Tuple[List[str], int]:
+    """Split '(a, f(b, c), {d, e})' starting at text[pos] == '('; return (args, end)."""
+    args: List[str] = []
+    depth = 0
+    start = pos + 1
+    i = pos
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '"':
+            m = STRING_RE.match(text, i)
+            i = m.end() if m else i + 1
+            continue
+        if c in '([{':
+            depth += 1
+        elif c in ')]}':
+            depth -= 1
+            if depth == 0:
+                args.append(text[start:i].strip())
+                return args, i + 1
+        elif c == ',' and depth == 1:
+            args.append(text[start:i].strip())
+            start = i + 1
+        i += 1
+    raise PreprocessError('unterminated macro argument list')
+
+
+class MiniPreprocessor:
+    def __init__(self, include: Sequence[str] = (), define: Sequence[str] = ()):
+        self.include = list(include)
+        self.macros: Dict[str, Macro] = {}
+        for d in define:
+            name, value = parse_define_option(d)
+            self.macros[name] = (None, value)
+        self.included: List[str] = []
+
+    def run(self, sources: Sequence[str]) -> str:
+        """Preprocess files (or Verilog text given as a string) as one unit."""
+        out = []
+        for source in sources:
+            if os.path.isfile(source):
+                with open(source, encoding='utf-8', errors='replace') as f:
+                    out.append(self.expand(f.read(), source))
+            else:
+                out.append(self.expand(source, '<string>'))
+        return '\n'.join(out) + '\n'
+
+    def expand(self, text: str, filename: str, depth: int = 0) -> str:
+        if depth > MAX_INCLUDE_DEPTH:
+            raise PreprocessError(f'{filename}: `include nested too deeply')
+        out: List[str] = []
+        # 조건부 스택: (바깥이 활성인지, 현재 분기가 활성인지, 이미 택한 분기가 있는지)
+        conds: List[Tuple[bool, bool, bool]] = []
+        active = True
+        pos = 0
+        for m in SCAN_RE.finditer(text):
+            if m.start() < pos:
+                continue  # 앞에서 처리한 지시어 줄 안쪽
+            chunk = text[pos:m.start()]
+            out.append(chunk if active else '\n' * chunk.count('\n'))
+            pos = m.end()
+            name = m.group(1)
+            if name is None:
+                # 주석/문자열
+                out.append(m.group(0) if active else '\n' * m.group(0).count('\n'))
+                continue
+
+            if name in CONDITIONALS:
+                if name in ('ifdef', 'ifndef', 'elsif'):
+                    nm = NAME_RE.match(text, pos)
+                    if not nm:
+                        raise PreprocessError(f'{filename}: `{name} without a macro name')
+                    pos = nm.end()
+                    defined = nm.group(1) in self.macros
+                if name in ('ifdef', 'ifndef'):
+                    taken = active and (defined if name == 'ifdef' else not defined)
+                    conds.append((active, taken, taken))
+                    active = taken
+                elif not conds:
+                    raise PreprocessError(f'{filename}: `{name} without `ifdef')
+                elif name == 'endif':
+                    active = conds.pop()[0]
+                else:
+                    outer, _, done = conds[-1]
+                    taken = outer and not done and (defined if name == 'elsif' else True)
+                    conds[-1] = (outer, taken, done or taken)
+                    active = taken
+                continue
+
+            if not active:
+                continue
+
+            if name == 'define':
+                line = DEFINE_LINE_RE.match(text, pos)
+                pos = line.end()
+                self.define(line.group(0), filename)
+                out.append('\n' * line.group(0).count('\n'))
+            elif name == 'undef':
+                nm = NAME_RE.match(text, pos)
+                if not nm:
+                    raise PreprocessError(f'{filename}: `undef without a macro name')
+                pos = nm.end()
+                self.macros.pop(nm.group(1), None)
+            elif name == 'include':
+                im = INCLUDE_RE.match(text, pos)
+                if not im:
+                    raise PreprocessError(f'{filename}: unsupported `include form')
+                pos = im.end()
+                inc = im.group(1) or im.group(2)
+                path = resolve_include(inc, self.include)
+                if path is None:
+                    raise PreprocessError(f'{filename}: include file not found: {inc}')
+                self.included.append(path)
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    out.append(self.expand(f.read(), path, depth + 1))
+            elif name in PASSTHROUGH:
+                out.append(m.group(0))
+            elif name == '__FILE__':
+                out.append(f'"{filename}"')
+            elif name == '__LINE__':
+                out.append(str(text.count('\n', 0, m.start()) + 1))
+            else:
+                body, pos = self.expand_macro(name, text, pos, filename, 0)
+                out.append(body)
+
+        if conds:
+            raise PreprocessError(f'{filename}: missing `endif')
+        out.append(text[pos:] if active else '\n' * text.count('\n', pos))
+        return ''.join(out)
+
+    def define(self, line: str, filename: str) -> None:
+        m = DEFINE_HEAD_RE.match(line)
+        if not m:
+            raise PreprocessError(f'{filename}: `define without a macro name')
+        body = line[m.end():].replace('\\\n', ' ')
+        body = LINE_COMMENT_RE.sub(' ', body).strip()
+        if '``' in body or '`"' in body or '`\\`"' in body:
+            raise PreprocessError(f'{filename}: token pasting/stringification in `{m.group(1)}')
+        params = None
+        if m.group(2) is not None:
+            params = [p.strip() for p in m.group(2)[1:-1].split(',') if p.strip()]
+            if any('=' in p for p in params):
+                raise PreprocessError(f'{filename}: default macro arguments in `{m.group(1)}')
+        self.macros[m.group(1)] = (params, body)
+
+    def expand_macro(self, name: str, text: str, pos: int, filename: str, depth: int) -> Tuple[str, int]:
+        if name not in self.macros:
+            raise PreprocessError(f'{filename}: undefined macro `{name}')
+        if depth > MAX_EXPANSION_DEPTH:
+            raise PreprocessError(f'{filename}: recursive expansion of `{name}')
+        params, body = self.macros[name]
+        if params is not None:
+            m = ARGS_OPEN_RE.match(text, pos)
+            if not m:
+                raise PreprocessError(f'{filename}: `{name} used without arguments')
+            args, pos = split_macro_args(text, m.end() - 1)
+            if args == [''] and not params:
+                args = []
+            if len(args) != len(params):
+                raise PreprocessError(f'{filename}: `{name} expects {len(params)} argument(s), got {len(args)}')
+            if params:
+                values = dict(zip(params, args))
+                body = re.sub(r'\b(' + '|'.join(map(re.escape, params)) + r')\b',
+                              lambda p: values[p.group(1)], body)
+        if '`' in body:
+            body = self.rescan(body, filename, depth + 1)
+        return body, pos
+
+    def rescan(self, body: str, filename: str, depth: int) -> str:
+        """Expand macro uses inside an expanded body."""
+        out: List[str] = []
+        pos = 0
+        for m in SCAN_RE.finditer(body):
+            if m.start() < pos:
+                continue
+            out.append(body[pos:m.start()])
+            pos = m.end()
+            name = m.group(1)
+            if name is None or name in PASSTHROUGH:
+                out.append(m.group(0))
+            elif name in CONDITIONALS or name in ('define', 'undef', 'include'):
+                raise PreprocessError(f'{filename}: `{name} inside a macro body')
+            else:
+                text, pos = self.expand_macro(name, body, pos, filename, depth)
+                out.append(text)
+        out.append(body[pos:])
+        return ''.join(out)
+
+
+def preprocess_sources(sources: Sequence[str], include: Sequence[str] = (), define: Sequence[str] = ()) -> str:
+    """Drop-in for pyverilog's preprocess() without the iverilog subprocess; may raise PreprocessError."""
+    return MiniPreprocessor(include, define).run(sources)
+
+
+# ------------------------------
+# Include dependencies (cache keys)
+# ------------------------------
+
+INCLUDE_SCAN_RE = re.compile(rb'`include[ \t]*(?:"([^"\n]+)"|<([^>\n]+)>|(\S+))')
+
+
+def include_dependencies(sources: Sequence[str], include: Sequence[str] = ()) -> Tuple[List[Tuple[str, Optional[str]]], bool]:
+    """Transitive `include files of sources, without preprocessing them.
+
+    Returns ([(include name, resolved path or None)], resolvable). Includes are
+    collected regardless of `ifdef state (a superset is fine for a cache key);
+    resolvable is False when a file name comes from a macro.
+    """
+    deps: List[Tuple[str, Optional[str]]] = []
+    seen = set()
+    resolvable = True
+    stack = []
+    for source in sources:
+        if os.path.isfile(source):
+            stack.append(source)
+        elif b'`include' in source.encode():
+            stack.append(source.encode())
+    while stack:
+        item = stack.pop()
+        if isinstance(item, bytes):
+            data = item
+        else:
+            with open(item, 'rb') as f:
+                data = f.read()
+        if b'`include' not in data:
+            continue
+        for m in INCLUDE_SCAN_RE.finditer(data):
+            if m.group(3) is not None:
+                resolvable = False
+                continue
+            name = (m.group(1) or m.group(2)).decode('utf-8', errors='replace')
+            path = resolve_include(name, include)
+            if (name, path) in seen:
+                continue
+            seen.add((name, path))
+            deps.append((name, path))
+            if path is not None:
+                stack.append(path)
+    return deps, resolvable
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Preprocess Verilog (`include/`define/`ifdef subset) in-process')
+    ap.add_argument('sources', nargs='+', help='Verilog sources')
+    ap.add_argument('-I', '--incdir', action='append', default=[], help='include search dir')
+    ap.add_argument('-D', '--define', action='append', default=[], help='macro define (e.g. FOO=1)')
+    ap.add_argument('-o', '--out', default=None, help='Output file (default: stdout)')
+    args = ap.parse_args()
+
+    try:
+        text = preprocess_sources(args.sources, args.incdir, args.define)
+    except PreprocessError as e:
+        raise SystemExit(f"ERROR: {e}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,18 @@
-from pyverilog.vparser.parser import parse
-from collections import defaultdict, deque
-import pygraphviz as pgv
+from verilog_frontend import parse_verilog, parse_reachable, make_source
+from netlist_scanner import scan_structural
+from design_db import DesignDB
+from design_analysis import AnalysisEngine, InstancesAnalysis
+from design_watch import IncrementalDesign, watch
+from design_server import DesignClient
+from collections import Counter, defaultdict, deque
+import argparse
+import csv
+import json
+import math
 
-def extract_edges_and_modules(ast):
-    edges = set()
+def extract_edge_counts(ast):
+    # (parent, child) -> parent 하나 안의 child 인스턴스 수
+    edge_counts = Counter()
     defined_modules = set()
     description = ast.description
 
@@ -11,125 +20,421 @@ def extract_edges_and_modules(ast):
     for definition in description.definitions:
         if definition.__class__.__name__ != 'ModuleDef':
             continue
-        module_name = definition.name
-        defined_modules.add(module_name)
-
-        # 모듈 내 instantiation 관계 수집
-        for item in definition.items:
-            if item.__class__.__name__ == 'InstanceList':
-                for instance in item.instances:
-                    edges.add((module_name, item.module))  # parent, child
-
-    return edges, defined_modules
-
-def find_reachable_nodes(edges, top_module):
-    graph = defaultdict(list)
-    for parent, child in edges:
-        graph[parent].append(child)
-
-    reachable = set()
-    queue = deque([top_module])
-    while queue:
-        node = queue.popleft()
-        if node in reachable:
-            continue
-        reachable.add(node)
-        for child in graph[node]:
-            queue.append(child)
-    return reachable
-
-def filter_edges(edges, reachable, defined_modules):
-    # primitive (moduleDef 없는 것)으로 향하는 edge 제거
-    return set(
-        (p, c) for (p, c) in edges
-        if p in reachable and c in reachable and c in defined_modules
-    )
-
-def compute_depths(edges, top_module):
-    graph = defaultdict(list)
-    indegree = defaultdict(int)
-
-    for parent, child in edges:
-        graph[parent].append(child)
-        indegree[child] += 1
-        if parent not in indegree:
-            indegree[parent] = 0
-
-    # Topological sort
-    queue = deque()
-    for node, deg in indegree.items():
-        if deg == 0:
-            queue.append(node)
-
-    topo_order = []
-    while queue:
-        node = queue.popleft()
-        topo_order.append(node)
-        for child in graph[node]:
-            indegree[child] -= 1
-            if indegree[child] == 0:
-                queue.append(child)
-
-    # Depth DP
-    depth = defaultdict(int)
-    for node in topo_order:
-        for child in graph[node]:
-            depth[child] = max(depth[child], depth[node] + 1)
-
-    return depth
-
-def build_graphviz(edges, depths):
+        defined_modules.add(definition.name)
+        edge_counts.update(extract_module_edge_counts(definition))
+
+    return edge_counts, defined_modules
+
+EDGE_ENGINE = AnalysisEngine([InstancesAnalysis()])
+
+def extract_module_edge_counts(definition):
+    instances, = EDGE_ENGINE.analyze(definition)
+    return Counter((definition.name, child) for _, child, nested in instances if not nested)
+
+def extract_edge_counts_db(db):
+    return Counter(db.iter_edges()), set(db.module_names())
+
+def extract_edge_counts_server(socket_path):
+    with DesignClient(socket_path) as client:
+        edge_counts = Counter(tuple(e) for e in client.query('edges'))
+        return edge_counts, set(client.query('modules'))
+
+# ------------------------------
+# TOP 기준 계층 분석 (한 번의 DFS + 위상 순서 두 번 훑기)
+# ------------------------------
+
+def child_counts(edge_counts):
+    children = defaultdict(list)
+    for (parent, child), n in edge_counts.items():
+        children[parent].append((child, n))
+    for kids in children.values():
+        kids.sort()
+    return children
+
+class HierarchyStats:
+    """Per-module numbers for the hierarchy below one top (see analyze_hierarchy)."""
+
+    NODE_FIELDS = ['module', 'depth', 'min_depth', 'multiplicity', 'child_types',
+                   'module_types', 'instances', 'leaf_cells', 'flat_leaf_cells']
+    EDGE_FIELDS = ['parent', 'child', 'count', 'flat_count']
+
+    def __init__(self, top_module):
+        self.top = top_module
+        self.order = []                    # 위상 순서 (TOP 먼저), TOP에서 도달 가능한 정의된 모듈만
+        self.children = {}                 # module -> [(defined child, instances per parent)]
+        self.depth = {}                    # longest path from TOP
+        self.min_depth = {}                # shortest path from TOP
+        self.multiplicity = defaultdict(int)   # 평탄화 시 등장 횟수
+        self.instances = {}                # 인스턴스 하나 아래의 평탄화 모듈 인스턴스 수
+        self.leaf_cells = {}               # 인스턴스 하나 아래의 평탄화 leaf cell 수
+        self.module_types = {}             # 아래에 있는 서로 다른 모듈 종류 수
+        self.cycles = []                   # [[a, b, ..., a]] 재귀 인스턴스 경로
+        self.back_edges = set()
+
+    def edges(self):
+        return {(p, c): n for p in self.order for c, n in self.children[p]}
+
+    def node_attrs(self, node):
+        return {
+            'kind': 'module',
+            'depth': self.depth[node],
+            'min_depth': self.min_depth[node],
+            'multiplicity': self.multiplicity[node],
+            'leaf_cells': self.leaf_cells[node],
+            'flat_leaf_cells': self.multiplicity[node] * self.leaf_cells[node],
+        }
+
+    def node_rows(self):
+        for m in self.order:
+            yield [m, self.depth[m], self.min_depth[m], self.multiplicity[m], len(self.children[m]),
+                   self.module_types[m], self.instances[m], self.leaf_cells[m],
+                   self.multiplicity[m] * self.leaf_cells[m]]
+
+    def edge_rows(self):
+        for (p, c), n in self.edges().items():
+            yield [p, c, n, self.multiplicity[p] * n]
+
+    def write_csv(self, path, edges_path=None):
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(self.NODE_FIELDS)
+            w.writerows(self.node_rows())
+        if edges_path:
+            with open(edges_path, 'w', newline='') as f:
+                w = csv.writer(f)
+                w.writerow(self.EDGE_FIELDS)
+                w.writerows(self.edge_rows())
+
+def analyze_hierarchy(edge_counts, top_module, defined_modules):
+    """Depths, multiplicity, subtree totals and cycles below top_module.
+
+    Everything except module_types takes O(V + E). module_types (distinct module
+    types below each module) is a union of the children's type sets, so it costs
+    O(E * T) in the worst case, T being the number of types below; identical
+    sets are shared, which keeps repeated subtrees cheap.
+
+    edge_counts: {(parent, child): instances per parent}, leaf cells included
+    (children that are not in defined_modules count as leaf cells). Only modules
+    reachable from top_module are visited. An instantiation that closes a cycle is
+    recorded in cycles/back_edges and otherwise ignored.
+    """
+    stats = HierarchyStats(top_module)
+    all_children = child_counts(edge_counts)
+
+    # 1) TOP에서 DFS: 후위 순서 + back edge(사이클) 검출
+    state = {top_module: 1}                # 1 = DFS 경로 위, 2 = 완료
+    path = [top_module]
+    stack = [(top_module, iter(all_children[top_module]))]
+    post = []
+    while stack:
+        node, it = stack[-1]
+        for child, n in it:
+            if child not in defined_modules:
+                continue
+            seen = state.get(child)
+            if seen is None:
+                state[child] = 1
+                path.append(child)
+                stack.append((child, iter(all_children[child])))
+                break
+            if seen == 1:
+                stats.cycles.append(path[path.index(child):] + [child])
+                stats.back_edges.add((node, child))
+        else:
+            stack.pop()
+            path.pop()
+            state[node] = 2
+            post.append(node)
+    stats.order = post[::-1]
+
+    for node in stats.order:
+        stats.children[node] = [(c, n) for c, n in all_children[node]
+                                if c in defined_modules and (node, c) not in stats.back_edges]
+
+    # 2) 위상 순서대로: depth / min_depth / multiplicity
+    stats.depth[top_module] = stats.min_depth[top_module] = 0
+    stats.multiplicity[top_module] = 1
+    for node in stats.order:
+        d, md, mult = stats.depth[node] + 1, stats.min_depth[node] + 1, stats.multiplicity[node]
+        for child, n in stats.children[node]:
+            stats.depth[child] = max(stats.depth.get(child, 0), d)
+            stats.min_depth[child] = min(stats.min_depth.get(child, md), md)
+            stats.multiplicity[child] += mult * n
+
+    # 3) 역순으로: 서브트리 leaf cell / 인스턴스 / 모듈 종류
+    # 종류 집합은 같은 내용이면 하나의 frozenset을 공유 (반복되는 서브트리는 한 번만 저장)
+    interned = {}
+    below = {}                             # module -> frozenset(자기 아래의 모듈 종류, 자기 자신 제외)
+    for node in post:
+        leaves = sum(n for c, n in all_children[node] if c not in defined_modules)
+        inst = 0
+        types = set()
+        for child, n in stats.children[node]:
+            leaves += n * stats.leaf_cells[child]
+            inst += n * (1 + stats.instances[child])
+            if child not in types:
+                types.add(child)
+                types |= below[child]
+        stats.leaf_cells[node] = leaves
+        stats.instances[node] = inst
+        types = frozenset(types)
+        below[node] = interned.setdefault(types, types)
+        stats.module_types[node] = len(types)
+    return stats
+
+# ------------------------------
+# 대형 설계용: 서브트리 축약
+# ------------------------------
+
+SUMMARY_SUFFIX = '/...'
+
+def collapse_hierarchy(stats, max_depth=None, max_children=None, max_nodes=None):
+    """Visible graph with subtrees folded into summary nodes.
+
+    A module's children are replaced by one '<module>/...' summary node when the
+    module sits at max_depth or has more than max_children child module types.
+    With max_nodes, max_depth is lowered until the graph fits. Returns
+    (nodes {id: attrs}, edges {(parent, child): instances per parent}, depth used).
+    """
+    top_module = stats.top
+    limit = max(stats.depth.values(), default=0) if max_depth is None else max_depth
+
+    while True:
+        nodes = {top_module: None}
+        edges = {}
+        queue = deque([top_module])
+        while queue:
+            node = queue.popleft()
+            kids = stats.children[node]
+            if not kids:
+                continue
+            if stats.depth[node] >= limit or (max_children is not None and len(kids) > max_children):
+                sid = node + SUMMARY_SUFFIX
+                mult, instances = stats.multiplicity[node], stats.instances[node]
+                nodes[sid] = {'kind': 'summary', 'depth': stats.depth[node] + 1,
+                              'modules': stats.module_types[node], 'instances': instances,
+                              'leaf_cells': stats.leaf_cells[node], 'multiplicity': mult,
+                              'weight': mult * instances}
+                edges[(node, sid)] = instances
+                continue
+            for child, n in kids:
+                edges[(node, child)] = n
+                if child not in nodes:
+                    nodes[child] = None
+                    queue.append(child)
+        if max_nodes is None or len(nodes) <= max_nodes or limit <= 0:
+            break
+        limit -= 1
+
+    for node, attrs in nodes.items():
+        if attrs is None:
+            nodes[node] = stats.node_attrs(node)
+    return nodes, edges, limit
+
+def plain_graph(edges, depths):
+    # 축약 없이 그릴 때의 nodes/edges (기존 build_graphviz 입력 형식에서 변환)
+    nodes = {}
+    for parent, child in sorted(edges):
+        for n in (parent, child):
+            nodes.setdefault(n, {'kind': 'module', 'depth': depths.get(n, 0)})
+    return nodes, {e: 1 for e in edges}
+
+def node_label(node, attrs):
+    if attrs['kind'] == 'summary':
+        return (f"{attrs['modules']} module types\n{attrs['instances']} instances"
+                f"\nx{attrs['multiplicity']} = {attrs['weight']}")
+    label = f"{node}\n(rank {attrs['depth']})"
+    if attrs.get('multiplicity', 1) > 1:
+        label += f"\nx{attrs['multiplicity']}"
+    return label
+
+GRAPH_ATTRS = {
+    'rankdir': 'TB',
+    'overlap': 'false',
+    'splines': 'false',
+    'nodesep': '0.5',
+    'ranksep': '0.5',
+    'concentrate': 'true'
+}
+
+def build_graphviz(edges, depths, out='module_hierarchy.svg', nodes=None, layout_budget=None):
+    # nodes: collapse_hierarchy()의 노드 속성 (없으면 edges에서 생성, edges는 set 또는 {edge: count})
+    if nodes is None:
+        nodes, edges = plain_graph(edges, depths)
+
+    # 노드가 너무 많으면 dot 레이아웃 생략: .dot 텍스트만 쓰고 끝냄
+    if layout_budget is not None and len(nodes) > layout_budget:
+        dot_path = out.rsplit('.', 1)[0] + '.dot'
+        write_dot(nodes, edges, dot_path)
+        print(f"{len(nodes)} nodes > layout budget {layout_budget}: layout skipped, graph saved as {dot_path}")
+        return
+
+    import pygraphviz as pgv  # JSON/.dot 출력만 쓸 때는 필요 없음
     G = pgv.AGraph(directed=True)
 
     # 노드 추가 + label + rank group
     rank_groups = defaultdict(list)
-    nodes_in_graph = set()
-    for parent, child in edges:
-        nodes_in_graph.add(parent)
-        nodes_in_graph.add(child)
-
-    for node in nodes_in_graph:
-        rank = depths.get(node, 0)
-        G.add_node(node, label=f"{node}\n(rank {rank})", shape='box')
+    for node, attrs in nodes.items():
+        rank = attrs['depth']
+        if attrs['kind'] == 'summary':
+            width = 1 + min(3.0, math.log10(max(attrs['weight'], 1)) / 2)
+            G.add_node(node, label=node_label(node, attrs), shape='folder', style='filled',
+                       fillcolor='lightgrey', penwidth=f"{width:.1f}")
+        else:
+            G.add_node(node, label=node_label(node, attrs), shape='box')
         rank_groups[rank].append(node)
 
-    # edge 추가 (set이므로 중복 없음)
-    for parent, child in edges:
-        G.add_edge(parent, child)
+    # edge 추가 (인스턴스가 여러 개면 개수 표시)
+    for (parent, child), n in edges.items():
+        if n > 1:
+            G.add_edge(parent, child, label=f"x{n}")
+        else:
+            G.add_edge(parent, child)
 
     # rank group 설정
-    for rank, nodes in rank_groups.items():
+    for rank, rank_nodes in rank_groups.items():
         with G.subgraph() as s:
             s.graph_attr['rank'] = 'same'
-            for n in nodes:
+            for n in rank_nodes:
                 s.add_node(n)
 
     # 옵션
-    G.graph_attr.update({
-        'rankdir': 'TB',
-        'overlap': 'false',
-        'splines': 'false',
-        'nodesep': '0.5',
-        'ranksep': '0.5',
-        'concentrate': 'true'
-    })
+    G.graph_attr.update(GRAPH_ATTRS)
 
     G.layout(prog='dot')
-    G.draw('module_hierarchy.svg')
-    print("Graph saved as module_hierarchy.svg")
+    G.draw(out)
+    print(f"Graph saved as {out}")
+
+def write_dot(nodes, edges, path):
+    # pygraphviz 없이 DOT 텍스트 기록 (레이아웃은 뷰어/브라우저 쪽에서)
+    def q(text):
+        return '"' + str(text).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+    with open(path, 'w') as f:
+        f.write('digraph hierarchy {\n')
+        f.write(''.join(f'  {k}={q(v)};\n' for k, v in GRAPH_ATTRS.items()))
+        for node, attrs in nodes.items():
+            shape = 'folder' if attrs['kind'] == 'summary' else 'box'
+            f.write(f'  {q(node)} [label={q(node_label(node, attrs))}, shape={shape}];\n')
+        for (parent, child), n in edges.items():
+            f.write(f'  {q(parent)} -> {q(child)}' + (f' [label="x{n}"]' if n > 1 else '') + ';\n')
+        f.write('}\n')
+
+def write_graph_json(nodes, edges, path, top_module, depth_limit=None):
+    # 브라우저 렌더링용 compact JSON: nodes는 속성 dict, edges는 [parent, child, count]
+    data = {
+        'top': top_module,
+        'depth_limit': depth_limit,
+        'nodes': [dict(id=node, **attrs) for node, attrs in nodes.items()],
+        'edges': [[parent, child, n] for (parent, child), n in edges.items()],
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    print(f"Graph JSON ({len(nodes)} nodes, {len(edges)} edges) saved as {path}")
+
+def render(stats, opts):
+    top_module = stats.top
+    for cycle in stats.cycles:
+        print(f"[WARN] recursive instantiation: {' -> '.join(cycle)}")
+
+    nodes, shown, limit = collapse_hierarchy(stats, opts.max_depth, opts.max_children, opts.max_nodes)
+    folded = sum(1 for a in nodes.values() if a['kind'] == 'summary')
+    if folded:
+        print(f"[graph] {len(stats.order)} modules -> {len(nodes)} nodes, {folded} summary node(s), depth limit {limit}")
+    if opts.csv:
+        stats.write_csv(opts.csv, opts.edges_csv)
+        print(f"Module table saved as {opts.csv}" + (f", edges as {opts.edges_csv}" if opts.edges_csv else ''))
+    if opts.json:
+        write_graph_json(nodes, shown, opts.json, top_module, limit)
+    if opts.out:
+        build_graphviz(shown, stats.depth, opts.out, nodes, opts.layout_budget)
+    return stats
 
 def main():
-    verilog_files = ['top.v']  # Verilog 파일 리스트 수정
-    top_module = 'TOP'         # TOP 모듈 이름 수정
+    ap = argparse.ArgumentParser(description='Draw the module hierarchy below TOP (Graphviz SVG and/or JSON)')
+    ap.add_argument('verilog', nargs='*', help='Input Verilog files')
+    ap.add_argument('-t', '--top', required=True, help='Top module name')
+    ap.add_argument('-o', '--out', default='module_hierarchy.svg',
+                    help="Graphviz output (default: module_hierarchy.svg; '' to skip)")
+    ap.add_argument('--json', default=None, metavar='FILE', help='Also write a compact node/edge JSON file')
+    ap.add_argument('--csv', default=None, metavar='FILE',
+                    help='Write per-module depth / multiplicity / subtree totals as CSV')
+    ap.add_argument('--edges-csv', default=None, metavar='FILE',
+                    help='With --csv, also write parent/child instance counts as CSV')
+    ap.add_argument('--max-depth', type=int, default=None,
+                    help='Fold everything below this depth into per-module summary nodes')
+    ap.add_argument('--max-children', type=int, default=None,
+                    help='Fold the children of modules with more child module types than this')
+    ap.add_argument('--max-nodes', type=int, default=None,
+                    help='Lower the depth limit until the graph has at most this many nodes')
+    ap.add_argument('--layout-budget', type=int, default=2000,
+                    help='Skip dot layout above this many nodes and write a .dot file instead (default: 2000)')
+    ap.add_argument('--lazy', action='store_true', help='Parse only modules reachable from TOP')
+    ap.add_argument('--fast-structural', action='store_true',
+                    help='Scan gate-level modules without pyverilog (behavioral modules fall back to it)')
+    ap.add_argument('--db', default=None, help='design_db.py .vdb file (no parsing)')
+    ap.add_argument('--server', default=None, metavar='SOCKET', help='Query a running design_server.py')
+    ap.add_argument('--watch', action='store_true', help='Redraw whenever the files change')
+    args = ap.parse_args()
+    if not args.verilog and not (args.db or args.server):
+        ap.error('Verilog files, --db or --server are required')
+
+    if args.watch:
+        ignored = [flag for flag, on in (('--server', args.server), ('--db', args.db), ('--lazy', args.lazy),
+                                         ('--fast-structural', args.fast_structural)) if on]
+        if ignored:
+            ap.error(f"--watch re-parses the Verilog files itself and cannot be used with {', '.join(ignored)}")
+        watch_main(args.verilog, args.top, args)
+        return
+
+    if args.server:
+        edge_counts, defined_modules = extract_edge_counts_server(args.server)
+    elif args.db:
+        edge_counts, defined_modules = extract_edge_counts_db(DesignDB.open(args.db))
+    else:
+        if args.fast_structural:
+            ast = make_source(scan_structural(args.verilog).values())
+        elif args.lazy:
+            ast = make_source(parse_reachable(args.verilog, args.top).values())
+        else:
+            ast, _ = parse_verilog(args.verilog)
+        edge_counts, defined_modules = extract_edge_counts(ast)
+
+    if args.top not in defined_modules:
+        raise SystemExit(f"ERROR: top module '{args.top}' is not defined")
+    render(analyze_hierarchy(edge_counts, args.top, defined_modules), args)
 
-    ast, _ = parse(verilog_files)
-    edges, defined_modules = extract_edges_and_modules(ast)
+def watch_main(verilog_files, top_module, opts):
+    # 바뀐 모듈의 edge만 다시 뽑고, 계층이 그대로면 레이아웃 생략
+    design = IncrementalDesign(verilog_files)
+    module_edges = {}
+    last_edges = [None]
 
-    reachable = find_reachable_nodes(edges, top_module)
-    filtered_edges = filter_edges(edges, reachable, defined_modules)
-    depths = compute_depths(filtered_edges, top_module)
+    def on_change(changed, reparse_time):
+        for name in changed:
+            if name in design.module_defs:
+                module_edges[name] = extract_module_edge_counts(design.module_defs[name])
+            else:
+                module_edges.pop(name, None)
+        edge_counts = Counter()
+        for counts in module_edges.values():
+            edge_counts.update(counts)
+        print(f"[watch] {len(changed)} module(s) changed, re-parse {reparse_time:.2f}s")
+        if top_module not in design.module_defs:
+            # 파일을 고치는 중일 수 있으므로 종료하지 않고 다음 변경을 기다림
+            print(f"[watch] ERROR: top module '{top_module}' is not defined; graph not drawn")
+            last_edges[0] = None
+            return
+        stats = analyze_hierarchy(edge_counts, top_module, set(design.module_defs))
+        reachable = set(stats.order)
+        shown = {e: n for e, n in edge_counts.items() if e[0] in reachable}
+        if shown == last_edges[0]:
+            print("[watch] hierarchy unchanged, graph not redrawn")
+            return
+        last_edges[0] = shown
+        render(stats, opts)
 
-    build_graphviz(filtered_edges, depths)
+    watch(design, on_change)
 
 if __name__ == "__main__":
     main()